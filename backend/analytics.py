@@ -0,0 +1,132 @@
+"""Cohort analytics computed by MongoDB aggregation pipelines.
+
+Pipelines run next to the data and only return grouped counts; the functions
+below turn those counts into the API response shapes using the training
+catalog and the status weights of the progress statistics.
+"""
+from typing import Any, Dict, List, Optional
+
+from catalog import CATALOG
+from progress_stats import COMPLETED_STATUSES, STATUS_WEIGHTS
+
+
+def weighted_score_expr() -> Dict[str, Any]:
+    """Aggregation expression for the weight of a record's status"""
+    return {"$switch": {
+        "branches": [
+            {"case": {"$eq": ["$status", status]}, "then": weight}
+            for status, weight in STATUS_WEIGHTS.items()
+        ],
+        "default": 0
+    }}
+
+
+def progress_facets_pipeline() -> List[Dict[str, Any]]:
+    """Per-item practiced counts and per-category scores in one pass over progress"""
+    return [
+        {"$match": {"status": {"$in": COMPLETED_STATUSES}}},
+        {"$facet": {
+            "items": [
+                {"$group": {
+                    "_id": {"category": "$category", "subcategory": "$subcategory", "item": "$item"},
+                    "students": {"$sum": 1}
+                }}
+            ],
+            "categories": [
+                {"$group": {
+                    "_id": "$category",
+                    "weighted_score": {"$sum": weighted_score_expr()},
+                    **{status: {"$sum": {"$cond": [{"$eq": ["$status", status]}, 1, 0]}} for status in COMPLETED_STATUSES}
+                }}
+            ]
+        }}
+    ]
+
+
+def exam_pass_rates_pipeline() -> List[Dict[str, Any]]:
+    def taken(exam):
+        # The student form sends false for an unticked box, so only a passed
+        # exam or an exam date tells that the exam was taken
+        return {"$sum": {"$cond": [{"$or": [
+            {"$eq": [f"${exam}_exam_passed", True]},
+            {"$ne": [{"$ifNull": [f"${exam}_exam_date", ""]}, ""]},
+        ]}, 1, 0]}}
+
+    def passed(exam):
+        return {"$sum": {"$cond": [{"$eq": [f"${exam}_exam_passed", True]}, 1, 0]}}
+
+    return [
+        {"$group": {
+            "_id": {"$ifNull": ["$instructor", None]},
+            "students": {"$sum": 1},
+            "theory_taken": taken("theory"),
+            "theory_passed": passed("theory"),
+            "practical_taken": taken("practical"),
+            "practical_passed": passed("practical"),
+        }},
+        {"$sort": {"_id": 1}}
+    ]
+
+
+def pass_rate(passed: int, taken: int) -> Optional[int]:
+    return round(passed / taken * 100) if taken > 0 else None
+
+
+def unpracticed_items(item_groups: List[Dict[str, Any]], student_count: int) -> List[Dict[str, Any]]:
+    """Catalog items not yet practiced by every student, least practiced first"""
+    practiced = {
+        (group["_id"]["category"], group["_id"]["subcategory"], group["_id"]["item"]): group["students"]
+        for group in item_groups
+    }
+    items = []
+    for (category, subcategory, item), ordinal in CATALOG.item_ordinals.items():
+        students_practiced = min(practiced.get((category, subcategory, item), 0), student_count)
+        if students_practiced < student_count:
+            items.append({
+                "category": category,
+                "subcategory": subcategory,
+                "item": item,
+                "students_practiced": students_practiced,
+                "students_unpracticed": student_count - students_practiced,
+                "ordinal": ordinal,
+            })
+    items.sort(key=lambda entry: (-entry["students_unpracticed"], entry["ordinal"]))
+    return items
+
+
+def category_completion(category_groups: List[Dict[str, Any]], student_count: int) -> Dict[str, Any]:
+    """Average weighted completion per catalog category across all students"""
+    groups = {group["_id"]: group for group in category_groups}
+    completion = {}
+    for category_key, total_items in CATALOG.category_item_counts.items():
+        group = groups.get(category_key, {})
+        max_possible_score = total_items * 100 * student_count
+        completion[category_key] = {
+            "total_items": total_items,
+            "completed_items": {status: group.get(status, 0) for status in COMPLETED_STATUSES},
+            "average_completion_percentage": round(
+                (group.get("weighted_score", 0) / max_possible_score * 100) if max_possible_score > 0 else 0, 1
+            ),
+            "color": CATALOG.category_colors[category_key],
+        }
+    return completion
+
+
+def exam_pass_rates(groups: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "instructor": group["_id"],
+            "students": group["students"],
+            "theory": {
+                "taken": group["theory_taken"],
+                "passed": group["theory_passed"],
+                "pass_rate": pass_rate(group["theory_passed"], group["theory_taken"]),
+            },
+            "practical": {
+                "taken": group["practical_taken"],
+                "passed": group["practical_passed"],
+                "pass_rate": pass_rate(group["practical_passed"], group["practical_taken"]),
+            },
+        }
+        for group in groups
+    ]
@@ -0,0 +1,127 @@
+"""Benchmark of the read-route serialization paths.
+
+Compares, per request, the CPU time of the validating path (``Model(**doc)``,
+then FastAPI's response_model validation and JSONResponse) with the trusted
+path (``trusted_record`` rendered by orjson, plus ``model_construct`` for
+reference) on documents shaped like stored students and progress records.
+No database is needed:
+
+    python bench_serialization.py --students 200 --repeat 50
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+import server
+from catalog import CATALOG
+from fahrten import expand_fahrten
+from serialization import trusted_record
+
+
+def student_docs(count: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "_id": ObjectId(),
+            **server.Student(
+                name=f"Vorname {i}",
+                surname=f"Nachname {i}",
+                phone="0170 1234567",
+                instructor="Fahrlehrer",
+                uebungsfahrten_ganz=[True] * (i % 20),
+                uebungsfahrten_halb=[i % 2 == 0] * (i % 10),
+            ).model_dump()
+        }
+        for i in range(count)
+    ]
+
+
+def progress_docs(student_id: str) -> List[Dict[str, Any]]:
+    docs = []
+    for category, subcategory, item in CATALOG.item_ordinals:
+        docs.append({
+            "_id": ObjectId(),
+            "id": str(uuid.uuid4()),
+            "student_id": student_id,
+            "category": category,
+            "subcategory": subcategory,
+            "item": item,
+            "status": "twice",
+            "notes": None,
+            "last_updated": datetime.utcnow(),
+        })
+    return docs
+
+
+def route_field(path: str):
+    for route in server.app.routes:
+        if isinstance(route, APIRoute) and route.path == path and "GET" in route.methods:
+            return route.response_field
+    raise LookupError(path)
+
+
+def cpu_time_per_request(render: Callable[[], bytes], repeat: int) -> float:
+    """Best-of-``repeat`` CPU seconds of one render"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        render()
+        best = min(best, time.process_time() - started)
+    return best
+
+
+def compare(name: str, path: str, docs: List[Dict[str, Any]], model, expand, repeat: int) -> float:
+    field = route_field(path)
+    loop = asyncio.new_event_loop()
+
+    def validating() -> bytes:
+        items = [model(**expand(dict(doc))) for doc in docs]
+        content = loop.run_until_complete(serialize_response(field=field, response_content=items))
+        return JSONResponse(content).body
+
+    def constructed() -> bytes:
+        return ORJSONResponse([model.model_construct(**expand(dict(doc))).__dict__ for doc in docs]).body
+
+    def trusted() -> bytes:
+        return ORJSONResponse([trusted_record(model, expand(dict(doc))) for doc in docs]).body
+
+    # All paths must produce the same response
+    assert json.loads(validating()) == json.loads(constructed()) == json.loads(trusted())
+
+    before = cpu_time_per_request(validating, repeat)
+    with_construct = cpu_time_per_request(constructed, repeat)
+    after = cpu_time_per_request(trusted, repeat)
+    loop.close()
+    print(f"{name:<28} {len(docs):>4} docs  validating {before * 1000:6.2f} ms  "
+          f"model_construct {with_construct * 1000:6.2f} ms  trusted {after * 1000:6.2f} ms  "
+          f"({before / after:4.1f}x less CPU per request)")
+    return before / after
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--min-speedup", type=float, default=1.0,
+                        help="exit non-zero if any route saves less than this factor")
+    options = parser.parse_args()
+
+    students = student_docs(options.students)
+    speedups = [
+        compare("GET /students", "/api/students", students, server.Student, expand_fahrten, options.repeat),
+        compare("GET /students/{id}/progress", "/api/students/{student_id}/progress",
+                progress_docs(students[0]["id"]), server.TrainingProgress, lambda doc: doc, options.repeat),
+    ]
+    if min(speedups) < options.min_speedup:
+        raise SystemExit(f"Speedup below {options.min_speedup}x")
+
+
+if __name__ == "__main__":
+    main()
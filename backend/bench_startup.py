@@ -0,0 +1,105 @@
+"""Cold-start budget for the API process.
+
+Imports server.py in fresh interpreters, without MONGO_URL or DB_NAME, and
+times the import and the first request (the training catalog, which needs no
+database). Fails when the median import time exceeds the budget, and lists
+the slowest top-level imports so a regression can be traced:
+
+    python bench_startup.py --runs 5 --budget-ms 600
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = Path(__file__).parent
+
+# Runs in the child; httpx is imported before the clock starts, it is not part of the app
+CHILD = """
+import asyncio, json, time
+import httpx
+started = time.perf_counter()
+import server
+imported = time.perf_counter()
+
+async def first_request():
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+        response = await client.get("/api/training-categories")
+        response.raise_for_status()
+
+asyncio.run(first_request())
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_request_ms": (time.perf_counter() - imported) * 1000,
+    "database_connected": server.app.state.services.db.connected,
+}))
+"""
+
+
+def child_env() -> Dict[str, str]:
+    env = {key: value for key, value in os.environ.items() if key not in ("MONGO_URL", "DB_NAME")}
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def measure_once() -> Dict[str, float]:
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=BACKEND_DIR, env=child_env(), capture_output=True, text=True
+    )
+    if result.returncode:
+        sys.exit(f"Startup run failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(limit: int) -> List[Tuple[str, float]]:
+    """Top-level modules imported by server.py, by cumulative import time"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=BACKEND_DIR, env=child_env(), capture_output=True, text=True
+    )
+    # Children are listed before their parent, indented one level deeper
+    modules = []
+    for line in result.stderr.splitlines()[1:]:
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            if name.strip() == "server":
+                break
+            modules = []
+        elif depth == 1:
+            modules.append((name.strip(), int(cumulative) / 1000))
+    return sorted(modules, key=lambda module: module[1], reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=600.0,
+                        help="fail when the median import time of server.py exceeds this")
+    parser.add_argument("--top", type=int, default=8, help="number of slowest imports to list")
+    options = parser.parse_args()
+
+    runs = [measure_once() for _ in range(options.runs)]
+    import_ms = statistics.median(run["import_ms"] for run in runs)
+    first_request_ms = statistics.median(run["first_request_ms"] for run in runs)
+    print(f"import server:  {import_ms:8.1f} ms median of {options.runs} (budget {options.budget_ms:.0f} ms)")
+    print(f"first request:  {first_request_ms:8.1f} ms")
+    if any(run["database_connected"] for run in runs):
+        print("warning: the database was connected during startup; it should connect on first use")
+
+    print("\nslowest imports (cumulative):")
+    for name, milliseconds in slowest_imports(options.top):
+        print(f"  {name:<32} {milliseconds:8.1f} ms")
+
+    if import_ms > options.budget_ms:
+        print(f"\nImport time {import_ms:.1f} ms exceeds the budget of {options.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
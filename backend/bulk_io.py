@@ -0,0 +1,106 @@
+"""Streaming NDJSON/CSV helpers for bulk student import and export.
+
+Uploads are parsed incrementally from the request body so an import never
+holds the whole file in memory; exports are produced row by row from cursors.
+"""
+import codecs
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+
+# Fields holding lists, stored in CSV cells as JSON arrays (e.g. "[true,false]")
+LIST_FIELDS = {"ueberlandfahrten", "autobahnfahrten", "nachtfahrten", "uebungsfahrten_ganz", "uebungsfahrten_halb"}
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], encoding: str = "utf-8") -> AsyncIterator[str]:
+    """Split a byte stream into text lines without buffering more than one line"""
+    # Incremental so multi-byte characters split across chunks decode correctly
+    decoder = codecs.getincrementaldecoder(encoding)()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def iter_ndjson_rows(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Any]]:
+    """Yield (line number, parsed object or ValueError) for every non-empty line"""
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"Invalid JSON: {e}")
+
+
+async def iter_csv_rows(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Any]]:
+    """Yield (line number, row dict or ValueError) from a CSV stream with a header row.
+
+    Quoted cells may span lines; a record is complete once its quotes balance.
+    Empty cells are omitted and list cells are decoded from JSON.
+    """
+    header: Optional[List[str]] = None
+    record, record_start, line_number = [], 0, 0
+    async for line in lines:
+        line_number += 1
+        if not record:
+            record_start = line_number
+        record.append(line)
+        text = "\n".join(record)
+        if text.count('"') % 2:
+            continue
+        record = []
+        if not text.strip():
+            continue
+
+        cells = next(csv.reader([text]))
+        if header is None:
+            header = [cell.strip() for cell in cells]
+            continue
+        if len(cells) != len(header):
+            yield record_start, ValueError(f"Expected {len(header)} cells, got {len(cells)}")
+            continue
+        try:
+            yield record_start, {
+                name: json.loads(value) if name in LIST_FIELDS else value
+                for name, value in zip(header, cells)
+                if value != ""
+            }
+        except ValueError as e:
+            yield record_start, ValueError(f"Invalid list cell: {e}")
+    if record:
+        yield record_start, ValueError("Unterminated quoted cell")
+
+
+def csv_line(values: List[Any]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(values)
+    return buffer.getvalue()
+
+
+def csv_cell(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, separators=(",", ":"))
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value
+
+
+def csv_rows(fields: List[str], records: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    """CSV text for JSON-compatible records, header first"""
+    async def rows():
+        yield csv_line(fields)
+        async for record in records:
+            yield csv_line([csv_cell(record.get(field)) for field in fields])
+    return rows()
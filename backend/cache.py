@@ -0,0 +1,276 @@
+"""Read cache for per-student API results behind a pluggable backend.
+
+Entries are grouped by student id so a write to a student invalidates every
+cached view of it (student document, progress list, progress summary) at once.
+The backend is either in-process memory or a shared Redis store (through
+redis-py), which keeps several uvicorn workers consistent.
+"""
+import asyncio
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+# Result kinds cached per student
+CACHE_KINDS = ("student", "progress", "summary")
+
+# Generation counters outlive the values they guard by this factor of the TTL
+GENERATION_TTL_FACTOR = 10
+
+
+class CacheBackendError(Exception):
+    pass
+
+
+class CacheBackend(ABC):
+    """Minimal key-value interface the cache needs from a store"""
+
+    @abstractmethod
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        """Values of ``keys`` in order, None for missing or expired keys"""
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float):
+        """Store ``value`` for ``ttl`` seconds"""
+
+    @abstractmethod
+    async def incr(self, key: str, ttl: float) -> int:
+        """Increment a counter (missing counts as 0), keep it ``ttl`` seconds and return it"""
+
+    @abstractmethod
+    async def delete(self, keys: List[str]):
+        """Remove ``keys``; missing keys are ignored"""
+
+    async def close(self):
+        pass
+
+    def describe(self) -> Dict[str, Any]:
+        return {"backend": type(self).__name__}
+
+
+class InMemoryBackend(CacheBackend):
+    """Bounded LRU store with per-key TTL, local to one process"""
+
+    def __init__(self, max_keys: int = 4096, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self.evictions = 0
+
+    def _get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set(self, key: str, value: bytes, ttl: float):
+        self._entries[key] = (self._clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_keys:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        return [self._get(key) for key in keys]
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        self._set(key, value, ttl)
+
+    async def incr(self, key: str, ttl: float) -> int:
+        value = int(self._get(key) or 0) + 1
+        self._set(key, str(value).encode(), ttl)
+        return value
+
+    async def delete(self, keys: List[str]):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "keys": len(self._entries),
+            "max_keys": self.max_keys,
+            "evictions": self.evictions,
+        }
+
+
+class RedisBackend(CacheBackend):
+    """Shared Redis store through redis-py's asyncio client and a small connection pool"""
+
+    def __init__(self, url: str, pool_size: int = 4, timeout: float = 1.0):
+        # Only deployments sharing the cache through Redis need redis-py
+        import redis.asyncio as redis
+        from redis.exceptions import RedisError
+
+        self.pool_size = pool_size
+        self._errors = RedisError
+        # Waits up to ``timeout`` for a free connection instead of failing at once
+        pool = redis.BlockingConnectionPool.from_url(
+            url, max_connections=pool_size, timeout=timeout,
+            socket_timeout=timeout, socket_connect_timeout=timeout)
+        self._client = redis.Redis(connection_pool=pool)
+        options = pool.connection_kwargs
+        self.host = options.get("host", "localhost")
+        self.port = options.get("port", 6379)
+        self.database = options.get("db", 0)
+
+    async def _call(self, command: Awaitable[Any]) -> Any:
+        try:
+            return await command
+        except self._errors as e:
+            raise CacheBackendError(str(e) or type(e).__name__) from e
+
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        return await self._call(self._client.mget(keys))
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self._call(self._client.set(key, value, px=max(1, int(ttl * 1000))))
+
+    async def incr(self, key: str, ttl: float) -> int:
+        # One round trip for both commands
+        pipeline = self._client.pipeline(transaction=False)
+        pipeline.incr(key)
+        pipeline.pexpire(key, max(1, int(ttl * 1000)))
+        value, _ = await self._call(pipeline.execute())
+        return value
+
+    async def delete(self, keys: List[str]):
+        await self._call(self._client.delete(*keys))
+
+    async def close(self):
+        await self._client.aclose()
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis",
+            "host": self.host,
+            "port": self.port,
+            "database": self.database,
+            "pool_size": self.pool_size,
+        }
+
+
+def create_backend(url: Optional[str], max_keys: int) -> CacheBackend:
+    """Backend for a CACHE_URL: unset or "memory://" for in-process, "redis://..." (or
+    "rediss://", "unix://") for shared"""
+    if not url or url.startswith("memory://"):
+        return InMemoryBackend(max_keys=max_keys)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported cache URL: {url}")
+
+
+class StudentCache:
+    """Per-student read cache with generation-based invalidation.
+
+    Every student has a generation counter next to its cached values, and each
+    value records the generation it was loaded under. Invalidation bumps the
+    counter, so a value stored by a load that raced with a write (possibly in
+    another worker) is never served. A read fetches the counter and the value
+    in one round trip. Concurrent misses within this process share one load.
+    Backend failures degrade to loading from the database.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float = 30.0):
+        self.backend = backend
+        self.ttl = ttl
+        self._loading: Dict[Tuple[str, str, int], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    @staticmethod
+    def _generation_key(student_id: str) -> str:
+        return f"student:{student_id}:generation"
+
+    @staticmethod
+    def _value_key(student_id: str, kind: str) -> str:
+        return f"student:{student_id}:{kind}"
+
+    async def get_or_load(self, student_id: str, kind: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Cached JSON-compatible result of ``loader()`` for a student"""
+        if not self.enabled:
+            return await loader()
+
+        value_key = self._value_key(student_id, kind)
+        try:
+            raw_generation, raw_value = await self.backend.get_many([self._generation_key(student_id), value_key])
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache read failed, loading from database: {e}")
+            return await loader()
+
+        generation = int(raw_generation or 0)
+        if raw_value is not None:
+            stored_generation, _, payload = raw_value.partition(b":")
+            if int(stored_generation) == generation:
+                self.hits += 1
+                return json.loads(payload)
+        self.misses += 1
+
+        flight_key = (student_id, kind, generation)
+        pending = self._loading.get(flight_key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[flight_key] = future
+        try:
+            value = await loader()
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Waiters re-raise it; don't log it as unretrieved
+            raise
+        finally:
+            del self._loading[flight_key]
+        future.set_result(value)
+
+        try:
+            await self.backend.set(value_key, b"%d:%s" % (generation, json.dumps(value).encode()), self.ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache write failed: {e}")
+        return value
+
+    async def invalidate(self, student_id: str):
+        """Publish a write to a student: every cached view of it becomes stale"""
+        self.invalidations += 1
+        if not self.enabled:
+            return
+        try:
+            await self.backend.incr(self._generation_key(student_id), self.ttl * GENERATION_TTL_FACTOR)
+            await self.backend.delete([self._value_key(student_id, kind) for kind in CACHE_KINDS])
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Cache invalidation of student {student_id} failed: {e}")
+
+    async def close(self):
+        await self.backend.close()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+            **self.backend.describe(),
+        }
@@ -0,0 +1,518 @@
+"""Training catalog based on the German driving license training card.
+
+The nested category tree is defined once here and compiled at import time into
+an immutable :class:`TrainingCatalog` index that the API routes share.
+"""
+import hashlib
+import json
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Tuple
+
+
+# Complete training structure: category -> sections -> items, where a section
+# may instead hold nested "sections" (see "situative_bausteine")
+TRAINING_CATEGORIES: Dict[str, Any] = {
+    "grundstufe": {
+        "name": "Grundstufe",
+        "subtitle": "Einweisung und Bedienung",
+        "color": "#F59E0B",
+        "sections": {
+            "besonderheiten_einsteigen": {
+                "name": "Besonderheiten beim Einsteigen",
+                "items": ["Besonderheiten beim Einsteigen"]
+            },
+            "einstellen": {
+                "name": "Einstellen", 
+                "items": ["Sitz", "Spiegel", "Lenkrad", "Kopfstütze"]
+            },
+            "lenkradhaltung": {
+                "name": "Lenkradhaltung",
+                "items": ["Lenkradhaltung"]
+            },
+            "pedale": {
+                "name": "Pedale",
+                "items": ["Pedale"]
+            },
+            "gurt_anlegen": {
+                "name": "Gurt anlegen/anpassen",
+                "items": ["Gurt anlegen/anpassen"]
+            },
+            "schalt_wahlhebel": {
+                "name": "Schalt-/Wählhebel",
+                "items": ["Schalt-/Wählhebel"]
+            },
+            "zundschloss": {
+                "name": "Zündschloss",
+                "items": ["Zündschloss"]
+            },
+            "motor_anlassen": {
+                "name": "Motor anlassen",
+                "items": ["Motor anlassen"]
+            },
+            "anfahren": {
+                "name": "Anfahren/Anhalteübungen",
+                "items": ["Anfahren/Anhalteübungen"]
+            },
+            "schaltubungen": {
+                "name": "Schaltübungen (umweltschonend)",
+                "items": ["hoch: 1-2", "2-3", "3-4", "...", "runter: 4-3", "3-2", "2-1", "...", "runter: 4-2", "4-1", "3-1"]
+            },
+            "lenkubungen": {
+                "name": "Lenkübungen",
+                "items": ["Lenkübungen"]
+            }
+        }
+    },
+    "aufbaustufe": {
+        "name": "Aufbaustufe", 
+        "subtitle": "Umweltschonendes, vorausschauendes Fahren, Blickschulung",
+        "color": "#F97316",
+        "sections": {
+            "rollen_schalten": {
+                "name": "Rollen und Schalten",
+                "items": ["Rollen und Schalten"]
+            },
+            "abbremsen_schalten": {
+                "name": "Abbremsen und Schalten",
+                "items": ["Abbremsen und Schalten"]
+            },
+            "bremsübungen": {
+                "name": "Bremsübungen",
+                "items": ["degressiv", "Zielbremsungen", "Gefahrsituationen"]
+            },
+            "gefalle": {
+                "name": "Gefälle",
+                "items": ["Anhalten", "Anfahren", "Rückwärts", "Sichern", "Schalten"]
+            },
+            "steigung": {
+                "name": "Steigung", 
+                "items": ["Anhalten", "Anfahren", "Rückwärts", "Sichern", "Schalten"]
+            },
+            "tastgeschwindigkeit": {
+                "name": "Tastgeschwindigkeit",
+                "items": ["Tastgeschwindigkeit"]
+            },
+            "bedienungs_kontrolleinrichtungen": {
+                "name": "Bedienungs- und Kontrolleinrichtungen",
+                "items": ["Bedienungs- und Kontrolleinrichtungen"]
+            },
+            "ortliche_besonderheiten": {
+                "name": "Örtliche Besonderheiten",
+                "items": ["Örtliche Besonderheiten"]
+            }
+        }
+    },
+    "leistungsstufe": {
+        "name": "Leistungsstufe",
+        "subtitle": "Schwierige Verkehrssituationen, umweltschonendes, vorausschauendes Fahren, Blickschulung/Bremsbereitschaft",
+        "color": "#EF4444", 
+        "sections": {
+            "fahrbahnabutzung": {
+                "name": "Fahrbahnbenutzung",
+                "items": ["Einordnen", "Markierungen"]
+            },
+            "fahrstreifenwechsel": {
+                "name": "Fahrstreifenwechsel",
+                "items": ["links", "rechts"]
+            },
+            "vorbeifahren": {
+                "name": "Vorbeifahren/Überholen",
+                "items": ["Vorbeifahren/Überholen"]
+            },
+            "abbiegen": {
+                "name": "Abbiegen",
+                "items": ["rechts", "links", "mehrspurig", "Radweg", "Sonderstreifen", "Straßenbahnen", "Einbahnstraßen"]
+            },
+            "vorfahrt": {
+                "name": "Vorfahrt",
+                "items": ["rechts vor links", "Grünpfeil", "Polizeibeamte", "Grünpfeil-Schild"]
+            },
+            "geschwindigkeit_abstand": {
+                "name": "Geschwindigkeit/Abstand",
+                "items": ["Geschwindigkeit/Abstand"]
+            },
+            "situationen_verkehrsteilnehmer": {
+                "name": "Situationen mit anderen Verkehrsteilnehmern",
+                "items": ["Fußgängerüberwege", "Kinder", "Öffentl. Verkehrsmittel", "Schulbus", "Ältere/Behinderte", "Radfahrer/Mofa", "Einbahnstr./Radfahrer", "Verk.-beruh. Bereich"]
+            },
+            "schwierige_verkehrsfuhrung": {
+                "name": "Schwierige Verkehrsführung",
+                "items": ["Schwierige Verkehrsführung"]
+            },
+            "engpass": {
+                "name": "Engpass",
+                "items": ["Engpass"]
+            },
+            "kreisverkehr": {
+                "name": "Kreisverkehr",
+                "items": ["Kreisverkehr"]
+            },
+            "bahnubergang": {
+                "name": "Bahnübergang (warten)",
+                "items": ["Bahnübergang (warten)"]
+            },
+            "kritische_verkehrssituationen": {
+                "name": "Kritische Verkehrssituationen",
+                "items": ["Hauptverkehrszeiten", "Partnerschaftliches Verhalten (Kommunikation, Verzicht auf Vorfahrt)", "Schwung nutzen"]
+            },
+            "fussganger_schutzbereich": {
+                "name": "Fußgänger Schutzbereich",
+                "items": ["Fußgänger Schutzbereich"]
+            }
+        }
+    },
+    "grundfahraufgaben": {
+        "name": "Grundfahraufgaben",
+        "color": "#F59E0B",
+        "sections": {
+            "ruckwartsfahren": {
+                "name": "Rückwärtsfahren",
+                "items": ["Rückwärtsfahren"]
+            },
+            "umkehren": {
+                "name": "Umkehren", 
+                "items": ["Umkehren"]
+            },
+            "gefahrbremsung": {
+                "name": "Gefahrbremsung",
+                "items": ["Gefahrbremsung"]
+            },
+            "einparken_langs": {
+                "name": "Einparken längs",
+                "items": ["vorwärts rechts", "vorwärts links", "rückwärts rechts", "rückwärts links"]
+            },
+            "einparken_quer": {
+                "name": "Einparken quer", 
+                "items": ["vorwärts rechts", "vorwärts links", "rückwärts rechts", "rückwärts links"]
+            }
+        }
+    },
+    "uberlandfahrten": {
+        "name": "Überlandfahrten",
+        "subtitle": "Sicheres und umweltschonendes Fahren mit höheren Geschwindigkeiten auf Landstraßen",
+        "color": "#FDE047",
+        "sections": {
+            "main_items": {
+                "name": "",
+                "items": [
+                    "Angepasste Geschwindigkeit/Gangwahl (alle Gänge)"
+                ]
+            },
+            "abstand": {
+                "name": "Abstand",
+                "items": ["vorne", "hinten", "seitlich"]
+            },
+            "main_items_2": {
+                "name": "",
+                "items": [
+                    "Beobachtung/Spiegel",
+                    "Verkehrszeichen",
+                    "Kreuzungen/Einmündungen", 
+                    "Kurven",
+                    "Steigungen",
+                    "Gefälle",
+                    "Alleen",
+                    "Überholen"
+                ]
+            },
+            "besondere_situationen": {
+                "name": "Besondere Situationen",
+                "items": ["Liegenbleiben • Absichern", "Einfahren in Ortschaften", "Fußgänger", "Wild/Tiere"]
+            },
+            "besondere_anforderungen": {
+                "name": "Besondere Anforderungen",
+                "items": ["Leistungsgrenze", "Ablenkung", "Konfliktsituationen"]
+            }
+        }
+    },
+    "autobahn": {
+        "name": "Autobahn",
+        "subtitle": "Sicheres und umweltschonendes Fahren mit höheren Geschwindigkeiten auf Autobahnen",
+        "color": "#FDE047",
+        "sections": {
+            "main_items_1": {
+                "name": "",
+                "items": [
+                    "Fahrtplanung",
+                    "Einfahren in BAB",
+                    "Fahrstreifenwahl", 
+                    "Geschwindigkeit"
+                ]
+            },
+            "abstand": {
+                "name": "Abstand",
+                "items": ["vorne", "hinten", "seitlich"]
+            },
+            "main_items_2": {
+                "name": "",
+                "items": [
+                    "Überholen",
+                    "Schilder/Markierungen",
+                    "Vorbeifahren/Anschlussstellen",
+                    "Rast-/Parkplätze, Tankstellen",
+                    "Verhalten bei Unfällen",
+                    "Dichter Verkehr/Stau",
+                    "Besondere Situationen"
+                ]
+            },
+            "besondere_anforderungen": {
+                "name": "Besondere Anforderungen",
+                "items": ["Leistungsgrenze", "Ablenkung", "Konfliktsituationen"]
+            },
+            "final_items": {
+                "name": "",
+                "items": ["Verlassen der BAB"]
+            }
+        }
+    },
+    "dammerung_dunkelheit": {
+        "name": "Dämmerung/Dunkelheit", 
+        "subtitle": "Kontrollieren/Einschalten der Beleuchtungseinrichtungen",
+        "color": "#FDE047",
+        "sections": {
+            "beleuchtung": {
+                "name": "Beleuchtung",
+                "items": ["Kontrolle", "Benutzung", "Einstellen", "Fernlicht"]
+            },
+            "main_items": {
+                "name": "",
+                "items": [
+                    "Beleuchtete Straßen",
+                    "Unbeleuchtete Straßen", 
+                    "Parken"
+                ]
+            },
+            "besondere_situationen": {
+                "name": "Besondere Situationen",
+                "items": ["Schlechte Witterung", "Bahnübergänge", "Tiere", "Unbeleuchtete Verkehrsteilnehmer"]
+            },
+            "besondere_anforderungen": {
+                "name": "Besondere Anforderungen",
+                "items": ["Blendung", "Orientierung"]
+            },
+            "final_items": {
+                "name": "",
+                "items": ["Abschlussbesprechung"]
+            }
+        }
+    },
+    "reife_teststufe": {
+        "name": "Reife- und Teststufe",
+        "subtitle": "Abschluss der Ausbildung - Prüfungsvorbereitung",
+        "color": "#10B981",
+        "sections": {
+            "selbststandiges_fahren": {
+                "name": "Selbstständiges Fahren",
+                "items": ["innerorts", "außerorts"]
+            },
+            "verantwortungsbewusstes_fahren": {
+                "name": "Verantwortungsbewusstes Fahren",
+                "items": ["Verantwortungsbewusstes Fahren"]
+            },
+            "testfahrt": {
+                "name": "Testfahrt unter Prüfungsbedingungen",
+                "items": ["FAKT", "andere"]
+            },
+            "wiederholung": {
+                "name": "Wiederholung/Vertiefung",
+                "items": ["Wiederholung/Vertiefung"]
+            },
+            "leistungsbewertung": {
+                "name": "Leistungsbewertung", 
+                "items": ["Leistungsbewertung"]
+            }
+        }
+    },
+    "situative_bausteine": {
+        "name": "Situative Bausteine",
+        "color": "#60A5FA",
+        "sections": {
+            "fahrtechnische_vorbereitung": {
+                "name": "Checkliste zur fahrtechnischen Vorbereitung",
+                "sections": {
+                    "fahrzeug": {
+                        "name": "Beim Fahrzeug",
+                        "items": ["Reifen (z.B. Beschädigungen, Profiltiefe, Reifendruck)"]
+                    },
+                    "scheiben_leuchten": {
+                        "name": "Scheiben, Leuchten, Blinker, Hupe",
+                        "items": ["Ein- und Ausschalten"]
+                    },
+                    "funktion_prufen": {
+                        "name": "Funktion prüfen",
+                        "items": ["Standlicht", "Abblendlicht", "Fernlicht", "Schlussleucht m. Kennzeichenbeleuchtung", "Nebelschlussleuchte", "Warnblinkanlage", "Blinker", "Hupe", "Bremsleuchte"]
+                    },
+                    "kontrollleuchten": {
+                        "name": "Kontrollleuchten benennen",
+                        "items": ["Kontrollleuchten benennen"]
+                    },
+                    "ruckstrahler": {
+                        "name": "Rückstrahler",
+                        "items": ["Vorhandensein", "Beschädigung"]
+                    },
+                    "lenkung": {
+                        "name": "Lenkung",
+                        "items": ["Lenkschloss entriegeln", "Überprüfen des Lenkspiels"]
+                    },
+                    "bremsen": {
+                        "name": "Funktionsprüfung der Bremsen",
+                        "items": ["Betriebsbremse", "Feststellbremse"]
+                    }
+                }
+            }
+        }
+    },
+    "fahrerassistenzsysteme": {
+        "name": "Fahrerassistenzsysteme",
+        "color": "#60A5FA",
+        "sections": {
+            "bedienung": {
+                "name": "Bedienung der Fahrerassistenzsysteme",
+                "items": ["Bedienung der Fahrerassistenzsysteme"]
+            }
+        }
+    },
+    "beim_fahrer": {
+        "name": "Beim Fahrer (vor Fahrtbeginn)",
+        "subtitle": "Richtige Sitzeinstellung",
+        "color": "#60A5FA",
+        "sections": {
+            "sitzeinstellung": {
+                "name": "Richtige Sitzeinstellung",
+                "items": ["Richtige Sitzeinstellung"]
+            },
+            "ruckspiegeleinstellung": {
+                "name": "Einstellung der Rückspiegel",
+                "items": ["der Kopfstütze", "des Lenkrades"]
+            },
+            "sicherheitsgurt": {
+                "name": "Anlegen des Sicherheitsgurtes",
+                "items": ["Anlegen des Sicherheitsgurtes"]
+            }
+        }
+    },
+    "heizung_luftung": {
+        "name": "Heizung und Lüftung",
+        "color": "#60A5FA",
+        "sections": {
+            "bedienen_aggregate": {
+                "name": "Bedienen der Aggregate",
+                "items": ["Heizung", "Lüftung", "Klimaanlage", "Heckscheibenheizung", "Beheizte Sonderausstattungen"]
+            },
+            "energiesparende_nutzung": {
+                "name": "Energiesparende Nutzung",
+                "items": ["keine unnötigen Verbraucher", "Rechtzeitiges Abschalten"]
+            }
+        }
+    },
+    "betriebs_verkehrssicherheit": {
+        "name": "Betriebs- und Verkehrssicherheit",
+        "color": "#60A5FA",
+        "sections": {
+            "motorraum": {
+                "name": "Motorraum/Flüssigkeitsstände",
+                "items": ["Motoröl", "Kühlmittel", "Scheibenwischflüssigkeit"]
+            },
+            "tanken": {
+                "name": "Tanken",
+                "items": ["Tanken"]
+            },
+            "sicherungsmittel": {
+                "name": "Sicherungsmittel",
+                "items": ["Warndreieck", "Verbandskasten", "Bordwerkzeug", "zusätzliche Ausrüstung"]
+            },
+            "aussenkontrolle": {
+                "name": "Außenkontrolle (Schäden, Sauberkeit)",
+                "items": ["Scheiben/Wischer", "Spiegel", "Kennzeichen(HU/AU)", "Beleuchtung"]
+            },
+            "bremsen": {
+                "name": "Bremsen",
+                "items": ["Bremsen"]
+            },
+            "ladung": {
+                "name": "Ladung",
+                "items": ["Sicherung", "Kennzeichnung"]
+            }
+        }
+    },
+    "witterung": {
+        "name": "Witterung",
+        "subtitle": "Fahren bei verschiedenen Witterungsbedingungen",
+        "color": "#60A5FA",
+        "sections": {
+            "schlechte_witterung": {
+                "name": "Fahren bei schlechter Witterung",
+                "items": ["Lüftung", "Beleuchtung", "Scheibenwischer/-wascher", "Regen, Sprühnebel", "Wasserlachen, Aquaplaning", "Wind, Sturm, Böen", "Schnee und Matsch", "Eis"]
+            }
+        }
+    }
+}
+
+
+@dataclass(frozen=True)
+class TrainingCatalog:
+    categories: Mapping[str, Any]
+    category_item_counts: Mapping[str, int]
+    category_colors: Mapping[str, str]
+    total_items: int
+    item_ordinals: Mapping[Tuple[str, str, str], int]
+    json_body: bytes
+    version: str
+
+    @property
+    def etag(self) -> str:
+        """Strong ETag derived from the content hash of the serialized catalog"""
+        return f'"{self.version}"'
+
+    def item_ordinal(self, category: str, subcategory: str, item: str) -> int:
+        """Return the position of an item in catalog order, or -1 if unknown"""
+        return self.item_ordinals.get((category, subcategory, item), -1)
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(child) for key, child in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(child) for child in value)
+    return value
+
+
+def _iter_sections(sections: Dict[str, Any], prefix: str = ""):
+    """Yield (subcategory, section) for every leaf section holding items.
+
+    Nested section keys are joined with "_" the same way the frontend builds
+    its subcategory keys (e.g. "fahrtechnische_vorbereitung_fahrzeug").
+    """
+    for section_key, section in sections.items():
+        key = f"{prefix}_{section_key}" if prefix else section_key
+        if 'sections' in section:  # Has nested sections
+            yield from _iter_sections(section['sections'], key)
+        elif 'items' in section:  # Has direct items
+            yield key, section
+
+
+def build_catalog(categories: Dict[str, Any]) -> TrainingCatalog:
+    category_item_counts = {}
+    item_ordinals = {}
+    for category_key, category in categories.items():
+        category_total = 0
+        for subcategory, section in _iter_sections(category['sections']):
+            category_total += len(section['items'])
+            for item in section['items']:
+                item_ordinals.setdefault((category_key, subcategory, item), len(item_ordinals))
+        category_item_counts[category_key] = category_total
+
+    json_body = json.dumps(categories, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return TrainingCatalog(
+        categories=_freeze(categories),
+        category_item_counts=MappingProxyType(category_item_counts),
+        category_colors=MappingProxyType({key: category['color'] for key, category in categories.items()}),
+        total_items=sum(category_item_counts.values()),
+        item_ordinals=MappingProxyType(item_ordinals),
+        json_body=json_body,
+        version=hashlib.sha256(json_body).hexdigest()[:16],
+    )
+
+
+CATALOG = build_catalog(TRAINING_CATEGORIES)
@@ -0,0 +1,121 @@
+"""Write-behind coalescing of rapid writes to the same record.
+
+Instructors tap an item through its states within a second or two. With
+coalescing enabled, a write is answered from memory and queued under its key;
+every later write to the same key within the window replaces the queued one,
+and each window is flushed as one batch. A flush that fails is requeued
+(entries superseded in the meantime keep their newer state) and retried with
+the next window, and so are single entries the flush hands back with
+requeue(); close() flushes whatever is still queued.
+
+Queued writes live in one process only: reads on other workers, and reads of
+data derived from the writes, lag by up to one window.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class WriteCoalescer:
+    def __init__(self, window: float, flush: Callable[[Dict[Hashable, Any]], Awaitable[None]]):
+        self.window = window
+        self._flush = flush
+        self._pending: Dict[Hashable, Any] = {}
+        # Entries of the flush in progress, still the latest state until it lands
+        self._flushing: Dict[Hashable, Any] = {}
+        self._timer: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._closed = False
+        self.submitted = 0
+        self.flushed = 0
+        self.batches = 0
+        self.failures = 0
+        self.requeued = 0
+        self.dropped = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Latest queued value for ``key`` that has not been written yet"""
+        if key in self._pending:
+            return self._pending[key]
+        return self._flushing.get(key)
+
+    def submit(self, key: Hashable, value: Any):
+        self._pending[key] = value
+        self.submitted += 1
+        self._schedule()
+
+    def requeue(self, key: Hashable, value: Any):
+        """Queue an entry of the flush in progress again, e.g. after a transient
+        conflict, unless a newer write to its key is already queued"""
+        self._pending.setdefault(key, value)
+        self.requeued += 1
+        self._schedule()
+
+    def drop(self, key: Hashable):
+        """Count an entry of the flush in progress that was rejected for good"""
+        self.dropped += 1
+
+    def discard(self, predicate: Callable[[Hashable], bool]):
+        """Drop queued writes whose key matches, e.g. those of deleted records"""
+        for key in [key for key in self._pending if predicate(key)]:
+            del self._pending[key]
+
+    def _schedule(self):
+        if self._timer is None and self._pending and not self._closed:
+            self._timer = asyncio.create_task(self._flush_after_window())
+
+    async def _flush_after_window(self):
+        await asyncio.sleep(self.window)
+        self._timer = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Coalesced write flush failed, retrying with the next window: {e}")
+            self._schedule()
+
+    async def flush(self):
+        """Write everything queued so far; raises (after requeueing) if the write fails"""
+        async with self._lock:
+            if not self._pending:
+                return
+            self._flushing, self._pending = self._pending, {}
+            try:
+                await self._flush(self._flushing)
+            except Exception:
+                self.failures += 1
+                for key, value in self._flushing.items():
+                    self._pending.setdefault(key, value)
+                raise
+            else:
+                self.batches += 1
+                self.flushed += len(self._flushing)
+            finally:
+                self._flushing = {}
+
+    async def close(self):
+        self._closed = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Lost {len(self._pending)} coalesced writes on shutdown: {e}")
+        else:
+            if self._pending:
+                logger.error(f"Lost {len(self._pending)} requeued coalesced writes on shutdown")
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "window_seconds": self.window,
+            "pending": len(self._pending),
+            "submitted": self.submitted,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "failures": self.failures,
+            "requeued": self.requeued,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,72 @@
+"""MongoDB handle that connects on first use.
+
+The Motor client is created when a route, startup step or background task
+first touches the database, not at import: importing the app needs neither
+MONGO_URL nor a reachable server, and a stand-in database (e.g. one from
+mongomock-motor) can be bound before anything connects.
+"""
+from typing import Any, Optional
+
+
+class DatabaseNotConfigured(RuntimeError):
+    pass
+
+
+class Database:
+    """Forwards collection access (``db.students``, ``db["notes"]``) to the database in use"""
+
+    def __init__(self, url: Optional[str], name: Optional[str], **client_options: Any):
+        self.url = url
+        self.name = name
+        self.client_options = client_options
+        self._client = None
+        self._database = None
+        self._owns_client = False
+
+    @property
+    def connected(self) -> bool:
+        return self._database is not None
+
+    @property
+    def client(self):
+        if self._database is None:
+            self._connect()
+        return self._client
+
+    @property
+    def database(self):
+        if self._database is None:
+            self._connect()
+        return self._database
+
+    def _connect(self):
+        if not self.url or not self.name:
+            raise DatabaseNotConfigured("MONGO_URL and DB_NAME must be set to use the database")
+        # Imported here: motor is only needed once something uses the database
+        from motor.motor_asyncio import AsyncIOMotorClient
+        self._client = AsyncIOMotorClient(self.url, **self.client_options)
+        self._database = self._client[self.name]
+        self._owns_client = True
+
+    def use(self, database):
+        """Serve from ``database`` (e.g. an in-memory stand-in) instead of connecting"""
+        self.close()
+        self._database = database
+        self._client = getattr(database, "client", None)
+        self._owns_client = False
+
+    def close(self):
+        """Close the client this handle opened; the next use reconnects. A bound database stays bound."""
+        if self._owns_client:
+            self._client.close()
+            self._client = None
+            self._database = None
+            self._owns_client = False
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.database, name)
+
+    def __getitem__(self, name: str):
+        return self.database[name]
@@ -0,0 +1,56 @@
+"""Per-student change events pushed to clients as server-sent events.
+
+Write routes (or, when the database is a replica set, a MongoDB change stream
+tail) publish to an in-process broker; every open event stream of a student
+receives the events through its own bounded queue. A subscriber that falls
+too far behind gets a single "resync" event instead of the backlog and
+catches up through /api/sync.
+"""
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Set, Tuple
+
+import orjson
+
+
+Event = Tuple[str, Any]
+
+
+class EventBroker:
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+
+    def has_subscribers(self, student_id: str) -> bool:
+        return student_id in self._subscribers
+
+    def publish(self, student_id: str, event: str, data: Any):
+        """Deliver an event to every stream of a student without waiting on slow readers"""
+        subscribers = self._subscribers.get(student_id)
+        if not subscribers:
+            return
+        for queue in subscribers:
+            try:
+                queue.put_nowait((event, data))
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(("resync", {"student_id": student_id}))
+
+    @asynccontextmanager
+    async def subscribe(self, student_id: str) -> AsyncIterator["asyncio.Queue[Event]"]:
+        queue: "asyncio.Queue[Event]" = asyncio.Queue(self.queue_size)
+        self._subscribers[student_id].add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(student_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[student_id]
+
+
+def format_sse(event: str, data: Any) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
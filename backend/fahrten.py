@@ -0,0 +1,169 @@
+"""Storage encodings of the Fahrten (driving lesson) fields of a student.
+
+The API always presents them as bool lists, as in the ``Student`` model. In the
+database they are stored either that way ("array") or compactly ("compact"):
+
+- the fixed-length Überland-, Autobahn- and Nachtfahrten lists as one integer
+  "<field>_mask": bit i holds entry i and a sentinel bit above the last entry
+  records the length, so [True, False, True] is stored as 0b1101
+- practice hours as a "<field>_count" counter while every hour is completed;
+  lists holding open (False) hours stay lists
+
+Reads decode either form, so documents can be converted at any time:
+
+    python fahrten.py --to compact
+"""
+import argparse
+import asyncio
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+
+FIXED_FAHRTEN_FIELDS = ["ueberlandfahrten", "autobahnfahrten", "nachtfahrten"]
+PRACTICE_HOUR_FIELDS = ["uebungsfahrten_ganz", "uebungsfahrten_halb"]
+FAHRTEN_FIELDS = FIXED_FAHRTEN_FIELDS + PRACTICE_HOUR_FIELDS
+
+# Longest list a mask holds while staying a signed 64-bit BSON integer
+MAX_MASK_LENGTH = 62
+
+
+def encode_mask(values: List[bool]) -> int:
+    mask = 1 << len(values)
+    for index, value in enumerate(values):
+        if value:
+            mask |= 1 << index
+    return mask
+
+
+def decode_mask(mask: int) -> List[bool]:
+    return [bool(mask >> index & 1) for index in range(mask.bit_length() - 1)]
+
+
+def storage_keys(field: str) -> Tuple[str, str]:
+    """Document keys a Fahrten field may be stored under: the list and its compact form"""
+    suffix = "mask" if field in FIXED_FAHRTEN_FIELDS else "count"
+    return field, f"{field}_{suffix}"
+
+
+def expand_fahrten(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Present compactly stored Fahrten in the list shape of the Student model"""
+    for field in FIXED_FAHRTEN_FIELDS:
+        mask = doc.pop(f"{field}_mask", None)
+        if mask is not None:
+            doc[field] = decode_mask(mask)
+    for field in PRACTICE_HOUR_FIELDS:
+        count = doc.pop(f"{field}_count", None)
+        if count is not None:
+            doc[field] = [True] * count
+    return doc
+
+
+def stored_value(field: str, values: Optional[List[bool]], compact: bool) -> Tuple[str, Any]:
+    """Key and value a Fahrten list is written as; lists without a compact form stay lists"""
+    if compact and values is not None:
+        if field in FIXED_FAHRTEN_FIELDS and len(values) <= MAX_MASK_LENGTH:
+            return f"{field}_mask", encode_mask(values)
+        if field in PRACTICE_HOUR_FIELDS and all(values):
+            return f"{field}_count", len(values)
+    return field, values
+
+
+def compact_document(doc: Dict[str, Any], compact: bool) -> Dict[str, Any]:
+    """Student document for insertion with its Fahrten in the configured storage"""
+    if not compact:
+        return doc
+    for field in FAHRTEN_FIELDS:
+        if field in doc:
+            key, value = stored_value(field, doc.pop(field), compact)
+            doc[key] = value
+    return doc
+
+
+def fahrten_update(update_data: Dict[str, Any], compact: bool) -> Dict[str, Any]:
+    """Build a $set update that stores Fahrten lists in the configured storage and
+    drops their superseded encodings"""
+    update_set, update_unset = {}, {}
+    for name, value in update_data.items():
+        if name not in FAHRTEN_FIELDS:
+            update_set[name] = value
+            continue
+        key, stored = stored_value(name, value, compact)
+        update_set[key] = stored
+        update_unset.update({other: "" for other in storage_keys(name) if other != key})
+    update = {"$set": update_set}
+    if update_unset:
+        update["$unset"] = update_unset
+    return update
+
+
+async def migrate_students(collection, compact: bool, batch_size: int = 500) -> Dict[str, int]:
+    """Rewrite every student's Fahrten into compact or list storage.
+
+    Each update only matches while the stored fields are unchanged since they
+    were read, so a concurrent write is never overwritten; such students are
+    counted as skipped and converted by the next run (or their next write).
+    """
+    projection = {"_id": 0, "id": 1}
+    for field in FAHRTEN_FIELDS:
+        projection.update(dict.fromkeys(storage_keys(field), 1))
+
+    scanned, migrated, skipped = 0, 0, 0
+    batch = []
+
+    async def flush():
+        nonlocal migrated, skipped
+        result = await collection.bulk_write(batch, ordered=False)
+        migrated += result.modified_count
+        skipped += len(batch) - result.matched_count
+        batch.clear()
+
+    async for doc in collection.find({}, projection):
+        scanned += 1
+        stored = {key: value for key, value in doc.items() if key != "id"}
+        decoded = expand_fahrten(dict(stored))
+        target = {}
+        for field in FAHRTEN_FIELDS:
+            if field in decoded:
+                key, value = stored_value(field, decoded[field], compact)
+                target[key] = value
+        if target == stored:
+            continue
+
+        expected = {key: stored.get(key, {"$exists": False}) for key in projection if key not in ("_id", "id")}
+        update = {"$set": target}
+        superseded = stored.keys() - target.keys()
+        if superseded:
+            update["$unset"] = dict.fromkeys(superseded, "")
+        batch.append(UpdateOne({"id": doc["id"], **expected}, update))
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+    return {"scanned": scanned, "migrated": migrated, "skipped": skipped}
+
+
+async def main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--to", choices=["compact", "array"], required=True)
+    parser.add_argument("--batch-size", type=int, default=500)
+    options = parser.parse_args()
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    try:
+        result = await migrate_students(
+            client[os.environ['DB_NAME']].students, options.to == "compact", options.batch_size)
+    finally:
+        client.close()
+    print(f"Scanned {result['scanned']} students, migrated {result['migrated']}, "
+          f"skipped {result['skipped']} changed during the run")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
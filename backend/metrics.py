@@ -0,0 +1,283 @@
+"""Request and database timing metrics in the Prometheus text format.
+
+A pure ASGI middleware times every request per route template, and a pymongo
+command listener times every MongoDB command. Motor runs commands on executor
+threads with a copy of the caller's context, so each command's time is also
+attributed to the request in flight. That split is reported per response:
+
+    Server-Timing: db;dur=3.2;desc="2 commands", app;dur=1.1, total;dur=4.3
+
+"app" is everything outside MongoDB: validation, serialization and Python work.
+Streamed responses report the split up to their first byte. Server-sent event
+streams stay open for as long as a client listens, so their lifetime is kept
+out of the request histograms and recorded in http_stream_duration_seconds.
+
+A pymongo pool listener tracks connections per server and how long commands
+wait to check one out, which shows pool saturation before requests time out.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+from starlette.datastructures import MutableHeaders
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds in seconds, from fast cached reads to slow aggregations
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Event streams last from a page view to a whole lesson
+STREAM_BUCKETS = (1.0, 10.0, 60.0, 300.0, 900.0, 1800.0, 3600.0, 7200.0, 14400.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set; safe to observe from executor threads"""
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str],
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (last one is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[bisect_left(self.buckets, value)] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in snapshot:
+            label_text = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            prefix = f"{label_text}," if label_text else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {series[-2]}")
+            lines.append(f"{self.name}_count{{{label_text}}} {series[-1]}")
+        return lines
+
+
+class RequestTiming:
+    """MongoDB time accumulated by one request"""
+    __slots__ = ("db_seconds", "db_commands")
+
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.db_commands = 0
+
+    def server_timing(self, total_seconds: float) -> str:
+        db_ms = self.db_seconds * 1000
+        total_ms = total_seconds * 1000
+        commands = f"{self.db_commands} command{'' if self.db_commands == 1 else 's'}"
+        return (f'db;dur={db_ms:.1f};desc="{commands}", '
+                f"app;dur={max(0.0, total_ms - db_ms):.1f}, total;dur={total_ms:.1f}")
+
+
+_current_request: ContextVar[Optional[RequestTiming]] = ContextVar("current_request", default=None)
+
+
+class CommandTimer(monitoring.CommandListener):
+    """Times MongoDB commands per command and collection, and per request in flight"""
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+        self._collections: Dict[Tuple[object, int], str] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        collection = event.command.get(event.command_name)
+        if isinstance(collection, str):
+            with self._lock:
+                self._collections[(event.connection_id, event.request_id)] = collection
+
+    def _record(self, event, outcome: str):
+        with self._lock:
+            collection = self._collections.pop((event.connection_id, event.request_id), "")
+        seconds = event.duration_micros / 1_000_000
+        self.histogram.observe((event.command_name, collection, outcome), seconds)
+        timing = _current_request.get()
+        if timing is not None:
+            with self._lock:
+                timing.db_seconds += seconds
+                timing.db_commands += 1
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        self._record(event, "succeeded")
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        self._record(event, "failed")
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Connection counts and checkout waits per server, from pool events.
+
+    Checkouts run on the executor thread issuing the command, so the wait is
+    measured between the started and checked-out (or failed) events of a thread.
+    """
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+        self._servers: Dict[str, Dict[str, float]] = {}
+        self._checkout_started = threading.local()
+        self._lock = threading.Lock()
+
+    def _server(self, address) -> Dict[str, float]:
+        server = f"{address[0]}:{address[1]}"
+        stats = self._servers.get(server)
+        if stats is None:
+            stats = self._servers[server] = {
+                "open": 0, "in_use": 0, "waiting": 0, "checkouts": 0,
+                "checkout_timeouts": 0, "checkout_errors": 0, "clears": 0,
+                "wait_seconds_total": 0.0, "wait_seconds_max": 0.0,
+            }
+        return stats
+
+    def _count(self, address, **deltas):
+        with self._lock:
+            stats = self._server(address)
+            for key, delta in deltas.items():
+                stats[key] += delta
+
+    def _end_wait(self, address, **deltas):
+        started = getattr(self._checkout_started, "value", None)
+        self._checkout_started.value = None
+        waited = time.perf_counter() - started if started is not None else 0.0
+        with self._lock:
+            stats = self._server(address)
+            for key, delta in deltas.items():
+                stats[key] += delta
+            stats["waiting"] -= 1
+            stats["wait_seconds_total"] += waited
+            stats["wait_seconds_max"] = max(stats["wait_seconds_max"], waited)
+        self.histogram.observe((f"{address[0]}:{address[1]}",), waited)
+
+    def pool_created(self, event):
+        self._count(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._count(event.address, clears=1)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._count(event.address, open=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._count(event.address, open=-1)
+
+    def connection_check_out_started(self, event):
+        self._checkout_started.value = time.perf_counter()
+        self._count(event.address, waiting=1)
+
+    def connection_check_out_failed(self, event):
+        if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+            self._end_wait(event.address, checkout_timeouts=1)
+        else:
+            self._end_wait(event.address, checkout_errors=1)
+
+    def connection_checked_out(self, event):
+        self._end_wait(event.address, in_use=1, checkouts=1)
+
+    def connection_checked_in(self, event):
+        self._count(event.address, in_use=-1)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            servers = {server: dict(stats) for server, stats in self._servers.items()}
+        for stats in servers.values():
+            checkouts = stats["checkouts"] + stats["checkout_timeouts"] + stats["checkout_errors"]
+            wait_seconds_total = stats.pop("wait_seconds_total")
+            stats["wait_ms_avg"] = round(wait_seconds_total / checkouts * 1000, 3) if checkouts else 0.0
+            stats["wait_ms_max"] = round(stats.pop("wait_seconds_max") * 1000, 3)
+        return servers
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.requests = Histogram(
+            "http_request_duration_seconds", "Request latency per route template", ("method", "route", "status"))
+        self.request_db = Histogram(
+            "http_request_db_seconds", "Time spent in MongoDB commands per request", ("method", "route"))
+        self.streams = Histogram(
+            "http_stream_duration_seconds", "Lifetime of server-sent event streams per route", ("method", "route"),
+            buckets=STREAM_BUCKETS)
+        self.db_commands = Histogram(
+            "mongodb_command_duration_seconds", "MongoDB command latency", ("command", "collection", "outcome"))
+        self.pool_wait = Histogram(
+            "mongodb_pool_checkout_wait_seconds", "Time waited for a pooled connection", ("server",))
+        self.pool = PoolStats(self.pool_wait)
+
+    def command_listener(self) -> CommandTimer:
+        return CommandTimer(self.db_commands)
+
+    def render(self) -> str:
+        lines = []
+        for histogram in (self.requests, self.request_db, self.streams, self.db_commands, self.pool_wait):
+            lines.extend(histogram.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Records request latency and MongoDB time per route and adds a Server-Timing header"""
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = _current_request.set(timing)
+        started = time.perf_counter()
+        status = 500
+        event_stream = False
+
+        async def send_with_timing(message):
+            nonlocal status, event_stream
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timing.server_timing(time.perf_counter() - started))
+                event_stream = headers.get("content-type", "").startswith("text/event-stream")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_request.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            if event_stream:
+                self.registry.streams.observe((scope["method"], route_path), time.perf_counter() - started)
+            else:
+                self.registry.requests.observe((scope["method"], route_path, str(status)), time.perf_counter() - started)
+                self.registry.request_db.observe((scope["method"], route_path), timing.db_seconds)
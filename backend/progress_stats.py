@@ -0,0 +1,111 @@
+"""Progress statistics engine.
+
+Statistics are derived from per-category counts of the completed statuses
+("summaries"). A single student's summary is maintained incrementally by the
+API; :func:`summarize_batch` recounts many students at once from status-code
+arrays so reports do not need one request per student. numpy is imported
+by those functions only, which keeps it out of the API's startup.
+"""
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Tuple
+
+from catalog import CATALOG
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# Weighted scoring per completion level: / = 25%, × = 60%, ⊗ = 100%
+STATUS_WEIGHTS = {'once': 25, 'twice': 60, 'thrice': 100}
+COMPLETED_STATUSES = list(STATUS_WEIGHTS)
+
+# Status code 0 is "not completed"; codes index WEIGHT_TABLE
+STATUS_CODES = {status: code for code, status in enumerate(COMPLETED_STATUSES, start=1)}
+WEIGHT_TABLE = (0,) + tuple(STATUS_WEIGHTS[status] for status in COMPLETED_STATUSES)
+
+# Category codes follow catalog order; records of categories outside the
+# catalog share one trailing code that only counts towards total_completed
+CATEGORY_KEYS = tuple(CATALOG.category_item_counts)
+CATEGORY_CODES = {category: code for code, category in enumerate(CATEGORY_KEYS)}
+OTHER_CATEGORY_CODE = len(CATEGORY_KEYS)
+
+
+def empty_category_summary() -> Dict[str, int]:
+    return {'once': 0, 'twice': 0, 'thrice': 0, 'weighted_score': 0}
+
+
+def build_progress_stats(summary: Dict[str, Any]) -> Dict[str, Any]:
+    """Per-category statistics from a progress summary document"""
+    stats = {}
+
+    for category_key, total_items in CATALOG.category_item_counts.items():
+        counts = summary['categories'].get(category_key) or empty_category_summary()
+        completed_items = {status: counts[status] for status in COMPLETED_STATUSES}
+        max_possible_score = total_items * 100  # Each item can have max 100% completion
+
+        # Use weighted percentage instead of simple completion
+        completion_percentage = round((counts['weighted_score'] / max_possible_score * 100) if max_possible_score > 0 else 0)
+
+        stats[category_key] = {
+            'total_items': total_items,
+            'completed_items': completed_items,
+            'total_completed': sum(completed_items.values()),
+            'completion_percentage': completion_percentage,
+            'color': CATALOG.category_colors[category_key]
+        }
+
+    return stats
+
+
+def encode_records(student_ids: List[str],
+                   records: Iterable[Dict[str, Any]]) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """Encode progress records as (student, category, status) code arrays in one pass.
+
+    Records of students outside ``student_ids`` are dropped.
+    """
+    import numpy as np
+
+    student_codes = {student_id: code for code, student_id in enumerate(student_ids)}
+    student_column, category_column, status_column = [], [], []
+    for record in records:
+        student_code = student_codes.get(record['student_id'])
+        if student_code is None:
+            continue
+        student_column.append(student_code)
+        category_column.append(CATEGORY_CODES.get(record['category'], OTHER_CATEGORY_CODE))
+        status_column.append(STATUS_CODES.get(record['status'], 0))
+    return (
+        np.array(student_column, dtype=np.int64),
+        np.array(category_column, dtype=np.int64),
+        np.array(status_column, dtype=np.int64),
+    )
+
+
+def summarize_batch(student_ids: List[str], student_codes: "np.ndarray", category_codes: "np.ndarray",
+                    status_codes: "np.ndarray") -> Dict[str, Dict[str, Any]]:
+    """Summaries for many students from code arrays, counted with one bincount"""
+    import numpy as np
+
+    n_students, n_categories, n_statuses = len(student_ids), OTHER_CATEGORY_CODE + 1, len(WEIGHT_TABLE)
+    flat_index = (student_codes * n_categories + category_codes) * n_statuses + status_codes
+    counts = np.bincount(flat_index, minlength=n_students * n_categories * n_statuses)
+    counts = counts.reshape(n_students, n_categories, n_statuses)
+
+    weighted_scores = counts @ np.array(WEIGHT_TABLE, dtype=np.int64)  # (students, categories)
+    total_completed = counts[:, :, 1:].sum(axis=(1, 2))
+
+    summaries = {}
+    for student_code, student_id in enumerate(student_ids):
+        student_counts = counts[student_code].tolist()
+        student_scores = weighted_scores[student_code].tolist()
+        summaries[student_id] = {
+            'student_id': student_id,
+            'total_completed': int(total_completed[student_code]),
+            'categories': {
+                category: {
+                    **{status: student_counts[category_code][STATUS_CODES[status]] for status in COMPLETED_STATUSES},
+                    'weighted_score': student_scores[category_code],
+                }
+                for category_code, category in enumerate(CATEGORY_KEYS)
+            },
+        }
+    return summaries
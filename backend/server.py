@@ -1,31 +1,217 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Query, Query
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, IndexModel, ReadPreference, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
 import os
+import asyncio
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, ValidationError, create_model
+from typing import List, Optional, Dict, Any, Tuple
+from functools import lru_cache, partial
+from contextlib import asynccontextmanager
+from collections import defaultdict
 import uuid
+import json
+import time
 from datetime import datetime
 from enum import Enum
 
+import analytics
+import bulk_io
+from cache import CACHE_KINDS, StudentCache, create_backend
+from catalog import CATALOG
+from coalescing import WriteCoalescer
+from database import Database
+from events import EventBroker, format_sse
+from fahrten import (
+    FIXED_FAHRTEN_FIELDS,
+    PRACTICE_HOUR_FIELDS,
+    compact_document,
+    expand_fahrten,
+    fahrten_update,
+    migrate_students,
+)
+from metrics import PROMETHEUS_CONTENT_TYPE, MetricsMiddleware, MetricsRegistry
+from progress_stats import (
+    COMPLETED_STATUSES,
+    STATUS_WEIGHTS,
+    build_progress_stats,
+    empty_category_summary,
+    encode_records,
+    summarize_batch,
+)
+from serialization import dumps_line, trusted_record
+import sync
+
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Per-route latency, MongoDB command timing and Server-Timing headers, exposed
+# on /api/metrics in the Prometheus text format
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+
+# MongoDB connection, opened on first use (see database.py)
+MONGO_URL = os.environ.get('MONGO_URL')
+DB_NAME = os.environ.get('DB_NAME')
+
+# Connection pool and driver settings; unset values keep the driver defaults
+# (100 connections, unbounded wait for a free one, 30 s server selection,
+# primary reads, no compression). "zlib" compression needs no extra package,
+# "snappy" and "zstd" need python-snappy and zstandard.
+MONGO_CLIENT_OPTIONS = {
+    option: value
+    for option, value in (
+        ("maxPoolSize", os.environ.get('MONGO_MAX_POOL_SIZE')),
+        ("minPoolSize", os.environ.get('MONGO_MIN_POOL_SIZE')),
+        ("waitQueueTimeoutMS", os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS')),
+        ("serverSelectionTimeoutMS", os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS')),
+        ("readPreference", os.environ.get('MONGO_READ_PREFERENCE')),
+        ("compressors", os.environ.get('MONGO_COMPRESSORS')),
+    )
+    if value
+}
+
+# Serve the collection-wide lists (students, roster, export) and analytics from
+# secondaries when available. These tolerate replication lag; per-student reads
+# stay on the primary because they follow writes and refill the read cache.
+SECONDARY_READS = os.environ.get('SECONDARY_READS', 'false').lower() == 'true'
+
+# Seconds /api/health waits for a MongoDB ping before reporting it unavailable
+HEALTH_PING_TIMEOUT = float(os.environ.get('HEALTH_PING_TIMEOUT', '2'))
+
+# Check the query plans of the hot lookups at startup and warn on collection scans
+VERIFY_QUERY_PLANS = os.environ.get('VERIFY_QUERY_PLANS', 'true').lower() == 'true'
+
+# Fahrten lists are stored as bool lists ("array") or as integer bitmasks and
+# practice-hour counters ("compact", see fahrten.py). Reads accept both forms;
+# documents are converted on their next write or by the migration tool.
+FAHRTEN_STORAGE = os.environ.get('FAHRTEN_STORAGE', 'array')
+COMPACT_FAHRTEN = FAHRTEN_STORAGE == 'compact'
+
+# Record when a practice hour was last added, as "<field>_last_added_at" of the student
+PRACTICE_HOURS_TIMESTAMPS = os.environ.get('PRACTICE_HOURS_TIMESTAMPS', 'false').lower() == 'true'
+
+# Seconds analytics results are served from memory; 0 disables the cache
+ANALYTICS_CACHE_TTL = float(os.environ.get('ANALYTICS_CACHE_TTL', '0'))
+
+# Per-student read cache (student, progress list, progress summary): number of
+# students kept in memory and seconds an entry stays valid; either set to 0
+# disables it. CACHE_URL=redis://host:port/db shares the cache between workers.
+STUDENT_CACHE_SIZE = int(os.environ.get('STUDENT_CACHE_SIZE', '1024'))
+STUDENT_CACHE_TTL = float(os.environ.get('STUDENT_CACHE_TTL', '30'))
+CACHE_URL = os.environ.get('CACHE_URL')
+
+# Students validated and inserted per insert_many during bulk imports, and the
+# number of row errors (and of skipped lines) reported back in the import response
+IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', '500'))
+MAX_IMPORT_ERRORS = int(os.environ.get('MAX_IMPORT_ERRORS', '100'))
+
+# Delta sync: changes reserved less than this many seconds ago are delivered
+# but not yet covered by the returned token (see sync.py), and the most
+# changes one /sync response returns
+SYNC_SETTLE_SECONDS = float(os.environ.get('SYNC_SETTLE_SECONDS', '5'))
+MAX_SYNC_CHANGES = int(os.environ.get('MAX_SYNC_CHANGES', '1000'))
+
+# Per-student change events over server-sent events. With a replica set they
+# come from a MongoDB change stream, which also carries other workers' writes;
+# otherwise each write route publishes within its own process.
+# CHANGE_STREAM_EVENTS: "auto" (use a change stream when available), "true", "false"
+CHANGE_STREAM_EVENTS = os.environ.get('CHANGE_STREAM_EVENTS', 'auto').lower()
+EVENT_HEARTBEAT_SECONDS = float(os.environ.get('EVENT_HEARTBEAT_SECONDS', '15'))
+EVENT_QUEUE_SIZE = int(os.environ.get('EVENT_QUEUE_SIZE', '100'))
+
+# Seconds during which progress writes to the same item are collapsed into the
+# last one and then flushed with all others as one bulk write; 0 writes every
+# tap through. Queued writes are per worker, so reads lag by up to one window.
+PROGRESS_COALESCE_WINDOW = float(os.environ.get('PROGRESS_COALESCE_WINDOW', '0'))
+
+# Run cascading deletes inside a session transaction (requires a replica set)
+DELETE_IN_TRANSACTION = os.environ.get('DELETE_IN_TRANSACTION', 'false').lower() == 'true'
 
-# Create the main app without a prefix
-app = FastAPI()
+# Seconds between sweeps for progress, notes and summaries of deleted students;
+# 0 disables the periodic sweeper
+ORPHAN_SWEEP_INTERVAL = float(os.environ.get('ORPHAN_SWEEP_INTERVAL', '3600'))
+
+# Seconds between checks of the stored progress summaries against a recount of
+# the records (0 disables them), and how long a summary that looks drifted is
+# watched before it is replaced (a tap between its record write and its $inc
+# looks like drift for that long)
+SUMMARY_RECONCILE_INTERVAL = float(os.environ.get('SUMMARY_RECONCILE_INTERVAL', '3600'))
+SUMMARY_SETTLE_SECONDS = float(os.environ.get('SUMMARY_SETTLE_SECONDS', '5'))
+
+# Students whose summaries are recounted per aggregation while reconciling
+SUMMARY_RECONCILE_CHUNK = 500
+
+# Collections holding per-student records that are deleted with the student
+DEPENDENT_COLLECTIONS = ["progress", "notes", "progress_summary"]
+
+# Upper bound for the page size of keyset-paginated list routes
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', '1000'))
+
+# Upper bound for entries accepted by a single progress batch request
+MAX_PROGRESS_BATCH = int(os.environ.get('MAX_PROGRESS_BATCH', '1000'))
+
+# Rounds a bulk progress write retries items another writer changed under it
+PROGRESS_WRITE_ATTEMPTS = 5
+
+# Cache lifetime for the static training catalog; requests that pin the current
+# catalog version via ?v= may be cached indefinitely
+CATALOG_MAX_AGE = int(os.environ.get('CATALOG_MAX_AGE', '3600'))
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
+class AppServices:
+    """State of one app: its database handle, metrics, per-student read cache,
+    change event broker, progress write coalescer and background tasks.
+
+    create_app builds one per app and keeps it on ``app.state.services``;
+    routes receive it (or just its database) through Depends, and the
+    lifespan starts and closes it. Nothing connects until first use.
+    """
+
+    def __init__(self, database=None):
+        self.metrics = MetricsRegistry()
+        self.db = Database(
+            MONGO_URL,
+            DB_NAME,
+            event_listeners=[self.metrics.pool] + ([self.metrics.command_listener()] if METRICS_ENABLED else []),
+            **MONGO_CLIENT_OPTIONS
+        )
+        if database is not None:
+            self.db.use(database)
+        self.student_cache = StudentCache(
+            # One key per cached kind plus the student's generation counter
+            create_backend(CACHE_URL, max_keys=STUDENT_CACHE_SIZE * (len(CACHE_KINDS) + 1)),
+            ttl=STUDENT_CACHE_TTL if STUDENT_CACHE_SIZE > 0 else 0
+        )
+        self.event_broker = EventBroker(queue_size=EVENT_QUEUE_SIZE)
+        # Set while a change stream tail publishes the events instead of the write routes
+        self.change_stream_active = False
+        self.progress_coalescer = (
+            WriteCoalescer(PROGRESS_COALESCE_WINDOW, partial(flush_progress_writes, self))
+            if PROGRESS_COALESCE_WINDOW > 0 else None
+        )
+        self.analytics_cache: Dict[str, Tuple[float, Any]] = {}
+        self.background_tasks: List[asyncio.Task] = []
+
+    def read_db(self):
+        """Database for lag-tolerant reads, see SECONDARY_READS"""
+        if SECONDARY_READS:
+            return self.db.with_options(read_preference=ReadPreference.SECONDARY_PREFERRED)
+        return self.db
+
+def get_services(request: Request) -> AppServices:
+    return request.app.state.services
+
+def get_db(services: AppServices = Depends(get_services)) -> Database:
+    return services.db
+
 
 # Enums for progress tracking
 class ProgressStatus(str, Enum):
@@ -48,6 +234,7 @@ class Student(BaseModel):
     practical_exam_date: Optional[str] = None
     practical_exam_passed: Optional[bool] = None
     license_number: Optional[str] = None
+    instructor: Optional[str] = None
     instructor_notes: Optional[str] = None
     # Fahrten-Tracking
     ueberlandfahrten: Optional[List[bool]] = Field(default_factory=lambda: [False] * 5)
@@ -55,6 +242,9 @@ class Student(BaseModel):
     nachtfahrten: Optional[List[bool]] = Field(default_factory=lambda: [False] * 3)
     uebungsfahrten_ganz: Optional[List[bool]] = Field(default_factory=list)  # Ganze Stunden - unlimited
     uebungsfahrten_halb: Optional[List[bool]] = Field(default_factory=list)  # Halbe Stunden - unlimited
+    # When a practice hour was last added; recorded with PRACTICE_HOURS_TIMESTAMPS
+    uebungsfahrten_ganz_last_added_at: Optional[datetime] = None
+    uebungsfahrten_halb_last_added_at: Optional[datetime] = None
     start_date: datetime = Field(default_factory=datetime.utcnow)
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -70,6 +260,7 @@ class StudentCreate(BaseModel):
     practical_exam_date: Optional[str] = None
     practical_exam_passed: Optional[bool] = None
     license_number: Optional[str] = None
+    instructor: Optional[str] = None
     instructor_notes: Optional[str] = None
     # Fahrten-Tracking
     ueberlandfahrten: Optional[List[bool]] = None
@@ -92,6 +283,13 @@ class ProgressUpdate(BaseModel):
     status: ProgressStatus
     notes: Optional[str] = None
 
+class ProgressBatchEntry(BaseModel):
+    category: str
+    subcategory: str
+    item: str
+    status: ProgressStatus
+    notes: Optional[str] = None
+
 class Note(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     student_id: str
@@ -108,783 +306,1341 @@ class NoteCreate(BaseModel):
     item: str
     note_text: str
 
+class StudentBulkDelete(BaseModel):
+    student_ids: List[str]
+
+class ProgressStatsBatchRequest(BaseModel):
+    student_ids: Optional[List[str]] = None  # All students when omitted
+
+class OverallProgress(BaseModel):
+    total_items: int
+    total_completed: int
+    completion_percentage: int
+
+class StudentRosterEntry(Student):
+    overall_progress: OverallProgress
+
+def student_from_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return trusted_record(Student, expand_fahrten(doc))
+
+def parse_student_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Validate a ?fields= sparse fieldset; "id" is always included"""
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(',') if name.strip()}
+    unknown = requested - set(Student.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(sorted(requested | {"id"}))
+
+def student_projection(fields: Optional[Tuple[str, ...]]) -> Optional[Dict[str, int]]:
+    if fields is None:
+        return None
+    projection = {"_id": 0}
+    for name in fields:
+        projection[name] = 1
+        if name in FIXED_FAHRTEN_FIELDS:
+            projection[f"{name}_mask"] = 1
+        elif name in PRACTICE_HOUR_FIELDS:
+            projection[f"{name}_count"] = 1
+    return projection
+
+@lru_cache(maxsize=64)
+def student_fields_model(fields: Tuple[str, ...]):
+    """Lightweight response model holding only the requested Student fields"""
+    return create_model(
+        "StudentFields",
+        **{name: (Student.model_fields[name].annotation, Student.model_fields[name]) for name in fields}
+    )
+
+def student_loader(fields: Optional[Tuple[str, ...]]):
+    if fields is None:
+        return student_from_doc
+    model = student_fields_model(fields)
+    return lambda doc: trusted_record(model, expand_fahrten(doc))
+
+def build_overall_progress(total_items: int, total_completed: int) -> Dict[str, int]:
+    completion_percentage = round((total_completed / total_items * 100) if total_items > 0 else 0)
+    return {
+        'total_items': total_items,
+        'total_completed': total_completed,
+        'completion_percentage': completion_percentage
+    }
+
+# Change sequence for delta sync: every write stamps what it touches
+async def reserve_change_seqs(db: Database, count: int = 1) -> int:
+    """Reserve ``count`` consecutive change sequence numbers; returns the first"""
+    counter = await db.counters.find_one_and_update(
+        {"_id": "change_seq"},
+        {"$inc": {"value": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter["value"] - count + 1
+
+def change_stamp(change_seq: int) -> Dict[str, Any]:
+    return {"change_seq": change_seq, "changed_at": datetime.utcnow()}
+
+async def record_tombstones(db: Database, kind: str, docs: List[Dict[str, Any]], session=None):
+    """Leave a tombstone per deleted record ({"id", optionally "student_id"}) for delta sync"""
+    if not docs:
+        return
+    # Reserved outside any transaction: a shared counter would make concurrent transactions conflict
+    first_seq = await reserve_change_seqs(db, len(docs))
+    await db.tombstones.insert_many(
+        [{"type": kind, **doc, **change_stamp(first_seq + offset)} for offset, doc in enumerate(docs)],
+        session=session
+    )
+
+# Change events: published by the write routes unless the change stream delivers them
+def publish_event(services: AppServices, student_id: str, event: str, data: Any):
+    if not services.change_stream_active:
+        services.event_broker.publish(student_id, event, data)
+
+async def publish_progress_stats(services: AppServices, student_id: str):
+    if not services.change_stream_active and services.event_broker.has_subscribers(student_id):
+        summary = await get_progress_summary(services, student_id)
+        services.event_broker.publish(student_id, "stats", build_progress_stats(summary))
+
+# List helpers: keyset pagination on "id" and NDJSON streaming
+def paginated_find(collection, query: Dict[str, Any], after: Optional[str], limit: Optional[int],
+                   projection: Optional[Dict[str, int]] = None):
+    """Cursor over ``query``; ordered by id when paginating so ``after`` is a stable key"""
+    if after is None and limit is None:
+        return collection.find(query, projection)
+    if after is not None:
+        query = {**query, "id": {"$gt": after}}
+    cursor = collection.find(query, projection).sort("id", ASCENDING)
+    if limit is not None:
+        cursor = cursor.limit(limit)
+    return cursor
+
+async def list_response(cursor, to_model, response: Response, limit: Optional[int], format: str):
+    """Materialize a cursor into models, or stream it as NDJSON when requested"""
+    if format == "ndjson" and limit is None:
+        async def ndjson_lines():
+            async for doc in cursor:
+                yield dumps_line(to_model(doc))
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson", headers=response.headers)
+
+    # Headers precede the body, so a page (at most MAX_PAGE_SIZE) is read in
+    # full even as NDJSON to tell whether it is full
+    docs = [doc async for doc in cursor]
+    if limit is not None and len(docs) == limit:
+        # A full page: clients continue with ?after=<X-Next-After>
+        response.headers["X-Next-After"] = docs[-1]["id"]
+    if format == "ndjson":
+        return Response(b"".join(dumps_line(to_model(doc)) for doc in docs),
+                        media_type="application/x-ndjson", headers=response.headers)
+    return ORJSONResponse([to_model(doc) for doc in docs], headers=response.headers)
+
 # Student Management Routes
 @api_router.post("/students", response_model=Student)
-async def create_student(student: StudentCreate):
+async def create_student(student: StudentCreate, services: AppServices = Depends(get_services)):
     student_dict = student.dict()
     student_obj = Student(**student_dict)
-    result = await db.students.insert_one(student_obj.dict())
+    student_doc = compact_document(student_obj.dict(), COMPACT_FAHRTEN)
+    student_doc.update(change_stamp(await reserve_change_seqs(services.db)))
+    result = await services.db.students.insert_one(student_doc)
     if result.inserted_id:
+        await services.student_cache.invalidate(student_obj.id)
         return student_obj
     raise HTTPException(status_code=400, detail="Failed to create student")
 
 @api_router.get("/students", response_model=List[Student])
-async def get_students():
-    students = await db.students.find().to_list(1000)
-    return [Student(**student) for student in students]
+async def get_students(
+    response: Response,
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    fields: Optional[str] = None,
+    services: AppServices = Depends(get_services)
+):
+    selected_fields = parse_student_fields(fields)
+    cursor = paginated_find(services.read_db().students, {}, after, limit, student_projection(selected_fields))
+    return await list_response(cursor, student_loader(selected_fields), response, limit, format)
+
+@api_router.get("/students/roster", response_model=List[StudentRosterEntry])
+async def get_student_roster(
+    response: Response,
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    services: AppServices = Depends(get_services)
+):
+    """Return all students with their overall progress in a single response"""
+    selected_fields = parse_student_fields(fields)
+    students = await paginated_find(
+        services.read_db().students, {}, after, limit, student_projection(selected_fields)
+    ).to_list(None)
+    if limit is not None and len(students) == limit:
+        response.headers["X-Next-After"] = students[-1]["id"]
+    student_ids = [student["id"] for student in students]
+
+    # One read of the maintained summaries instead of one query per student
+    summaries = await get_progress_summaries(services.db, student_ids)
+    completed_counts = {student_id: summary["total_completed"] for student_id, summary in summaries.items()}
+
+    if selected_fields is not None:
+        load_student = student_loader(selected_fields)
+        roster = [
+            {
+                **load_student(student),
+                "overall_progress": build_overall_progress(CATALOG.total_items, completed_counts.get(student["id"], 0))
+            }
+            for student in students
+        ]
+    else:
+        roster = [
+            trusted_record(StudentRosterEntry, {
+                **expand_fahrten(student),
+                "overall_progress": build_overall_progress(CATALOG.total_items, completed_counts.get(student["id"], 0))
+            })
+            for student in students
+        ]
+    return ORJSONResponse(roster, headers=response.headers)
 
 @api_router.get("/students/{student_id}", response_model=Student)
-async def get_student(student_id: str):
-    student = await db.students.find_one({"id": student_id})
+async def get_student(student_id: str, fields: Optional[str] = None, services: AppServices = Depends(get_services)):
+    db = services.db
+    selected_fields = parse_student_fields(fields)
+    if selected_fields is not None:
+        student = await db.students.find_one({"id": student_id}, student_projection(selected_fields))
+        if student:
+            return ORJSONResponse(student_loader(selected_fields)(student))
+        raise HTTPException(status_code=404, detail="Student not found")
+
+    async def load_student():
+        student = await db.students.find_one({"id": student_id})
+        return jsonable_encoder(student_from_doc(student)) if student else None
+
+    student = await services.student_cache.get_or_load(student_id, "student", load_student)
     if student:
-        return Student(**student)
+        return ORJSONResponse(student)
     raise HTTPException(status_code=404, detail="Student not found")
 
 @api_router.put("/students/{student_id}", response_model=Student)
-async def update_student(student_id: str, student_update: StudentCreate):
+async def update_student(student_id: str, student_update: StudentCreate, services: AppServices = Depends(get_services)):
     update_data = student_update.dict(exclude_unset=True)
-    result = await db.students.update_one(
-        {"id": student_id}, 
-        {"$set": update_data}
+    update_data.update(change_stamp(await reserve_change_seqs(services.db)))
+    updated_student = await services.db.students.find_one_and_update(
+        {"id": student_id},
+        fahrten_update(update_data, COMPACT_FAHRTEN),
+        return_document=ReturnDocument.AFTER
     )
-    if result.modified_count:
-        updated_student = await db.students.find_one({"id": student_id})
-        return Student(**updated_student)
+    if updated_student:
+        await services.student_cache.invalidate(student_id)
+        student = student_from_doc(updated_student)
+        publish_event(services, student_id, "student", student)
+        return student
     raise HTTPException(status_code=404, detail="Student not found")
 
+async def delete_students_cascading(services: AppServices, student_ids: List[str]) -> int:
+    """Delete students with their progress, notes and summaries; returns the number of students deleted"""
+    db = services.db
+    student_filter = {"id": {"$in": student_ids}}
+    dependent_filter = {"student_id": {"$in": student_ids}}
+
+    if DELETE_IN_TRANSACTION:
+        # All or nothing; operations within one session must not overlap, so the
+        # deletes run one after another inside the transaction
+        async def delete_in_transaction(session):
+            deleted_ids = await db.students.distinct("id", student_filter, session=session)
+            result = await db.students.delete_many(student_filter, session=session)
+            if result.deleted_count:
+                for collection_name in DEPENDENT_COLLECTIONS:
+                    await db[collection_name].delete_many(dependent_filter, session=session)
+                await record_tombstones(db, "student", [{"id": sid} for sid in deleted_ids], session=session)
+            return deleted_ids, result.deleted_count
+
+        async with await db.client.start_session() as session:
+            # Reruns the whole transaction on transient errors (e.g. write
+            # conflicts, elections) and retries commits with an unknown outcome
+            deleted_ids, deleted_count = await session.with_transaction(delete_in_transaction)
+    else:
+        # Dependents of a deleted student are only reachable through it, so they
+        # can go concurrently; anything a failure leaves behind is swept later
+        deleted_ids = await db.students.distinct("id", student_filter)
+        deleted_count = (await db.students.delete_many(student_filter)).deleted_count
+        if deleted_count:
+            await asyncio.gather(
+                *[db[collection_name].delete_many(dependent_filter) for collection_name in DEPENDENT_COLLECTIONS],
+                # A student's tombstone also retires its progress and notes on the client
+                record_tombstones(db, "student", [{"id": sid} for sid in deleted_ids])
+            )
+
+    if services.progress_coalescer:
+        deleted = set(student_ids)
+        services.progress_coalescer.discard(lambda key: key[0] in deleted)
+    for student_id in student_ids:
+        await services.student_cache.invalidate(student_id)
+    if deleted_count:
+        for student_id in deleted_ids:
+            publish_event(services, student_id, "deleted", {"type": "student", "id": student_id})
+    return deleted_count
+
 @api_router.delete("/students/{student_id}")
-async def delete_student(student_id: str):
-    result = await db.students.delete_one({"id": student_id})
-    if result.deleted_count:
-        # Also delete all related progress and notes
-        await db.progress.delete_many({"student_id": student_id})
-        await db.notes.delete_many({"student_id": student_id})
+async def delete_student(student_id: str, services: AppServices = Depends(get_services)):
+    if await delete_students_cascading(services, [student_id]):
         return {"message": "Student deleted successfully"}
     raise HTTPException(status_code=404, detail="Student not found")
 
+@api_router.post("/students:delete")
+async def delete_students(request: StudentBulkDelete, services: AppServices = Depends(get_services)):
+    """Delete many students (e.g. graduates) with all their related records"""
+    deleted_count = await delete_students_cascading(services, request.student_ids)
+    return {"deleted_count": deleted_count}
+
 # Progress Management Routes
 @api_router.get("/students/{student_id}/progress", response_model=List[TrainingProgress])
-async def get_student_progress(student_id: str):
-    progress_records = await db.progress.find({"student_id": student_id}).to_list(1000)
-    return [TrainingProgress(**record) for record in progress_records]
+async def get_student_progress(
+    student_id: str,
+    response: Response,
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    services: AppServices = Depends(get_services)
+):
+    db = services.db
+    if after is None and limit is None and format == "json":
+        async def load_progress():
+            return [
+                jsonable_encoder(trusted_record(TrainingProgress, record))
+                async for record in db.progress.find({"student_id": student_id})
+            ]
+        return ORJSONResponse(await services.student_cache.get_or_load(student_id, "progress", load_progress))
 
-@api_router.post("/students/{student_id}/progress", response_model=TrainingProgress)
-async def create_or_update_progress(student_id: str, category: str, subcategory: str, item: str, progress: ProgressUpdate):
-    # Check if progress record already exists
-    existing = await db.progress.find_one({
+    cursor = paginated_find(db.progress, {"student_id": student_id}, after, limit)
+    return await list_response(
+        cursor, lambda record: trusted_record(TrainingProgress, record), response, limit, format
+    )
+
+# Progress Summary: one denormalized document per student holding completed
+# counts and the weighted score per category, kept current with $inc on every
+# status transition so the stats routes need a single indexed read
+def summary_transition(category: str, old_status: Optional[str], new_status: Optional[str]) -> Dict[str, int]:
+    """$inc document moving one record from ``old_status`` to ``new_status``"""
+    inc = defaultdict(int)
+    for status, sign in ((old_status, -1), (new_status, 1)):
+        status = ProgressStatus(status).value if status else None
+        if status in STATUS_WEIGHTS:
+            inc["total_completed"] += sign
+            # Per-category counters only exist for catalog categories, which also
+            # keeps arbitrary client-supplied keys out of the update paths
+            if category in CATALOG.category_item_counts:
+                inc[f"categories.{category}.{status}"] += sign
+                inc[f"categories.{category}.weighted_score"] += sign * STATUS_WEIGHTS[status]
+    return {path: delta for path, delta in inc.items() if delta}
+
+async def count_progress_summaries(db: Database, student_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Recount summaries from the progress records with one $group, without storing them"""
+    summaries = {
+        student_id: {
+            "student_id": student_id,
+            "total_completed": 0,
+            "categories": {category: empty_category_summary() for category in CATALOG.category_item_counts}
+        }
+        for student_id in student_ids
+    }
+    pipeline = [
+        {"$match": {"student_id": {"$in": student_ids}, "status": {"$in": COMPLETED_STATUSES}}},
+        {"$group": {
+            "_id": {"student_id": "$student_id", "category": "$category", "status": "$status"},
+            "count": {"$sum": 1}
+        }}
+    ]
+    async for group in db.progress.aggregate(pipeline):
+        summary = summaries[group["_id"]["student_id"]]
+        category, status = group["_id"]["category"], group["_id"]["status"]
+        summary["total_completed"] += group["count"]
+        if category in summary["categories"]:
+            summary["categories"][category][status] += group["count"]
+            summary["categories"][category]["weighted_score"] += group["count"] * STATUS_WEIGHTS[status]
+    return summaries
+
+async def rebuild_progress_summaries(db: Database, student_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Recount summaries that do not exist yet and store them.
+
+    Only inserts: a summary that exists is moved by $inc transitions alone,
+    and any drift (e.g. a process dying between a record write and its $inc)
+    is repaired by reconcile_progress_summaries.
+    """
+    summaries = await count_progress_summaries(db, student_ids)
+    if summaries:
+        await db.progress_summary.bulk_write(
+            [
+                UpdateOne({"student_id": student_id}, {"$setOnInsert": {**summary, "version": 0}}, upsert=True)
+                for student_id, summary in summaries.items()
+            ],
+            ordered=False
+        )
+    return summaries
+
+async def apply_summary_inc(db: Database, student_id: str, inc: Dict[str, int]):
+    if not inc:
+        return
+    # No upsert: a missing summary is rebuilt from the records (which already
+    # include this write) instead of being seeded with a partial delta. The
+    # version tells reconcile_progress_summaries that the summary moved.
+    result = await db.progress_summary.update_one({"student_id": student_id}, {"$inc": {**inc, "version": 1}})
+    if not result.matched_count:
+        await rebuild_progress_summaries(db, [student_id])
+
+async def apply_progress_transition(db: Database, student_id: str, category: str,
+                                    old_status: Optional[str], new_status: Optional[str]):
+    await apply_summary_inc(db, student_id, summary_transition(category, old_status, new_status))
+
+async def get_progress_summaries(db: Database, student_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    summaries = {}
+    async for summary in db.progress_summary.find({"student_id": {"$in": student_ids}}, {"_id": 0}):
+        summaries[summary["student_id"]] = summary
+    missing = [student_id for student_id in student_ids if student_id not in summaries]
+    if missing:
+        counted = await count_progress_summaries(db, missing)
+        # Reads must not create summaries for ids that name no student: those
+        # get the empty count without it being stored
+        existing = set(await db.students.distinct("id", {"id": {"$in": missing}}))
+        stored = [
+            student_id for student_id, summary in counted.items()
+            if student_id in existing or summary["total_completed"]
+        ]
+        if stored:
+            summaries.update(await rebuild_progress_summaries(db, stored))
+        summaries.update({student_id: counted[student_id] for student_id in missing if student_id not in summaries})
+    return summaries
+
+def summary_counts(summary: Optional[Dict[str, Any]]) -> Optional[Tuple[int, Dict[str, Any]]]:
+    return summary and (summary["total_completed"], summary["categories"])
+
+async def reconcile_progress_summaries(services: AppServices, student_ids: Optional[List[str]] = None) -> Dict[str, int]:
+    """Replace stored summaries that drifted from a recount of their records.
+
+    A tap between its record write and its $inc looks like drift for a
+    moment, so a summary is only replaced if it still differs after
+    SUMMARY_SETTLE_SECONDS, and only if no $inc moved it in between.
+    """
+    db = services.db
+    if student_ids is None:
+        student_ids = await db.progress_summary.distinct("student_id")
+    checked = repaired = 0
+    for start in range(0, len(student_ids), SUMMARY_RECONCILE_CHUNK):
+        chunk = student_ids[start:start + SUMMARY_RECONCILE_CHUNK]
+        checked += len(chunk)
+        stored = {doc["student_id"]: doc async for doc in db.progress_summary.find({"student_id": {"$in": chunk}}, {"_id": 0})}
+        counted = await count_progress_summaries(db, chunk)
+        suspects = [
+            student_id for student_id in chunk
+            if student_id in stored and summary_counts(stored[student_id]) != summary_counts(counted[student_id])
+        ]
+        if not suspects:
+            continue
+
+        await asyncio.sleep(SUMMARY_SETTLE_SECONDS)
+        restored = {doc["student_id"]: doc async for doc in db.progress_summary.find({"student_id": {"$in": suspects}}, {"_id": 0})}
+        recounted = await count_progress_summaries(db, suspects)
+        for student_id in suspects:
+            summary = restored.get(student_id)
+            version = stored[student_id].get("version")
+            if summary is None or summary.get("version") != version:
+                continue
+            if summary_counts(summary) == summary_counts(recounted[student_id]):
+                continue
+            result = await db.progress_summary.replace_one(
+                {"student_id": student_id, "version": version},
+                {**recounted[student_id], "version": (version or 0) + 1}
+            )
+            if result.modified_count:
+                repaired += 1
+                await services.student_cache.invalidate(student_id)
+    if repaired:
+        logger.warning(f"Repaired {repaired} drifted progress summaries")
+    return {"checked": checked, "repaired": repaired}
+
+async def get_progress_summary(services: AppServices, student_id: str) -> Dict[str, Any]:
+    async def load_summary():
+        return (await get_progress_summaries(services.db, [student_id]))[student_id]
+    return await services.student_cache.get_or_load(student_id, "summary", load_summary)
+
+def progress_key(student_id: str, category: str, subcategory: str, item: str) -> Dict[str, str]:
+    """Filter matching the compound unique index on progress"""
+    return {
         "student_id": student_id,
         "category": category,
         "subcategory": subcategory,
         "item": item
-    })
-    
-    if existing:
-        # Update existing record
-        update_data = progress.dict(exclude_unset=True)
-        update_data["last_updated"] = datetime.utcnow()
-        result = await db.progress.update_one(
-            {"id": existing["id"]},
-            {"$set": update_data}
-        )
-        if result.modified_count:
-            updated_record = await db.progress.find_one({"id": existing["id"]})
-            return TrainingProgress(**updated_record)
+    }
+
+async def write_progress_records(db: Database, writes: List[Tuple[Dict[str, str], Dict[str, Any], str]]) -> List[Dict[str, Any]]:
+    """Upsert progress records in bulk and move the summaries by their exact transitions.
+
+    ``writes`` are (item key, fields to $set, id for a new record). Each update
+    only applies while the record still has the status read just before the
+    bulk write, so the previous status of every applied change is known. A
+    change that lost a race with another writer fails on the unique item index
+    and is read and tried again. Returns {"created": bool} or {"error": message}
+    per write; errors of writes that kept losing races are also "retryable".
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(writes)
+    pending = list(range(len(writes)))
+    for _ in range(PROGRESS_WRITE_ATTEMPTS):
+        if not pending:
+            break
+        previous = {}
+        async for record in db.progress.find(
+            {"$or": [writes[index][0] for index in pending]},
+            {"_id": 0, "student_id": 1, "category": 1, "subcategory": 1, "item": 1, "status": 1}
+        ):
+            previous[tuple(progress_key(record["student_id"], record["category"], record["subcategory"], record["item"]).values())] = record.get("status")
+
+        operations = []
+        for index in pending:
+            key, fields, record_id = writes[index]
+            operations.append(UpdateOne(
+                {**key, "status": previous.get(tuple(key.values()))},
+                {"$set": fields, "$setOnInsert": {"id": record_id}},
+                upsert=True
+            ))
+        write_errors = {}
+        try:
+            result = await db.progress.bulk_write(operations, ordered=False)
+            upserted = set(result.upserted_ids)
+        except BulkWriteError as e:
+            upserted = {upsert["index"] for upsert in e.details.get("upserted", [])}
+            write_errors = {write_error["index"]: write_error for write_error in e.details.get("writeErrors", [])}
+
+        incs: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        conflicting = []
+        for op_index, index in enumerate(pending):
+            key, fields, _ = writes[index]
+            write_error = write_errors.get(op_index)
+            if write_error is None:
+                results[index] = {"created": op_index in upserted}
+                old_status = previous.get(tuple(key.values()))
+                transition = summary_transition(key["category"], old_status, fields.get("status", old_status))
+                for path, delta in transition.items():
+                    incs[key["student_id"]][path] += delta
+            elif write_error.get("code") == 11000:
+                conflicting.append(index)
+            else:
+                results[index] = {"error": write_error.get("errmsg", "Write failed")}
+        for student_id, inc in incs.items():
+            await apply_summary_inc(db, student_id, {path: delta for path, delta in inc.items() if delta})
+        pending = conflicting
+
+    for index in pending:
+        results[index] = {"error": "Item changed concurrently too often", "retryable": True}
+    return results
+
+async def load_progress_base(db: Database, key: Dict[str, str]) -> Dict[str, Any]:
+    """Stored record of an item, or a new one, that coalesced taps are applied to"""
+    previous = await db.progress.find_one(key, {"_id": 0})
+    return previous or {"id": str(uuid.uuid4()), **key}
+
+async def coalesced_record(key: Tuple[str, str, str, str], entry: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        base = await entry["base"]
+    except Exception:
+        # The tap's response already failed; the write still lands as a new record
+        base = {"id": str(uuid.uuid4()), **progress_key(*key)}
+    return {**base, **entry["update"]}
+
+async def flush_progress_writes(services: AppServices, pending: Dict[Tuple[str, str, str, str], Dict[str, Any]]):
+    """Write coalesced progress taps as one unordered bulk write"""
+    first_seq = await reserve_change_seqs(services.db, len(pending))
+    entries = [(key, await coalesced_record(key, entry), entry["update"]) for key, entry in pending.items()]
+    results = await write_progress_records(services.db, [
+        (progress_key(*key), {**update, **change_stamp(first_seq + offset)}, record["id"])
+        for offset, (key, record, update) in enumerate(entries)
+    ])
+
+    student_ids = sorted({key[0] for key in pending})
+    for student_id in student_ids:
+        await services.student_cache.invalidate(student_id)
+    coalescer = services.progress_coalescer
+    for (key, record, _), result in zip(entries, results):
+        if result.get("retryable"):
+            # Lost every race against other writers; the next window tries again
+            coalescer.requeue(key, pending[key])
+        elif "error" in result:
+            # Rejected by the database itself, so a retry would fail the same way
+            coalescer.drop(key)
+            logger.error(f"Dropped coalesced progress write for {key}: {result['error']}")
+        else:
+            publish_event(services, key[0], "progress", trusted_record(TrainingProgress, record))
+    for student_id in student_ids:
+        await publish_progress_stats(services, student_id)
+
+async def coalesce_progress_write(services: AppServices, student_id: str, category: str, subcategory: str, item: str,
+                                  update_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Queue a progress write and return the record as it will be once flushed"""
+    coalescing_key = (student_id, category, subcategory, item)
+    # Claimed before anything is awaited, so taps queue in arrival order, and
+    # all taps of a burst share one read of the stored record (and its id)
+    coalescer = services.progress_coalescer
+    entry = coalescer.get(coalescing_key)
+    if entry:
+        base, update = entry["base"], {**entry["update"], **update_data}
     else:
-        # Create new record
-        progress_dict = progress.dict()
-        progress_obj = TrainingProgress(
-            student_id=student_id,
-            category=category,
-            subcategory=subcategory,
-            item=item,
-            **progress_dict
-        )
-        result = await db.progress.insert_one(progress_obj.dict())
-        if result.inserted_id:
-            return progress_obj
-    
-    raise HTTPException(status_code=400, detail="Failed to update progress")
+        key = progress_key(student_id, category, subcategory, item)
+        base, update = asyncio.ensure_future(load_progress_base(services.db, key)), update_data
+    coalescer.submit(coalescing_key, {"base": base, "update": update})
+    return {**await base, **update}
+
+@api_router.post("/students/{student_id}/progress", response_model=TrainingProgress)
+async def create_or_update_progress(student_id: str, category: str, subcategory: str, item: str, progress: ProgressUpdate,
+                                   services: AppServices = Depends(get_services)):
+    update_data = progress.dict(exclude_unset=True)
+    update_data["last_updated"] = datetime.utcnow()
+    if services.progress_coalescer:
+        record = await coalesce_progress_write(services, student_id, category, subcategory, item, update_data)
+        return TrainingProgress(**record)
+
+    db = services.db
+    key = progress_key(student_id, category, subcategory, item)
+    record_id = str(uuid.uuid4())
+    update = {"$set": {**update_data, **change_stamp(await reserve_change_seqs(db))}, "$setOnInsert": {"id": record_id}}
+
+    # Two concurrent upserts of a new item can both attempt the insert; the
+    # unique index rejects the loser, whose retry then updates the winner's record
+    for attempt in range(2):
+        try:
+            # The previous state is needed for the summary transition; the new
+            # state follows from it and the update without another read
+            previous = await db.progress.find_one_and_update(
+                key,
+                update,
+                upsert=True,
+                return_document=ReturnDocument.BEFORE
+            )
+            break
+        except DuplicateKeyError:
+            if attempt:
+                raise
+
+    record = {**(previous or {"id": record_id, **key}), **update_data}
+    await apply_progress_transition(db, student_id, category, previous and previous.get("status"), record["status"])
+    await services.student_cache.invalidate(student_id)
+    publish_event(services, student_id, "progress", trusted_record(TrainingProgress, record))
+    await publish_progress_stats(services, student_id)
+    return TrainingProgress(**record)
+
+@api_router.post("/students/{student_id}/progress:batch")
+async def batch_update_progress(student_id: str, entries: List[ProgressBatchEntry],
+                                services: AppServices = Depends(get_services)):
+    """Apply many progress changes (e.g. a replayed offline queue) in one bulk write"""
+    if len(entries) > MAX_PROGRESS_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_PROGRESS_BATCH} entries per batch")
+    if services.progress_coalescer:
+        # Queued taps are older than this batch and must not land after it
+        await services.progress_coalescer.flush()
+    db = services.db
+
+    # The bulk write is unordered, so only the last entry per item is applied to
+    # keep replay semantics: later taps win over earlier ones
+    last_entry_index = {}
+    for index, entry in enumerate(entries):
+        last_entry_index[(entry.category, entry.subcategory, entry.item)] = index
+
+    now = datetime.utcnow()
+    first_seq = await reserve_change_seqs(db, len(last_entry_index)) if last_entry_index else 0
+    writes = []
+    operation_entry_indexes = []
+    for offset, ((category, subcategory, item), index) in enumerate(last_entry_index.items()):
+        update_data = entries[index].dict(exclude_unset=True, exclude={"category", "subcategory", "item"})
+        update_data["last_updated"] = now
+        update_data.update(change_stamp(first_seq + offset))
+        writes.append((progress_key(student_id, category, subcategory, item), update_data, str(uuid.uuid4())))
+        operation_entry_indexes.append(index)
+
+    write_results = await write_progress_records(db, writes) if writes else []
+    errors = {
+        operation_entry_indexes[op_index]: result["error"]
+        for op_index, result in enumerate(write_results) if "error" in result
+    }
+    upserted = {op_index for op_index, result in enumerate(write_results) if result.get("created")}
+
+    await services.student_cache.invalidate(student_id)
+    summary = await get_progress_summary(services, student_id)
+
+    event_broker = services.event_broker
+    if not services.change_stream_active and event_broker.has_subscribers(student_id) and writes:
+        # The records written by this batch are exactly those stamped with its sequence range
+        async for record in db.progress.find(
+            {"student_id": student_id, "change_seq": {"$gte": first_seq, "$lt": first_seq + len(writes)}}
+        ):
+            event_broker.publish(student_id, "progress", trusted_record(TrainingProgress, record))
+        event_broker.publish(student_id, "stats", build_progress_stats(summary))
+
+    applied = {entry_index: op_index for op_index, entry_index in enumerate(operation_entry_indexes)}
+    results = []
+    for index, entry in enumerate(entries):
+        key = (entry.category, entry.subcategory, entry.item)
+        result_entry = {
+            "index": index,
+            "category": entry.category,
+            "subcategory": entry.subcategory,
+            "item": entry.item,
+            "status": entry.status,
+        }
+        if index in errors:
+            result_entry.update(ok=False, error=errors[index])
+        elif index in applied:
+            result_entry.update(ok=True, created=applied[index] in upserted)
+        else:
+            result_entry.update(ok=True, superseded_by=last_entry_index[key])
+        results.append(result_entry)
+
+    return {
+        "results": results,
+        "stats": build_progress_stats(summary)
+    }
 
 @api_router.put("/progress/{progress_id}", response_model=TrainingProgress)
-async def update_progress(progress_id: str, progress: ProgressUpdate):
+async def update_progress(progress_id: str, progress: ProgressUpdate, services: AppServices = Depends(get_services)):
     update_data = progress.dict(exclude_unset=True)
     update_data["last_updated"] = datetime.utcnow()
+    if services.progress_coalescer:
+        await services.progress_coalescer.flush()
     
-    result = await db.progress.update_one(
+    previous = await services.db.progress.find_one_and_update(
         {"id": progress_id},
-        {"$set": update_data}
+        {"$set": {**update_data, **change_stamp(await reserve_change_seqs(services.db))}},
+        return_document=ReturnDocument.BEFORE
     )
     
-    if result.modified_count:
-        updated_record = await db.progress.find_one({"id": progress_id})
+    if previous:
+        updated_record = {**previous, **update_data}
+        await apply_progress_transition(
+            services.db, previous["student_id"], previous["category"], previous.get("status"), updated_record["status"]
+        )
+        await services.student_cache.invalidate(previous["student_id"])
+        publish_event(services, previous["student_id"], "progress", trusted_record(TrainingProgress, updated_record))
+        await publish_progress_stats(services, previous["student_id"])
         return TrainingProgress(**updated_record)
     
     raise HTTPException(status_code=404, detail="Progress record not found")
 
 # Notes Management Routes
 @api_router.get("/students/{student_id}/notes", response_model=List[Note])
-async def get_student_notes(student_id: str):
-    notes = await db.notes.find({"student_id": student_id}).to_list(1000)
-    return [Note(**note) for note in notes]
+async def get_student_notes(
+    student_id: str,
+    response: Response,
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: Database = Depends(get_db)
+):
+    cursor = paginated_find(db.notes, {"student_id": student_id}, after, limit)
+    return await list_response(cursor, lambda note: trusted_record(Note, note), response, limit, format)
 
 @api_router.post("/notes", response_model=Note)
-async def create_note(note: NoteCreate):
+async def create_note(note: NoteCreate, services: AppServices = Depends(get_services)):
     note_dict = note.dict()
     note_obj = Note(**note_dict)
-    result = await db.notes.insert_one(note_obj.dict())
+    result = await services.db.notes.insert_one({**note_obj.dict(), **change_stamp(await reserve_change_seqs(services.db))})
     if result.inserted_id:
+        publish_event(services, note_obj.student_id, "note", note_obj.dict())
         return note_obj
     raise HTTPException(status_code=400, detail="Failed to create note")
 
 @api_router.delete("/notes/{note_id}")
-async def delete_note(note_id: str):
-    result = await db.notes.delete_one({"id": note_id})
-    if result.deleted_count:
+async def delete_note(note_id: str, services: AppServices = Depends(get_services)):
+    note = await services.db.notes.find_one_and_delete({"id": note_id}, {"_id": 0, "id": 1, "student_id": 1})
+    if note:
+        await record_tombstones(services.db, "note", [note])
+        publish_event(services, note["student_id"], "deleted", {"type": "note", **note})
         return {"message": "Note deleted successfully"}
     raise HTTPException(status_code=404, detail="Note not found")
 
 # Training Categories Configuration
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag (RFC 9110)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate.removeprefix('W/') == etag:
+            return True
+    return False
+
 @api_router.get("/training-categories")
-async def get_training_categories():
+async def get_training_categories(request: Request, v: Optional[str] = None):
     """Return the complete training structure based on German driving license card"""
-    return {
-        "grundstufe": {
-            "name": "Grundstufe",
-            "subtitle": "Einweisung und Bedienung",
-            "color": "#F59E0B",
-            "sections": {
-                "besonderheiten_einsteigen": {
-                    "name": "Besonderheiten beim Einsteigen",
-                    "items": ["Besonderheiten beim Einsteigen"]
-                },
-                "einstellen": {
-                    "name": "Einstellen", 
-                    "items": ["Sitz", "Spiegel", "Lenkrad", "Kopfstütze"]
-                },
-                "lenkradhaltung": {
-                    "name": "Lenkradhaltung",
-                    "items": ["Lenkradhaltung"]
-                },
-                "pedale": {
-                    "name": "Pedale",
-                    "items": ["Pedale"]
-                },
-                "gurt_anlegen": {
-                    "name": "Gurt anlegen/anpassen",
-                    "items": ["Gurt anlegen/anpassen"]
-                },
-                "schalt_wahlhebel": {
-                    "name": "Schalt-/Wählhebel",
-                    "items": ["Schalt-/Wählhebel"]
-                },
-                "zundschloss": {
-                    "name": "Zündschloss",
-                    "items": ["Zündschloss"]
-                },
-                "motor_anlassen": {
-                    "name": "Motor anlassen",
-                    "items": ["Motor anlassen"]
-                },
-                "anfahren": {
-                    "name": "Anfahren/Anhalteübungen",
-                    "items": ["Anfahren/Anhalteübungen"]
-                },
-                "schaltubungen": {
-                    "name": "Schaltübungen (umweltschonend)",
-                    "items": ["hoch: 1-2", "2-3", "3-4", "...", "runter: 4-3", "3-2", "2-1", "...", "runter: 4-2", "4-1", "3-1"]
-                },
-                "lenkubungen": {
-                    "name": "Lenkübungen",
-                    "items": ["Lenkübungen"]
-                }
-            }
-        },
-        "aufbaustufe": {
-            "name": "Aufbaustufe", 
-            "subtitle": "Umweltschonendes, vorausschauendes Fahren, Blickschulung",
-            "color": "#F97316",
-            "sections": {
-                "rollen_schalten": {
-                    "name": "Rollen und Schalten",
-                    "items": ["Rollen und Schalten"]
-                },
-                "abbremsen_schalten": {
-                    "name": "Abbremsen und Schalten",
-                    "items": ["Abbremsen und Schalten"]
-                },
-                "bremsübungen": {
-                    "name": "Bremsübungen",
-                    "items": ["degressiv", "Zielbremsungen", "Gefahrsituationen"]
-                },
-                "gefalle": {
-                    "name": "Gefälle",
-                    "items": ["Anhalten", "Anfahren", "Rückwärts", "Sichern", "Schalten"]
-                },
-                "steigung": {
-                    "name": "Steigung", 
-                    "items": ["Anhalten", "Anfahren", "Rückwärts", "Sichern", "Schalten"]
-                },
-                "tastgeschwindigkeit": {
-                    "name": "Tastgeschwindigkeit",
-                    "items": ["Tastgeschwindigkeit"]
-                },
-                "bedienungs_kontrolleinrichtungen": {
-                    "name": "Bedienungs- und Kontrolleinrichtungen",
-                    "items": ["Bedienungs- und Kontrolleinrichtungen"]
-                },
-                "ortliche_besonderheiten": {
-                    "name": "Örtliche Besonderheiten",
-                    "items": ["Örtliche Besonderheiten"]
-                }
-            }
-        },
-        "leistungsstufe": {
-            "name": "Leistungsstufe",
-            "subtitle": "Schwierige Verkehrssituationen, umweltschonendes, vorausschauendes Fahren, Blickschulung/Bremsbereitschaft",
-            "color": "#EF4444", 
-            "sections": {
-                "fahrbahnabutzung": {
-                    "name": "Fahrbahnbenutzung",
-                    "items": ["Einordnen", "Markierungen"]
-                },
-                "fahrstreifenwechsel": {
-                    "name": "Fahrstreifenwechsel",
-                    "items": ["links", "rechts"]
-                },
-                "vorbeifahren": {
-                    "name": "Vorbeifahren/Überholen",
-                    "items": ["Vorbeifahren/Überholen"]
-                },
-                "abbiegen": {
-                    "name": "Abbiegen",
-                    "items": ["rechts", "links", "mehrspurig", "Radweg", "Sonderstreifen", "Straßenbahnen", "Einbahnstraßen"]
-                },
-                "vorfahrt": {
-                    "name": "Vorfahrt",
-                    "items": ["rechts vor links", "Grünpfeil", "Polizeibeamte", "Grünpfeil-Schild"]
-                },
-                "geschwindigkeit_abstand": {
-                    "name": "Geschwindigkeit/Abstand",
-                    "items": ["Geschwindigkeit/Abstand"]
-                },
-                "situationen_verkehrsteilnehmer": {
-                    "name": "Situationen mit anderen Verkehrsteilnehmern",
-                    "items": ["Fußgängerüberwege", "Kinder", "Öffentl. Verkehrsmittel", "Schulbus", "Ältere/Behinderte", "Radfahrer/Mofa", "Einbahnstr./Radfahrer", "Verk.-beruh. Bereich"]
-                },
-                "schwierige_verkehrsfuhrung": {
-                    "name": "Schwierige Verkehrsführung",
-                    "items": ["Schwierige Verkehrsführung"]
-                },
-                "engpass": {
-                    "name": "Engpass",
-                    "items": ["Engpass"]
-                },
-                "kreisverkehr": {
-                    "name": "Kreisverkehr",
-                    "items": ["Kreisverkehr"]
-                },
-                "bahnubergang": {
-                    "name": "Bahnübergang (warten)",
-                    "items": ["Bahnübergang (warten)"]
-                },
-                "kritische_verkehrssituationen": {
-                    "name": "Kritische Verkehrssituationen",
-                    "items": ["Hauptverkehrszeiten", "Partnerschaftliches Verhalten (Kommunikation, Verzicht auf Vorfahrt)", "Schwung nutzen"]
-                },
-                "fussganger_schutzbereich": {
-                    "name": "Fußgänger Schutzbereich",
-                    "items": ["Fußgänger Schutzbereich"]
-                }
-            }
-        },
-        "grundfahraufgaben": {
-            "name": "Grundfahraufgaben",
-            "color": "#F59E0B",
-            "sections": {
-                "ruckwartsfahren": {
-                    "name": "Rückwärtsfahren",
-                    "items": ["Rückwärtsfahren"]
-                },
-                "umkehren": {
-                    "name": "Umkehren", 
-                    "items": ["Umkehren"]
-                },
-                "gefahrbremsung": {
-                    "name": "Gefahrbremsung",
-                    "items": ["Gefahrbremsung"]
-                },
-                "einparken_langs": {
-                    "name": "Einparken längs",
-                    "items": ["vorwärts rechts", "vorwärts links", "rückwärts rechts", "rückwärts links"]
-                },
-                "einparken_quer": {
-                    "name": "Einparken quer", 
-                    "items": ["vorwärts rechts", "vorwärts links", "rückwärts rechts", "rückwärts links"]
-                }
-            }
-        },
-        "uberlandfahrten": {
-            "name": "Überlandfahrten",
-            "subtitle": "Sicheres und umweltschonendes Fahren mit höheren Geschwindigkeiten auf Landstraßen",
-            "color": "#FDE047",
-            "sections": {
-                "main_items": {
-                    "name": "",
-                    "items": [
-                        "Angepasste Geschwindigkeit/Gangwahl (alle Gänge)"
-                    ]
-                },
-                "abstand": {
-                    "name": "Abstand",
-                    "items": ["vorne", "hinten", "seitlich"]
-                },
-                "main_items_2": {
-                    "name": "",
-                    "items": [
-                        "Beobachtung/Spiegel",
-                        "Verkehrszeichen",
-                        "Kreuzungen/Einmündungen", 
-                        "Kurven",
-                        "Steigungen",
-                        "Gefälle",
-                        "Alleen",
-                        "Überholen"
-                    ]
-                },
-                "besondere_situationen": {
-                    "name": "Besondere Situationen",
-                    "items": ["Liegenbleiben • Absichern", "Einfahren in Ortschaften", "Fußgänger", "Wild/Tiere"]
-                },
-                "besondere_anforderungen": {
-                    "name": "Besondere Anforderungen",
-                    "items": ["Leistungsgrenze", "Ablenkung", "Konfliktsituationen"]
-                }
-            }
-        },
-        "autobahn": {
-            "name": "Autobahn",
-            "subtitle": "Sicheres und umweltschonendes Fahren mit höheren Geschwindigkeiten auf Autobahnen",
-            "color": "#FDE047",
-            "sections": {
-                "main_items_1": {
-                    "name": "",
-                    "items": [
-                        "Fahrtplanung",
-                        "Einfahren in BAB",
-                        "Fahrstreifenwahl", 
-                        "Geschwindigkeit"
-                    ]
-                },
-                "abstand": {
-                    "name": "Abstand",
-                    "items": ["vorne", "hinten", "seitlich"]
-                },
-                "main_items_2": {
-                    "name": "",
-                    "items": [
-                        "Überholen",
-                        "Schilder/Markierungen",
-                        "Vorbeifahren/Anschlussstellen",
-                        "Rast-/Parkplätze, Tankstellen",
-                        "Verhalten bei Unfällen",
-                        "Dichter Verkehr/Stau",
-                        "Besondere Situationen"
-                    ]
-                },
-                "besondere_anforderungen": {
-                    "name": "Besondere Anforderungen",
-                    "items": ["Leistungsgrenze", "Ablenkung", "Konfliktsituationen"]
-                },
-                "final_items": {
-                    "name": "",
-                    "items": ["Verlassen der BAB"]
-                }
-            }
-        },
-        "dammerung_dunkelheit": {
-            "name": "Dämmerung/Dunkelheit", 
-            "subtitle": "Kontrollieren/Einschalten der Beleuchtungseinrichtungen",
-            "color": "#FDE047",
-            "sections": {
-                "beleuchtung": {
-                    "name": "Beleuchtung",
-                    "items": ["Kontrolle", "Benutzung", "Einstellen", "Fernlicht"]
-                },
-                "main_items": {
-                    "name": "",
-                    "items": [
-                        "Beleuchtete Straßen",
-                        "Unbeleuchtete Straßen", 
-                        "Parken"
-                    ]
-                },
-                "besondere_situationen": {
-                    "name": "Besondere Situationen",
-                    "items": ["Schlechte Witterung", "Bahnübergänge", "Tiere", "Unbeleuchtete Verkehrsteilnehmer"]
-                },
-                "besondere_anforderungen": {
-                    "name": "Besondere Anforderungen",
-                    "items": ["Blendung", "Orientierung"]
-                },
-                "final_items": {
-                    "name": "",
-                    "items": ["Abschlussbesprechung"]
-                }
-            }
-        },
-        "reife_teststufe": {
-            "name": "Reife- und Teststufe",
-            "subtitle": "Abschluss der Ausbildung - Prüfungsvorbereitung",
-            "color": "#10B981",
-            "sections": {
-                "selbststandiges_fahren": {
-                    "name": "Selbstständiges Fahren",
-                    "items": ["innerorts", "außerorts"]
-                },
-                "verantwortungsbewusstes_fahren": {
-                    "name": "Verantwortungsbewusstes Fahren",
-                    "items": ["Verantwortungsbewusstes Fahren"]
-                },
-                "testfahrt": {
-                    "name": "Testfahrt unter Prüfungsbedingungen",
-                    "items": ["FAKT", "andere"]
-                },
-                "wiederholung": {
-                    "name": "Wiederholung/Vertiefung",
-                    "items": ["Wiederholung/Vertiefung"]
-                },
-                "leistungsbewertung": {
-                    "name": "Leistungsbewertung", 
-                    "items": ["Leistungsbewertung"]
-                }
-            }
-        },
-        "situative_bausteine": {
-            "name": "Situative Bausteine",
-            "color": "#60A5FA",
-            "sections": {
-                "fahrtechnische_vorbereitung": {
-                    "name": "Checkliste zur fahrtechnischen Vorbereitung",
-                    "sections": {
-                        "fahrzeug": {
-                            "name": "Beim Fahrzeug",
-                            "items": ["Reifen (z.B. Beschädigungen, Profiltiefe, Reifendruck)"]
-                        },
-                        "scheiben_leuchten": {
-                            "name": "Scheiben, Leuchten, Blinker, Hupe",
-                            "items": ["Ein- und Ausschalten"]
-                        },
-                        "funktion_prufen": {
-                            "name": "Funktion prüfen",
-                            "items": ["Standlicht", "Abblendlicht", "Fernlicht", "Schlussleucht m. Kennzeichenbeleuchtung", "Nebelschlussleuchte", "Warnblinkanlage", "Blinker", "Hupe", "Bremsleuchte"]
-                        },
-                        "kontrollleuchten": {
-                            "name": "Kontrollleuchten benennen",
-                            "items": ["Kontrollleuchten benennen"]
-                        },
-                        "ruckstrahler": {
-                            "name": "Rückstrahler",
-                            "items": ["Vorhandensein", "Beschädigung"]
-                        },
-                        "lenkung": {
-                            "name": "Lenkung",
-                            "items": ["Lenkschloss entriegeln", "Überprüfen des Lenkspiels"]
-                        },
-                        "bremsen": {
-                            "name": "Funktionsprüfung der Bremsen",
-                            "items": ["Betriebsbremse", "Feststellbremse"]
-                        }
-                    }
-                }
-            }
-        },
-        "fahrerassistenzsysteme": {
-            "name": "Fahrerassistenzsysteme",
-            "color": "#60A5FA",
-            "sections": {
-                "bedienung": {
-                    "name": "Bedienung der Fahrerassistenzsysteme",
-                    "items": ["Bedienung der Fahrerassistenzsysteme"]
-                }
-            }
-        },
-        "beim_fahrer": {
-            "name": "Beim Fahrer (vor Fahrtbeginn)",
-            "subtitle": "Richtige Sitzeinstellung",
-            "color": "#60A5FA",
-            "sections": {
-                "sitzeinstellung": {
-                    "name": "Richtige Sitzeinstellung",
-                    "items": ["Richtige Sitzeinstellung"]
-                },
-                "ruckspiegeleinstellung": {
-                    "name": "Einstellung der Rückspiegel",
-                    "items": ["der Kopfstütze", "des Lenkrades"]
-                },
-                "sicherheitsgurt": {
-                    "name": "Anlegen des Sicherheitsgurtes",
-                    "items": ["Anlegen des Sicherheitsgurtes"]
-                }
-            }
-        },
-        "heizung_luftung": {
-            "name": "Heizung und Lüftung",
-            "color": "#60A5FA",
-            "sections": {
-                "bedienen_aggregate": {
-                    "name": "Bedienen der Aggregate",
-                    "items": ["Heizung", "Lüftung", "Klimaanlage", "Heckscheibenheizung", "Beheizte Sonderausstattungen"]
-                },
-                "energiesparende_nutzung": {
-                    "name": "Energiesparende Nutzung",
-                    "items": ["keine unnötigen Verbraucher", "Rechtzeitiges Abschalten"]
-                }
-            }
-        },
-        "betriebs_verkehrssicherheit": {
-            "name": "Betriebs- und Verkehrssicherheit",
-            "color": "#60A5FA",
-            "sections": {
-                "motorraum": {
-                    "name": "Motorraum/Flüssigkeitsstände",
-                    "items": ["Motoröl", "Kühlmittel", "Scheibenwischflüssigkeit"]
-                },
-                "tanken": {
-                    "name": "Tanken",
-                    "items": ["Tanken"]
-                },
-                "sicherungsmittel": {
-                    "name": "Sicherungsmittel",
-                    "items": ["Warndreieck", "Verbandskasten", "Bordwerkzeug", "zusätzliche Ausrüstung"]
-                },
-                "aussenkontrolle": {
-                    "name": "Außenkontrolle (Schäden, Sauberkeit)",
-                    "items": ["Scheiben/Wischer", "Spiegel", "Kennzeichen(HU/AU)", "Beleuchtung"]
-                },
-                "bremsen": {
-                    "name": "Bremsen",
-                    "items": ["Bremsen"]
-                },
-                "ladung": {
-                    "name": "Ladung",
-                    "items": ["Sicherung", "Kennzeichnung"]
-                }
-            }
-        },
-        "witterung": {
-            "name": "Witterung",
-            "subtitle": "Fahren bei verschiedenen Witterungsbedingungen",
-            "color": "#60A5FA",
-            "sections": {
-                "schlechte_witterung": {
-                    "name": "Fahren bei schlechter Witterung",
-                    "items": ["Lüftung", "Beleuchtung", "Scheibenwischer/-wascher", "Regen, Sprühnebel", "Wasserlachen, Aquaplaning", "Wind, Sturm, Böen", "Schnee und Matsch", "Eis"]
-                }
-            }
-        }
+    if v == CATALOG.version:
+        cache_control = "public, max-age=31536000, immutable"
+    else:
+        cache_control = f"public, max-age={CATALOG_MAX_AGE}, must-revalidate"
+    headers = {
+        "ETag": CATALOG.etag,
+        "Cache-Control": cache_control,
+        "X-Catalog-Version": CATALOG.version,
     }
+    if etag_matches(request.headers.get("if-none-match"), CATALOG.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=CATALOG.json_body, media_type="application/json", headers=headers)
 
 # Fahrten Update Route
 @api_router.put("/students/{student_id}/fahrten")
-async def update_student_fahrten(student_id: str, fahrten_data: dict):
+async def update_student_fahrten(student_id: str, fahrten_data: dict, services: AppServices = Depends(get_services)):
     """Update specific driving lessons for a student"""
     try:
-        result = await db.students.update_one(
+        updated_student = await services.db.students.find_one_and_update(
             {"id": student_id},
-            {"$set": fahrten_data}
+            fahrten_update({**fahrten_data, **change_stamp(await reserve_change_seqs(services.db))}, COMPACT_FAHRTEN),
+            return_document=ReturnDocument.AFTER
         )
         
-        if result.modified_count:
-            updated_student = await db.students.find_one({"id": student_id})
-            return Student(**updated_student)
+        if updated_student:
+            await services.student_cache.invalidate(student_id)
+            student = student_from_doc(updated_student)
+            publish_event(services, student_id, "student", student)
+            return student
         
         raise HTTPException(status_code=404, detail="Student not found")
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating fahrten: {str(e)}")
 
 # Overall Progress Route
 @api_router.get("/students/{student_id}/overall-progress")
-async def get_student_overall_progress(student_id: str):
+async def get_student_overall_progress(student_id: str, services: AppServices = Depends(get_services)):
     """Get overall progress statistics for a student across all categories"""
     try:
-        # Get all progress records for the student
-        progress_records = await db.progress.find({"student_id": student_id}).to_list(1000)
-        
-        # Get training categories structure
-        categories_response = await get_training_categories()
-        
-        total_items = 0
-        total_completed = 0
-        
-        # Count all items across all categories
-        for category_key, category in categories_response.items():
-            category_total = 0
-            
-            # Count total items in this category
-            for section_key, section in category['sections'].items():
-                if 'sections' in section:  # Has nested sections
-                    for sub_section_key, sub_section in section['sections'].items():
-                        if 'items' in sub_section:
-                            category_total += len(sub_section['items'])
-                elif 'items' in section:  # Has direct items
-                    category_total += len(section['items'])
-            
-            total_items += category_total
-        
-        # Count completed items (any status other than not_started)
-        for progress in progress_records:
-            if progress['status'] in ['once', 'twice', 'thrice']:
-                total_completed += 1
-        
-        completion_percentage = round((total_completed / total_items * 100) if total_items > 0 else 0)
-        
-        return {
-            'total_items': total_items,
-            'total_completed': total_completed,
-            'completion_percentage': completion_percentage
-        }
+        summary = await get_progress_summary(services, student_id)
+        return build_overall_progress(CATALOG.total_items, summary['total_completed'])
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error calculating overall progress: {str(e)}")
 
 # Practice Hours Management Routes
+def practice_hours_list_expr(field_name: str) -> Dict[str, Any]:
+    """Aggregation expression for the current hours as a list, whichever way they are stored"""
+    return {"$ifNull": [
+        f"${field_name}",
+        {"$map": {"input": {"$range": [0, {"$ifNull": [f"${field_name}_count", 0]}]}, "in": True}}
+    ]}
+
+def practice_hours_count_expr(field_name: str) -> Dict[str, Any]:
+    """Aggregation expression for the current number of hours, whichever way they are stored"""
+    return {"$ifNull": [f"${field_name}_count", {"$size": {"$ifNull": [f"${field_name}", []]}}]}
+
+def practice_hours_update(field_name: str, index: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Update pipeline appending an hour, or removing the hour at ``index``.
+
+    The whole change is evaluated by MongoDB in a single atomic update, so
+    concurrent taps cannot overwrite each other and the list is never copied
+    through Python. Legacy documents holding ``null`` instead of a list are
+    handled as empty, which a plain ``$push`` would reject.
+    """
+    count_field = f"{field_name}_count"
+    added_at = {f"{field_name}_last_added_at": "$$NOW"} if PRACTICE_HOURS_TIMESTAMPS and index is None else {}
+    hours = practice_hours_list_expr(field_name)
+    if index is None:
+        updated_hours = {"$concatArrays": [hours, [True]]}
+    else:
+        updated_hours = {"$let": {
+            "vars": {"hours": hours},
+            "in": {"$concatArrays": [
+                {"$slice": ["$$hours", index]},
+                {"$slice": ["$$hours", index + 1, {"$max": [1, {"$size": "$$hours"}]}]}
+            ]}
+        }}
+
+    if COMPACT_FAHRTEN:
+        # Only all-completed lists become counters (the rule of fahrten.stored_value);
+        # open (False) hours are kept as a list so they are not marked completed
+        def stored_as(counter_value, list_value):
+            return {"$let": {
+                "vars": {"updated": updated_hours},
+                "in": {"$cond": [{"$allElementsTrue": ["$$updated"]}, counter_value, list_value]}
+            }}
+        return [{"$set": {
+            count_field: stored_as({"$size": "$$updated"}, "$$REMOVE"),
+            field_name: stored_as("$$REMOVE", "$$updated"),
+            **added_at
+        }}]
+
+    return [
+        {"$set": {field_name: updated_hours, **added_at}},
+        {"$unset": count_field}
+    ]
+
 @api_router.post("/students/{student_id}/practice-hours")
-async def add_practice_hour(student_id: str, hour_type: str = Query(...), duration: float = Query(...)):
+async def add_practice_hour(student_id: str, hour_type: str = Query(...), duration: float = Query(...),
+                            services: AppServices = Depends(get_services)):
     """Add a practice hour to a student (0.5 or 1.0 hours)"""
     try:
         if hour_type not in ["ganz", "halb"] or duration not in [0.5, 1.0]:
             raise HTTPException(status_code=400, detail="Invalid hour type or duration")
         
-        # Get current student data
-        student = await db.students.find_one({"id": student_id})
-        if not student:
-            raise HTTPException(status_code=404, detail="Student not found")
-        
         # Determine which array to update
         field_name = f"uebungsfahrten_{hour_type}"
-        current_array = student.get(field_name, [])
-        
-        # Add new hour (True value)
-        updated_array = current_array + [True]
         
-        # Update student
-        result = await db.students.update_one(
+        updated_student = await services.db.students.find_one_and_update(
             {"id": student_id},
-            {"$set": {field_name: updated_array}}
+            [*practice_hours_update(field_name), {"$set": change_stamp(await reserve_change_seqs(services.db))}],
+            return_document=ReturnDocument.AFTER
         )
         
-        if result.modified_count:
-            updated_student = await db.students.find_one({"id": student_id})
-            return Student(**updated_student)
+        if updated_student:
+            await services.student_cache.invalidate(student_id)
+            student = student_from_doc(updated_student)
+            publish_event(services, student_id, "student", student)
+            return student
         
-        raise HTTPException(status_code=400, detail="Failed to add practice hour")
+        raise HTTPException(status_code=404, detail="Student not found")
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error adding practice hour: {str(e)}")
 
 @api_router.delete("/students/{student_id}/practice-hours")
-async def remove_practice_hour(student_id: str, hour_type: str = Query(...), index: int = Query(...)):
+async def remove_practice_hour(student_id: str, hour_type: str = Query(...), index: int = Query(...),
+                               services: AppServices = Depends(get_services)):
     """Remove a practice hour from a student"""
     try:
         if hour_type not in ["ganz", "halb"]:
             raise HTTPException(status_code=400, detail="Invalid hour type")
-        
-        # Get current student data
-        student = await db.students.find_one({"id": student_id})
-        if not student:
-            raise HTTPException(status_code=404, detail="Student not found")
+        if index < 0:
+            raise HTTPException(status_code=400, detail="Invalid index")
         
         # Determine which array to update
         field_name = f"uebungsfahrten_{hour_type}"
-        current_array = student.get(field_name, [])
-        
-        # Check if index is valid
-        if index < 0 or index >= len(current_array):
-            raise HTTPException(status_code=400, detail="Invalid index")
-        
-        # Remove hour at index
-        updated_array = current_array[:index] + current_array[index+1:]
         
-        # Update student
-        result = await db.students.update_one(
-            {"id": student_id},
-            {"$set": {field_name: updated_array}}
+        # Only match while the index exists, so the bounds check is atomic with the removal
+        updated_student = await services.db.students.find_one_and_update(
+            {"id": student_id, "$expr": {"$lt": [index, practice_hours_count_expr(field_name)]}},
+            [*practice_hours_update(field_name, index), {"$set": change_stamp(await reserve_change_seqs(services.db))}],
+            return_document=ReturnDocument.AFTER
         )
         
-        if result.modified_count:
-            updated_student = await db.students.find_one({"id": student_id})
-            return Student(**updated_student)
+        if updated_student:
+            await services.student_cache.invalidate(student_id)
+            student = student_from_doc(updated_student)
+            publish_event(services, student_id, "student", student)
+            return student
         
-        raise HTTPException(status_code=400, detail="Failed to remove practice hour")
+        if await services.db.students.count_documents({"id": student_id}, limit=1):
+            raise HTTPException(status_code=400, detail="Invalid index")
+        raise HTTPException(status_code=404, detail="Student not found")
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error removing practice hour: {str(e)}")
 
 # Progress Statistics Route
 @api_router.get("/students/{student_id}/progress-stats")
-async def get_student_progress_stats(student_id: str):
+async def get_student_progress_stats(student_id: str, services: AppServices = Depends(get_services)):
     """Get progress statistics for each category"""
     try:
-        # Get all progress records for the student
-        progress_records = await db.progress.find({"student_id": student_id}).to_list(1000)
-        
-        # Get training categories structure
-        categories_response = await get_training_categories()
+        return build_progress_stats(await get_progress_summary(services, student_id))
         
-        stats = {}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error calculating progress stats: {str(e)}")
+
+@api_router.post("/progress-stats:batch")
+async def get_progress_stats_batch(request: ProgressStatsBatchRequest, db: Database = Depends(get_db)):
+    """Recount progress statistics for many students at once from their records"""
+    try:
+        student_ids = request.student_ids
+        if student_ids is None:
+            student_ids = [student["id"] async for student in db.students.find({}, {"_id": 0, "id": 1})]
         
-        for category_key, category in categories_response.items():
-            total_items = 0
-            completed_items = {
-                'once': 0,
-                'twice': 0, 
-                'thrice': 0
-            }
-            
-            # Count total items in this category
-            for section_key, section in category['sections'].items():
-                if 'sections' in section:  # Has nested sections
-                    for sub_section_key, sub_section in section['sections'].items():
-                        if 'items' in sub_section:
-                            total_items += len(sub_section['items'])
-                elif 'items' in section:  # Has direct items
-                    total_items += len(section['items'])
-            
-            # Count completed items with weighted scoring
-            weighted_score = 0
-            max_possible_score = total_items * 100  # Each item can have max 100% completion
-            
-            for progress in progress_records:
-                if progress['category'] == category_key:
-                    if progress['status'] in completed_items:
-                        completed_items[progress['status']] += 1
-                        
-                        # Add weighted score based on completion level
-                        if progress['status'] == 'once':           # / = kleinste Gewichtung
-                            weighted_score += 25  # 25% weight
-                        elif progress['status'] == 'twice':        # × = mittlere Gewichtung
-                            weighted_score += 60  # 60% weight  
-                        elif progress['status'] == 'thrice':       # ⊗ = größte Gewichtung (Kreis mit X)
-                            weighted_score += 100  # 100% weight
-            
-            total_completed = sum(completed_items.values())
-            # Use weighted percentage instead of simple completion
-            completion_percentage = round((weighted_score / max_possible_score * 100) if max_possible_score > 0 else 0)
-            
-            stats[category_key] = {
-                'total_items': total_items,
-                'completed_items': completed_items,
-                'total_completed': total_completed,
-                'completion_percentage': completion_percentage,
-                'color': category['color']
-            }
+        query = {"status": {"$in": COMPLETED_STATUSES}}
+        if request.student_ids is not None:
+            query["student_id"] = {"$in": student_ids}
+        records = db.progress.find(query, {"_id": 0, "student_id": 1, "category": 1, "status": 1})
         
-        return stats
+        codes = encode_records(student_ids, [record async for record in records])
+        summaries = summarize_batch(student_ids, *codes)
+        return {student_id: build_progress_stats(summary) for student_id, summary in summaries.items()}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error calculating progress stats: {str(e)}")
 
-# Include the router in the main app
-app.include_router(api_router)
+@api_router.get("/cache/stats")
+async def get_cache_stats(services: AppServices = Depends(get_services)):
+    """Hit/miss counters of this worker's view of the per-student read cache"""
+    return services.student_cache.stats()
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+@api_router.get("/progress-writes/stats")
+async def get_progress_write_stats(services: AppServices = Depends(get_services)):
+    """Counters of this worker's progress write coalescing"""
+    if not services.progress_coalescer:
+        return {"enabled": False}
+    return {"enabled": True, **services.progress_coalescer.describe()}
+
+# Analytics Routes
+async def cached_analytics(services: AppServices, key: str, compute):
+    """Serve ``compute()`` from the TTL cache when enabled"""
+    if ANALYTICS_CACHE_TTL > 0:
+        cached = services.analytics_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+    result = await compute()
+    if ANALYTICS_CACHE_TTL > 0:
+        services.analytics_cache[key] = (time.monotonic() + ANALYTICS_CACHE_TTL, result)
+    return result
+
+async def progress_facets(services: AppServices) -> Dict[str, Any]:
+    async def compute():
+        source = services.read_db()
+        facets = await source.progress.aggregate(analytics.progress_facets_pipeline()).to_list(1)
+        return {
+            "student_count": await source.students.count_documents({}),
+            **(facets[0] if facets else {"items": [], "categories": []})
+        }
+    return await cached_analytics(services, "progress_facets", compute)
+
+@api_router.get("/analytics/unpracticed-items")
+async def get_unpracticed_items(limit: Optional[int] = Query(None, ge=1), services: AppServices = Depends(get_services)):
+    """Catalog items that not every student has practiced yet, least practiced first"""
+    try:
+        facets = await progress_facets(services)
+        items = analytics.unpracticed_items(facets["items"], facets["student_count"])
+        return {
+            "student_count": facets["student_count"],
+            "items": items[:limit] if limit else items
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error calculating unpracticed items: {str(e)}")
+
+@api_router.get("/analytics/category-completion")
+async def get_category_completion(services: AppServices = Depends(get_services)):
+    """Average weighted completion per category across all students"""
+    try:
+        facets = await progress_facets(services)
+        return {
+            "student_count": facets["student_count"],
+            "categories": analytics.category_completion(facets["categories"], facets["student_count"])
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error calculating category completion: {str(e)}")
+
+@api_router.get("/analytics/exam-pass-rates")
+async def get_exam_pass_rates(services: AppServices = Depends(get_services)):
+    """Theory and practical exam pass rates per instructor"""
+    try:
+        async def compute():
+            groups = await services.read_db().students.aggregate(analytics.exam_pass_rates_pipeline()).to_list(None)
+            return analytics.exam_pass_rates(groups)
+        return {"instructors": await cached_analytics(services, "exam_pass_rates", compute)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error calculating exam pass rates: {str(e)}")
+
+# Bulk Import/Export Routes
+def describe_row_error(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, detail['loc']))}: {detail['msg']}" for detail in error.errors())
+    return str(error)
+
+@api_router.post("/students:import")
+async def import_students(request: Request, format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+                          db: Database = Depends(get_db)):
+    """Stream an NDJSON or CSV upload of students into the database in chunks.
+
+    Only students are imported, each under a new id. The progress and note
+    lines of an NDJSON export are skipped and reported under "skipped" (they
+    would not attach to the re-created students anyway).
+    """
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    lines = bulk_io.iter_lines(request.stream())
+    rows = bulk_io.iter_csv_rows(lines) if format == "csv" else bulk_io.iter_ndjson_rows(lines)
+
+    imported = 0
+    failed = 0
+    errors = []
+    skipped = []
+    skipped_count = 0
+    chunk = []  # (line number, student document)
+
+    def record_error(line_number: int, message: str):
+        nonlocal failed
+        failed += 1
+        if len(errors) < MAX_IMPORT_ERRORS:
+            errors.append({"line": line_number, "error": message})
+
+    async def flush():
+        nonlocal imported
+        first_seq = await reserve_change_seqs(db, len(chunk))
+        for offset, (_, doc) in enumerate(chunk):
+            doc.update(change_stamp(first_seq + offset))
+        try:
+            result = await db.students.insert_many([doc for _, doc in chunk], ordered=False)
+            imported += len(result.inserted_ids)
+        except BulkWriteError as e:
+            imported += e.details.get("nInserted", 0)
+            for write_error in e.details.get("writeErrors", []):
+                record_error(chunk[write_error["index"]][0], write_error.get("errmsg", "Write failed"))
+        chunk.clear()
+
+    async for line_number, row in rows:
+        if isinstance(row, dict) and row.get("type", "student") != "student":
+            # Progress and note lines of an NDJSON export
+            skipped_count += 1
+            if len(skipped) < MAX_IMPORT_ERRORS:
+                skipped.append({"line": line_number, "type": row.get("type")})
+            continue
+        try:
+            if isinstance(row, Exception):
+                raise row
+            if not isinstance(row, dict):
+                raise ValueError("Expected an object")
+            student_obj = Student(**StudentCreate(**row).dict())
+        except ValueError as e:
+            record_error(line_number, describe_row_error(e))
+            continue
+        chunk.append((line_number, compact_document(student_obj.dict(), COMPACT_FAHRTEN)))
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            await flush()
+    if chunk:
+        await flush()
+
+    return {"imported": imported, "failed": failed, "errors": errors,
+            "skipped": {"count": skipped_count, "lines": skipped}}
+
+# Export sources: NDJSON record type, collection and model per kind
+EXPORT_KINDS = {
+    "students": ("student", "students", Student),
+    "progress": ("progress", "progress", TrainingProgress),
+    "notes": ("note", "notes", Note),
+}
+
+async def export_records(source: Database, kind: str):
+    _, collection_name, model = EXPORT_KINDS[kind]
+    async for doc in source[collection_name].find({}, {"_id": 0}):
+        if model is Student:
+            doc = expand_fahrten(doc)
+        yield jsonable_encoder(trusted_record(model, doc))
+
+@api_router.get("/students:export")
+async def export_students(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    kind: Optional[str] = Query(None, pattern="^(students|progress|notes)$"),
+    services: AppServices = Depends(get_services)
+):
+    """Stream students, progress and notes from cursors as NDJSON, or one kind as CSV"""
+    source = services.read_db()
+    if format == "csv":
+        kind = kind or "students"
+        fields = list(EXPORT_KINDS[kind][2].model_fields)
+        return StreamingResponse(
+            bulk_io.csv_rows(fields, export_records(source, kind)),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="{kind}.csv"'}
+        )
+
+    async def ndjson_lines():
+        for export_kind in ([kind] if kind else list(EXPORT_KINDS)):
+            record_type = EXPORT_KINDS[export_kind][0]
+            async for record in export_records(source, export_kind):
+                yield json.dumps({"type": record_type, **record}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(
+        ndjson_lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="students.ndjson"'}
+    )
+
+# Change Event Stream Route
+@api_router.get("/students/{student_id}/events")
+async def stream_student_events(student_id: str, services: AppServices = Depends(get_services)):
+    """Server-sent events for a student's progress, stats, student record (practice
+    hours, Fahrten) and notes, plus "deleted" tombstones.
+
+    Events are not replayed: after (re)connecting, catch up with /sync?student_id=..,
+    and do the same on a "resync" event, sent when the stream fell behind.
+    """
+    if not await services.db.students.count_documents({"id": student_id}, limit=1):
+        raise HTTPException(status_code=404, detail="Student not found")
+
+    async def event_stream():
+        async with services.event_broker.subscribe(student_id) as queue:
+            yield b"retry: 3000\n\n"
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle connection
+                    yield b": keep-alive\n\n"
+                    continue
+                yield format_sse(event, data)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Delta Sync Route
+@api_router.get("/sync")
+async def sync_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(MAX_SYNC_CHANGES, ge=1, le=MAX_SYNC_CHANGES),
+    student_id: Optional[str] = None,
+    db: Database = Depends(get_db)
+):
+    """Students, progress records and notes changed since a sync token, plus tombstones of deletes.
+
+    Start with since=0 and pass the returned next_since on the next sync; while
+    has_more is true, fetch again right away. A student's tombstone also retires
+    its progress records and notes.
+    """
+    try:
+        def changed_since(collection_name: str, query: Dict[str, Any]):
+            return db[collection_name].find(
+                {**query, "change_seq": {"$gt": since}}, {"_id": 0}
+            ).sort("change_seq", ASCENDING).limit(limit + 1).to_list(None)
+
+        queries = {
+            "students": {"id": student_id} if student_id else {},
+            "progress": {"student_id": student_id} if student_id else {},
+            "notes": {"student_id": student_id} if student_id else {},
+            "tombstones": {"$or": [{"id": student_id}, {"student_id": student_id}]} if student_id else {},
+        }
+        kinds = [*sync.SYNC_COLLECTIONS.values(), "tombstone"]
+        batches = await asyncio.gather(*[changed_since(name, query) for name, query in queries.items()])
+        changes, more = sync.merge_changes(zip(kinds, batches), limit)
+
+        next_since = sync.next_token(changes, since, SYNC_SETTLE_SECONDS, datetime.utcnow())
+        body = {"students": [], "progress": [], "notes": [], "deleted": []}
+        for kind, doc in changes:
+            if kind == "student":
+                body["students"].append(student_from_doc(doc))
+            elif kind == "progress":
+                body["progress"].append(trusted_record(TrainingProgress, doc))
+            elif kind == "note":
+                body["notes"].append(trusted_record(Note, doc))
+            else:
+                body["deleted"].append({key: doc[key] for key in ("type", "id", "student_id") if key in doc})
+        return ORJSONResponse({
+            "since": since,
+            "next_since": next_since,
+            # Only while the token covers the whole page; otherwise retry after the settle interval
+            "has_more": more and bool(changes) and next_since == changes[-1][1]["change_seq"],
+            **body
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error syncing changes: {str(e)}")
+
+async def backfill_change_seqs(db: Database):
+    """Stamp records written before delta sync existed so a full sync includes them"""
+    for collection_name in sync.SYNC_COLLECTIONS:
+        collection = db[collection_name]
+        missing = await collection.distinct("_id", {"change_seq": None})
+        if not missing:
+            continue
+        first_seq = await reserve_change_seqs(db, len(missing))
+        try:
+            await collection.bulk_write([
+                UpdateOne({"_id": doc_id, "change_seq": None}, {"$set": change_stamp(first_seq + offset)})
+                for offset, doc_id in enumerate(missing)
+            ], ordered=False)
+        except BulkWriteError as e:
+            logger.error(f"Could not stamp all {collection_name} records for sync: {e.details.get('writeErrors', [])[:3]}")
+            continue
+        logger.info(f"Stamped {len(missing)} {collection_name} records with change sequence numbers")
+
+# Maintenance Routes
+async def sweep_orphans(db: Database) -> Dict[str, int]:
+    """Delete per-student records whose student no longer exists"""
+    # Read referenced ids before existing ids: a record's student is inserted
+    # before the record, so a student created mid-sweep is never mistaken for gone
+    referenced = {}
+    for collection_name in DEPENDENT_COLLECTIONS:
+        referenced[collection_name] = set(await db[collection_name].distinct("student_id"))
+    existing = set(await db.students.distinct("id"))
+
+    removed = {}
+    for collection_name, student_ids in referenced.items():
+        orphaned = list(student_ids - existing)
+        removed[collection_name] = 0
+        if orphaned:
+            result = await db[collection_name].delete_many({"student_id": {"$in": orphaned}})
+            removed[collection_name] = result.deleted_count
+    if any(removed.values()):
+        logger.info(f"Swept orphaned records: {removed}")
+    return removed
+
+async def run_orphan_sweeper(db: Database):
+    while True:
+        await asyncio.sleep(ORPHAN_SWEEP_INTERVAL)
+        try:
+            await sweep_orphans(db)
+        except Exception as e:
+            logger.error(f"Orphan sweep failed: {e}")
+
+@api_router.post("/maintenance/sweep-orphans")
+async def trigger_orphan_sweep(db: Database = Depends(get_db)):
+    """Run the orphan sweep now and report removed records per collection"""
+    return {"removed": await sweep_orphans(db)}
+
+async def run_summary_reconciler(services: AppServices):
+    while True:
+        await asyncio.sleep(SUMMARY_RECONCILE_INTERVAL)
+        try:
+            await reconcile_progress_summaries(services)
+        except Exception as e:
+            logger.error(f"Progress summary reconcile failed: {e}")
+
+@api_router.post("/maintenance/reconcile-summaries")
+async def trigger_summary_reconcile(student_id: Optional[List[str]] = Query(None),
+                                    services: AppServices = Depends(get_services)):
+    """Check stored progress summaries (all, or those of ?student_id=) against a recount and repair drift"""
+    return await reconcile_progress_summaries(services, student_id)
+
+@api_router.post("/maintenance/migrate-fahrten")
+async def trigger_fahrten_migration(to: str = Query(FAHRTEN_STORAGE, pattern="^(compact|array)$"),
+                                    db: Database = Depends(get_db)):
+    """Convert stored Fahrten of all students to compact or list storage.
+
+    Responses keep their shape either way, so cached reads stay valid.
+    """
+    try:
+        return await migrate_students(db.students, to == "compact")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error migrating fahrten: {str(e)}")
+
+@api_router.get("/metrics")
+async def get_metrics(services: AppServices = Depends(get_services)):
+    """Request and MongoDB command latency histograms in the Prometheus text format"""
+    return Response(content=services.metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@api_router.get("/health")
+async def get_health(services: AppServices = Depends(get_services)):
+    """MongoDB reachability plus this worker's pool settings and usage; 503 when MongoDB is unreachable"""
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(services.db.command("ping"), HEALTH_PING_TIMEOUT)
+        mongodb = {"ok": True, "ping_ms": round((time.perf_counter() - started) * 1000, 3)}
+    except Exception as e:
+        mongodb = {"ok": False, "error": str(e) or type(e).__name__}
+
+    client = services.db.client
+    pool_options = client.options.pool_options
+    wait_queue_timeout = pool_options.wait_queue_timeout
+    return ORJSONResponse(
+        {
+            "status": "ok" if mongodb["ok"] else "unavailable",
+            "mongodb": mongodb,
+            "pool": {
+                "max_pool_size": pool_options.max_pool_size,
+                "min_pool_size": pool_options.min_pool_size,
+                "wait_queue_timeout_ms": wait_queue_timeout * 1000 if wait_queue_timeout is not None else None,
+                "server_selection_timeout_ms": client.options.server_selection_timeout * 1000,
+                "compressors": MONGO_CLIENT_OPTIONS.get("compressors"),
+                "servers": services.metrics.pool.snapshot(),
+            },
+            "read_preference": client.read_preference.name,
+            "secondary_reads": SECONDARY_READS,
+        },
+        status_code=200 if mongodb["ok"] else 503
+    )
 
 # Configure logging
 logging.basicConfig(
@@ -893,6 +1649,190 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+# Indexes backing every hot lookup; the (student_id, id) indexes serve both plain
+# student_id queries and keyset pagination ordered by id
+INDEXES = {
+    "students": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("change_seq", ASCENDING)], name="change_seq"),
+    ],
+    "progress": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel(
+            [("student_id", ASCENDING), ("category", ASCENDING), ("subcategory", ASCENDING), ("item", ASCENDING)],
+            unique=True,
+            name="student_item_unique",
+        ),
+        IndexModel([("student_id", ASCENDING), ("id", ASCENDING)], name="student_id_id"),
+        IndexModel([("change_seq", ASCENDING)], name="change_seq"),
+    ],
+    "progress_summary": [
+        IndexModel([("student_id", ASCENDING)], unique=True, name="student_id_unique"),
+    ],
+    "notes": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("student_id", ASCENDING), ("id", ASCENDING)], name="student_id_id"),
+        IndexModel([("change_seq", ASCENDING)], name="change_seq"),
+    ],
+    "tombstones": [
+        IndexModel([("change_seq", ASCENDING)], name="change_seq"),
+    ],
+}
+
+# Representative shapes of the hot queries whose plans are checked at startup
+HOT_QUERIES = [
+    ("students", {"id": ""}),
+    ("progress", {"id": ""}),
+    ("progress", {"student_id": ""}),
+    ("progress", {"student_id": "", "category": "", "subcategory": "", "item": ""}),
+    ("progress_summary", {"student_id": ""}),
+    ("notes", {"id": ""}),
+    ("notes", {"student_id": ""}),
+    ("students", {"change_seq": {"$gt": 0}}),
+    ("progress", {"change_seq": {"$gt": 0}}),
+    ("notes", {"change_seq": {"$gt": 0}}),
+]
+
+def plan_stages(plan: Dict[str, Any]) -> List[str]:
+    """Flatten the stage names of a (possibly nested) winning plan"""
+    stages = [plan.get("stage", "")]
+    for child_key in ("inputStage", "queryPlan"):
+        if child_key in plan:
+            stages += plan_stages(plan[child_key])
+    for child in plan.get("inputStages", []):
+        stages += plan_stages(child)
+    return stages
+
+async def ensure_indexes(db: Database):
+    for collection_name, indexes in INDEXES.items():
+        try:
+            await db[collection_name].create_indexes(indexes)
+        except OperationFailure as e:
+            # Typically duplicate records that predate the unique indexes
+            logger.error(f"Could not create indexes on {collection_name}: {e}")
+
+async def verify_query_plans(db: Database):
+    for collection_name, query in HOT_QUERIES:
+        try:
+            explanation = await db[collection_name].find(query).explain()
+        except Exception as e:
+            logger.warning(f"Could not explain {collection_name} query {sorted(query)}: {e}")
+            continue
+        stages = plan_stages(explanation.get("queryPlanner", {}).get("winningPlan", {}))
+        if "COLLSCAN" in stages:
+            logger.warning(f"Query on {collection_name} by {sorted(query)} uses a collection scan")
+        else:
+            logger.info(f"Query on {collection_name} by {sorted(query)} uses plan {' <- '.join(stages)}")
+
+# Collections whose changes are pushed to event streams, and how each maps to an event
+CHANGE_STREAM_COLLECTIONS = ["students", "progress", "notes", "progress_summary", "tombstones"]
+
+def change_stream_event(change: Dict[str, Any]) -> Optional[Tuple[str, str, Any]]:
+    """(student id, event, data) for a change stream document"""
+    doc = change.get("fullDocument")
+    if doc is None:
+        return None  # Updated, then deleted before the lookup; the tombstone follows
+    collection_name = change["ns"]["coll"]
+    if collection_name == "students":
+        return doc["id"], "student", student_from_doc(doc)
+    if collection_name == "progress":
+        return doc["student_id"], "progress", trusted_record(TrainingProgress, doc)
+    if collection_name == "notes":
+        return doc["student_id"], "note", trusted_record(Note, doc)
+    if collection_name == "progress_summary":
+        return doc["student_id"], "stats", build_progress_stats(doc)
+    tombstone = {key: doc[key] for key in ("type", "id", "student_id") if key in doc}
+    return doc.get("student_id", doc["id"]), "deleted", tombstone
+
+async def tail_change_stream(services: AppServices):
+    """Publish events from a MongoDB change stream, resuming after interruptions"""
+    pipeline = [{"$match": {
+        "ns.coll": {"$in": CHANGE_STREAM_COLLECTIONS},
+        "operationType": {"$in": ["insert", "update", "replace"]},
+    }}]
+    resume_token = None
+    opened = False
+    while True:
+        try:
+            async with services.db.watch(pipeline, full_document="updateLookup", resume_after=resume_token) as stream:
+                opened = True
+                services.change_stream_active = True
+                logger.info("Publishing student events from the MongoDB change stream")
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    event = change_stream_event(change)
+                    if event and services.event_broker.has_subscribers(event[0]):
+                        services.event_broker.publish(*event)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            services.change_stream_active = False
+            if not opened:
+                # Typically a standalone server: change streams need a replica set
+                log = logger.error if CHANGE_STREAM_EVENTS == "true" else logger.info
+                log(f"Change streams unavailable, write routes publish events in-process: {e}")
+                return
+            if isinstance(e, OperationFailure) and e.code == 286:  # ChangeStreamHistoryLost
+                resume_token = None
+            logger.error(f"Change stream interrupted, resuming: {e}")
+            await asyncio.sleep(5)
+
+async def bootstrap_db(services: AppServices):
+    db = services.db
+    await ensure_indexes(db)
+    await backfill_change_seqs(db)
+    background_tasks = services.background_tasks
+    if VERIFY_QUERY_PLANS:
+        # Diagnostics only, so they do not hold up serving
+        background_tasks.append(asyncio.create_task(verify_query_plans(db)))
+    if ORPHAN_SWEEP_INTERVAL > 0:
+        background_tasks.append(asyncio.create_task(run_orphan_sweeper(db)))
+    if SUMMARY_RECONCILE_INTERVAL > 0:
+        background_tasks.append(asyncio.create_task(run_summary_reconciler(services)))
+    if CHANGE_STREAM_EVENTS != "false":
+        background_tasks.append(asyncio.create_task(tail_change_stream(services)))
+
+async def shutdown_db_client(services: AppServices):
+    # Queued progress writes must land before the client goes away
+    if services.progress_coalescer:
+        await services.progress_coalescer.close()
+    for task in services.background_tasks:
+        task.cancel()
+    services.background_tasks.clear()
+    services.db.close()
+    await services.student_cache.close()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    services = app.state.services
+    await bootstrap_db(services)
+    try:
+        yield
+    finally:
+        await shutdown_db_client(services)
+
+def create_app(database=None) -> FastAPI:
+    """An app with its own AppServices, started and closed by its lifespan.
+
+    ``database`` replaces MongoDB, e.g. a mongomock-motor database for tests
+    and in-process benchmarks.
+    """
+    app = FastAPI(lifespan=lifespan)
+    app.state.services = AppServices(database)
+    app.include_router(api_router)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["ETag", "X-Catalog-Version", "X-Next-After", "Server-Timing"],
+    )
+
+    if METRICS_ENABLED:
+        # Added last so it is outermost and times everything below it
+        app.add_middleware(MetricsMiddleware, registry=app.state.services.metrics)
+    return app
+
+app = create_app()
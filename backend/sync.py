@@ -0,0 +1,49 @@
+"""Delta sync over the global change sequence.
+
+Every write stamps the students, progress records and notes it touches with
+the next number of one monotonically increasing sequence ("change_seq") and
+the time it was reserved ("changed_at"); deletes leave tombstones stamped the
+same way. A client keeps the token of its last sync and asks for everything
+stamped after it.
+
+Sequence numbers are reserved before the write they stamp lands, so a write
+can become visible after a later-numbered one. The returned token therefore
+only advances past changes reserved at least a settle interval ago: newer
+changes are delivered right away but sent again by the next sync, where any
+slower write numbered below them has landed too. Clients apply changes
+idempotently (by id), so the overlap is harmless.
+"""
+from datetime import datetime, timedelta
+from heapq import merge
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+# Collections covered by sync, with the kind their records are reported as
+SYNC_COLLECTIONS = {
+    "students": "student",
+    "progress": "progress",
+    "notes": "note",
+}
+
+
+def merge_changes(batches: Iterable[Tuple[str, List[Dict[str, Any]]]], limit: int) -> Tuple[List[Tuple[str, Dict[str, Any]]], bool]:
+    """Merge per-kind batches sorted by change_seq into the first ``limit`` changes overall.
+
+    Returns the (kind, document) changes and whether more exist beyond them;
+    each batch must hold up to ``limit + 1`` documents.
+    """
+    tagged = [[(doc["change_seq"], kind, doc) for doc in docs] for kind, docs in batches]
+    changes = [(kind, doc) for _, kind, doc in merge(*tagged, key=lambda change: change[0])]
+    return changes[:limit], len(changes) > limit
+
+
+def next_token(changes: List[Tuple[str, Dict[str, Any]]], since: int, settle_seconds: float,
+               now: datetime) -> int:
+    """Highest change_seq up to which every returned change is settled"""
+    settled_before = now - timedelta(seconds=settle_seconds)
+    token = since
+    for _, doc in changes:
+        if doc["changed_at"] > settled_before:
+            break
+        token = doc["change_seq"]
+    return token
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Concurrent Load Test and Benchmark for the Driving Lesson Tracking API
+Drives the endpoints exercised by backend_test.py with many concurrent clients,
+reports p50/p95/p99 latency and throughput per route and compares them with a
+stored baseline; a regression beyond the tolerance fails the run.
+
+By default the app runs in-process (httpx ASGI transport) on an in-memory
+MongoDB stand-in (mongomock-motor), so neither a server nor a database is
+needed and the numbers reflect the cost of server.py itself:
+
+    python backend_load_test.py                   # compare with the baseline
+    python backend_load_test.py --save-baseline   # record a new baseline
+    python backend_load_test.py --base-url http://localhost:8001
+
+Baselines are machine specific; record one on the machine that compares.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+
+import httpx
+
+ROOT_DIR = Path(__file__).parent
+DEFAULT_BASELINE = ROOT_DIR / "backend_load_baseline.json"
+
+# Catalog items written by the progress scenarios (category, subcategory, item)
+PROGRESS_ITEMS = [
+    ("grundstufe", "besonderheiten_einsteigen", "Besonderheiten beim Einsteigen"),
+    ("grundstufe", "einstellen", "Sitz"),
+    ("aufbaustufe", "steigung", "Anhalten"),
+    ("leistungsstufe", "schwierige_verkehrsfuhrung", "Schwierige Verkehrsführung"),
+    ("uberlandfahrten", "besondere_situationen", "Fußgänger"),
+    ("dammerung_dunkelheit", "besondere_situationen", "Unbeleuchtete Verkehrsteilnehmer"),
+    ("beim_fahrer", "sicherheitsgurt", "Anlegen des Sicherheitsgurtes"),
+]
+STATUSES = ["once", "twice", "thrice", "not_started"]
+
+
+@dataclass
+class Scenario:
+    name: str
+    request: Callable[[httpx.AsyncClient, "Context", int], Awaitable[httpx.Response]]
+    needs_mongodb: bool = False  # Uses update pipelines the in-memory stand-in lacks
+
+
+class Context:
+    """Ids of the seeded students and records, shared by all scenarios"""
+
+    def __init__(self):
+        self.student_ids: List[str] = []
+        self.progress_ids: List[str] = []
+
+    def student(self, i: int) -> str:
+        return self.student_ids[i % len(self.student_ids)]
+
+
+def progress_params(i: int) -> Dict[str, str]:
+    category, subcategory, item = PROGRESS_ITEMS[i % len(PROGRESS_ITEMS)]
+    return {"category": category, "subcategory": subcategory, "item": item}
+
+
+SCENARIOS = [
+    Scenario("GET /students", lambda c, ctx, i: c.get("/api/students")),
+    Scenario("GET /students?limit=20", lambda c, ctx, i: c.get("/api/students", params={"limit": 20})),
+    Scenario("GET /students/roster", lambda c, ctx, i: c.get("/api/students/roster")),
+    Scenario("GET /students/{id}", lambda c, ctx, i: c.get(f"/api/students/{ctx.student(i)}")),
+    Scenario("GET /students/{id}/progress", lambda c, ctx, i: c.get(f"/api/students/{ctx.student(i)}/progress")),
+    Scenario("GET /students/{id}/notes", lambda c, ctx, i: c.get(f"/api/students/{ctx.student(i)}/notes")),
+    Scenario("GET /students/{id}/progress-stats",
+             lambda c, ctx, i: c.get(f"/api/students/{ctx.student(i)}/progress-stats")),
+    Scenario("GET /students/{id}/overall-progress",
+             lambda c, ctx, i: c.get(f"/api/students/{ctx.student(i)}/overall-progress")),
+    Scenario("GET /training-categories", lambda c, ctx, i: c.get("/api/training-categories")),
+    Scenario("POST /students/{id}/progress", lambda c, ctx, i: c.post(
+        f"/api/students/{ctx.student(i)}/progress",
+        params=progress_params(i),
+        json={"status": STATUSES[i % len(STATUSES)]}
+    )),
+    Scenario("PUT /progress/{id}", lambda c, ctx, i: c.put(
+        f"/api/progress/{ctx.progress_ids[i % len(ctx.progress_ids)]}",
+        json={"status": STATUSES[i % len(STATUSES)], "notes": "Lasttest"}
+    )),
+    Scenario("POST /notes", lambda c, ctx, i: c.post("/api/notes", json={
+        "student_id": ctx.student(i), **progress_params(i), "note_text": f"Notiz {i}"
+    })),
+    Scenario("PUT /students/{id}/fahrten", lambda c, ctx, i: c.put(
+        f"/api/students/{ctx.student(i)}/fahrten",
+        json={"nachtfahrten": [i % 2 == 0, i % 3 == 0, True]}
+    )),
+    Scenario("POST /students/{id}/practice-hours", lambda c, ctx, i: c.post(
+        f"/api/students/{ctx.student(i)}/practice-hours", params={"hour_type": "ganz", "duration": 1.0}
+    ), needs_mongodb=True),
+]
+
+
+def in_process_client() -> httpx.AsyncClient:
+    """Client for the app running in this process on an in-memory MongoDB stand-in"""
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        sys.exit("In-process runs need mongomock-motor (pip install mongomock-motor), or pass --base-url")
+
+    sys.path.insert(0, str(ROOT_DIR / "backend"))
+    import server
+
+    app = server.create_app(AsyncMongoMockClient()["load_test"])
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://load-test")
+
+
+async def seed(client: httpx.AsyncClient, ctx: Context, students: int):
+    """Create students with progress records and notes, as backend_test.py does for one"""
+    for i in range(students):
+        response = await client.post("/api/students", json={
+            "name": f"Last{i}",
+            "surname": "Test",
+            "phone": "+49 170 1234567",
+            "instructor": f"Fahrlehrer {i % 5}",
+        })
+        response.raise_for_status()
+        student_id = response.json()["id"]
+        ctx.student_ids.append(student_id)
+
+        for j in range(len(PROGRESS_ITEMS)):
+            response = await client.post(
+                f"/api/students/{student_id}/progress",
+                params=progress_params(j),
+                json={"status": STATUSES[(i + j) % 3]}
+            )
+            response.raise_for_status()
+            ctx.progress_ids.append(response.json()["id"])
+
+        response = await client.post("/api/notes", json={
+            "student_id": student_id, **progress_params(i), "note_text": "Gut gemacht"
+        })
+        response.raise_for_status()
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(fraction * len(sorted_values) + 0.5))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def run_scenario(client: httpx.AsyncClient, ctx: Context, scenario: Scenario,
+                       requests: int, concurrency: int, warmup: int) -> Dict[str, Any]:
+    for i in range(warmup):
+        await scenario.request(client, ctx, i)
+
+    latencies: List[float] = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal errors, next_index
+        while next_index < requests:
+            i = next_index
+            next_index += 1
+            started = time.perf_counter()
+            try:
+                response = await scenario.request(client, ctx, warmup + i)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - started)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            tolerance: float, slack_ms: float) -> Dict[str, List[str]]:
+    """Regressions per route: p95 latency or throughput worse than baseline by more than ``tolerance``.
+
+    p95 latency may additionally exceed the baseline by ``slack_ms``, so jitter
+    on sub-millisecond routes does not fail the run.
+    """
+    regressions = {}
+    for name, result in results.items():
+        reference = baseline.get(name)
+        problems = []
+        if result["errors"]:
+            problems.append(f"{result['errors']} failed requests")
+        if reference:
+            if result["p95_ms"] > reference["p95_ms"] * (1 + tolerance) + slack_ms:
+                problems.append(f"p95 {result['p95_ms']:.2f} ms > baseline {reference['p95_ms']:.2f} ms")
+            if result["throughput_rps"] * (1 + tolerance) < reference["throughput_rps"]:
+                problems.append(
+                    f"throughput {result['throughput_rps']:.0f}/s < baseline {reference['throughput_rps']:.0f}/s"
+                )
+        if problems:
+            regressions[name] = problems
+    return regressions
+
+
+def print_report(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+                 regressions: Dict[str, List[str]]):
+    header = f"{'Route':<38} {'Reqs':>6} {'Err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'Req/s':>8}  {'Base p95':>8} {'Base/s':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, result in results.items():
+        reference = baseline.get(name, {})
+        status = "REGRESSION" if name in regressions else ""
+        print(f"{name:<38} {result['requests']:>6} {result['errors']:>4} {result['p50_ms']:>8.2f} "
+              f"{result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['throughput_rps']:>8.1f}  "
+              f"{reference.get('p95_ms', float('nan')):>8.2f} {reference.get('throughput_rps', float('nan')):>8.1f}  {status}")
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="Concurrent load test of the backend API")
+    parser.add_argument("--base-url", help="running server to test instead of the in-process app")
+    parser.add_argument("--students", type=int, default=50, help="students seeded before the run")
+    parser.add_argument("--requests", type=int, default=400, help="measured requests per route")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients per route")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per route")
+    parser.add_argument("--routes", help="comma-separated substrings selecting routes")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed slowdown before failing, as a fraction of the baseline")
+    parser.add_argument("--slack-ms", type=float, default=1.0,
+                        help="allowed p95 increase in milliseconds on top of the tolerance")
+    options = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if options.base_url:
+        client = httpx.AsyncClient(base_url=options.base_url, timeout=30)
+        target = options.base_url
+    else:
+        client = in_process_client()
+        target = "in-process"
+
+    scenarios = [s for s in SCENARIOS if options.base_url or not s.needs_mongodb]
+    if options.routes:
+        selected = [part.strip() for part in options.routes.split(",")]
+        scenarios = [s for s in scenarios if any(part in s.name for part in selected)]
+
+    settings = {
+        "target": target,
+        "students": options.students,
+        "requests": options.requests,
+        "concurrency": options.concurrency,
+    }
+    print(f"Load testing {target}: {options.students} students, {options.requests} requests "
+          f"per route, {options.concurrency} concurrent clients")
+
+    ctx = Context()
+    async with client:
+        await seed(client, ctx, options.students)
+        results = {}
+        for scenario in scenarios:
+            results[scenario.name] = await run_scenario(
+                client, ctx, scenario, options.requests, options.concurrency, options.warmup
+            )
+
+    if options.save_baseline:
+        options.baseline.write_text(json.dumps({"settings": settings, "routes": results}, indent=2) + "\n")
+        print_report(results, {}, {})
+        print(f"\nBaseline saved to {options.baseline}")
+        return 0
+
+    baseline = {}
+    if options.baseline.exists():
+        stored = json.loads(options.baseline.read_text())
+        if stored.get("settings") == settings:
+            baseline = stored["routes"]
+        else:
+            print(f"Baseline {options.baseline} was recorded with {stored.get('settings')}; not comparing")
+    else:
+        print(f"No baseline at {options.baseline}; run with --save-baseline to record one")
+
+    regressions = compare(results, baseline, options.tolerance, options.slack_ms)
+    print_report(results, baseline, regressions)
+    if regressions:
+        print(f"\n{len(regressions)} route(s) regressed:")
+        for name, problems in regressions.items():
+            print(f"  {name}: {'; '.join(problems)}")
+        return 1
+    print("\nNo regressions" + (" against the baseline" if baseline else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
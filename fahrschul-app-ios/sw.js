@@ -1,5 +1,6 @@
 // Service Worker für Offline-Funktionalität
 const CACHE_NAME = 'fahrschul-app-v1';
+const API_CACHE_NAME = 'fahrschul-api-v1';
 const urlsToCache = [
   '/',
   '/index.html',
@@ -13,7 +14,38 @@ self.addEventListener('install', (event) => {
   );
 });
 
+// Ausbildungskatalog: Revalidierung per ETag/If-None-Match, offline aus dem Cache
+const revalidateTrainingCategories = async (request) => {
+  const cache = await caches.open(API_CACHE_NAME);
+  const cached = await cache.match(request, { ignoreSearch: true });
+  const headers = new Headers(request.headers);
+  if (cached && cached.headers.get('ETag')) {
+    headers.set('If-None-Match', cached.headers.get('ETag'));
+  }
+
+  try {
+    const response = await fetch(request.url, { headers, mode: request.mode, credentials: request.credentials });
+    if (response.status === 304 && cached) {
+      return cached;
+    }
+    if (response.ok) {
+      await cache.put(request, response.clone());
+    }
+    return response;
+  } catch (error) {
+    if (cached) {
+      return cached;
+    }
+    throw error;
+  }
+};
+
 self.addEventListener('fetch', (event) => {
+  if (event.request.method === 'GET' && new URL(event.request.url).pathname.endsWith('/api/training-categories')) {
+    event.respondWith(revalidateTrainingCategories(event.request));
+    return;
+  }
+
   event.respondWith(
     caches.match(event.request)
       .then((response) => {
@@ -21,4 +53,4 @@ self.addEventListener('fetch', (event) => {
       }
     )
   );
-});
\ No newline at end of file
+});
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
 import TrainingSection from './TrainingSection';
+import { useStudentEvents } from '../hooks/use-student-events';
 import { ArrowLeft, User, Calendar, Phone, MapPin, Edit2, Eye, EyeOff, Plus, Minus } from 'lucide-react';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
@@ -26,6 +27,19 @@ const StudentDetail = ({ student, onBack, onEdit }) => {
     fetchTrainingCategories();
   }, []);
 
+  // Fahrten and practice hours changed on other devices
+  useStudentEvents(studentData.id, {
+    student: (updated) => setStudentData(updated),
+    resync: async () => {
+      try {
+        const response = await axios.get(`${API}/students/${studentData.id}`);
+        setStudentData(response.data);
+      } catch (error) {
+        console.error('Error fetching student:', error);
+      }
+    }
+  });
+
   const fetchTrainingCategories = async () => {
     try {
       const response = await axios.get(`${API}/training-categories`);
@@ -18,6 +18,7 @@ const StudentForm = ({ onSave, onCancel, student = null }) => {
     practical_exam_date: student?.practical_exam_date || '',
     practical_exam_passed: student?.practical_exam_passed || false,
     license_number: student?.license_number || '',
+    instructor: student?.instructor || '',
     instructor_notes: student?.instructor_notes || '',
     // Fahrten
     ueberlandfahrten: student?.ueberlandfahrten || [false, false, false, false, false],
@@ -423,6 +424,20 @@ const StudentForm = ({ onSave, onCancel, student = null }) => {
           />
         </div>
 
+        <div>
+          <label className="block text-sm font-medium text-gray-700 mb-1">
+            Fahrlehrer
+          </label>
+          <input
+            type="text"
+            name="instructor"
+            value={formData.instructor}
+            onChange={handleInputChange}
+            className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
+            placeholder="Name des Fahrlehrers"
+          />
+        </div>
+
         <div>
           <label className="block text-sm font-medium text-gray-700 mb-1">
             Fahrlehrer-Notizen
@@ -17,14 +17,15 @@ const StudentList = ({ onSelectStudent, onNewStudent }) => {
 
   const fetchStudents = async () => {
     try {
-      const response = await axios.get(`${API}/students`);
-      setStudents(response.data);
-      
-      // Fetch progress for each student
-      const progressPromises = response.data.map(student =>
-        fetchStudentProgress(student.id)
-      );
-      await Promise.all(progressPromises);
+      // Roster endpoint embeds each student's overall progress in one response
+      const response = await axios.get(`${API}/students/roster`);
+      const progressById = {};
+      const roster = response.data.map(({ overall_progress, ...student }) => {
+        progressById[student.id] = overall_progress;
+        return student;
+      });
+      setStudents(roster);
+      setStudentProgress(progressById);
     } catch (error) {
       console.error('Error fetching students:', error);
     } finally {
@@ -32,22 +33,6 @@ const StudentList = ({ onSelectStudent, onNewStudent }) => {
     }
   };
 
-  const fetchStudentProgress = async (studentId) => {
-    try {
-      const response = await axios.get(`${API}/students/${studentId}/overall-progress`);
-      setStudentProgress(prev => ({
-        ...prev,
-        [studentId]: response.data
-      }));
-    } catch (error) {
-      console.error('Error fetching student progress:', error);
-      setStudentProgress(prev => ({
-        ...prev,
-        [studentId]: { total_items: 0, total_completed: 0, completion_percentage: 0 }
-      }));
-    }
-  };
-
   const handleDeleteStudent = async (studentId) => {
     try {
       await axios.delete(`${API}/students/${studentId}`);
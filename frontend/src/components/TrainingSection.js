@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import axios from 'axios';
 import ProgressCheckbox from './ProgressCheckbox';
 import ProgressIndicator from './ProgressIndicator';
+import { useStudentEvents } from '../hooks/use-student-events';
 import { ChevronDown, ChevronUp, MessageSquare, X } from 'lucide-react';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
@@ -23,6 +24,19 @@ const TrainingSection = ({ title, subtitle, color, sections, studentId, category
     }
   }, [studentId]);
 
+  // Changes made on other devices arrive as events
+  useStudentEvents(studentId, {
+    progress: (record) => {
+      const key = `${record.category}_${record.subcategory}_${record.item}`;
+      setProgress(prev => ({ ...prev, [key]: record }));
+    },
+    stats: (stats) => setProgressStats(stats[categoryKey]),
+    resync: () => {
+      fetchProgress();
+      fetchProgressStats();
+    }
+  });
+
   const fetchProgress = async () => {
     try {
       const response = await axios.get(`${API}/students/${studentId}/progress`);
@@ -0,0 +1,64 @@
+import { useEffect, useRef } from "react"
+
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL
+const API = `${BACKEND_URL}/api`
+
+// One EventSource per student, shared by every component showing that student
+const sources = {}
+
+function acquire(studentId) {
+  let entry = sources[studentId]
+  if (!entry) {
+    const source = new EventSource(`${API}/students/${studentId}/events`)
+    entry = { source, users: 0, opened: false }
+    // Events sent while the connection was down are lost: after a reconnect
+    // every listener reloads, exactly as when the server asks for a resync
+    source.addEventListener("open", () => {
+      if (entry.opened) {
+        source.dispatchEvent(new MessageEvent("resync", { data: "{}" }))
+      }
+      entry.opened = true
+    })
+    sources[studentId] = entry
+  }
+  entry.users += 1
+  return entry.source
+}
+
+function release(studentId) {
+  const entry = sources[studentId]
+  if (!entry) return
+  entry.users -= 1
+  if (entry.users === 0) {
+    entry.source.close()
+    delete sources[studentId]
+  }
+}
+
+// Calls handlers[event](data) for every change event of the student.
+// "resync" means events were missed and the data should be fetched again.
+function useStudentEvents(studentId, handlers) {
+  const handlersRef = useRef(handlers)
+  handlersRef.current = handlers
+
+  useEffect(() => {
+    if (!studentId || typeof EventSource === "undefined") return undefined
+
+    const source = acquire(studentId)
+    const listeners = Object.keys(handlersRef.current).map(event => {
+      const listener = message => {
+        const handler = handlersRef.current[event]
+        if (handler) handler(JSON.parse(message.data))
+      }
+      source.addEventListener(event, listener)
+      return [event, listener]
+    })
+
+    return () => {
+      listeners.forEach(([event, listener]) => source.removeEventListener(event, listener))
+      release(studentId)
+    }
+  }, [studentId])
+}
+
+export { useStudentEvents }
@@ -0,0 +1,56 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+# The backend modules import each other as top-level modules, as uvicorn runs them from backend/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+
+@pytest.fixture
+def server():
+    """The app module, for its helpers and the configuration tests monkeypatch"""
+    import server
+    return server
+
+
+@pytest.fixture
+def app(server):
+    """An app serving from a fresh in-memory database and read cache"""
+    from mongomock_motor import AsyncMongoMockClient
+
+    from cache import InMemoryBackend, StudentCache
+
+    app = server.create_app(AsyncMongoMockClient()["tests"])
+    app.state.services.student_cache = StudentCache(InMemoryBackend(max_keys=1024), ttl=30)
+    asyncio.run(server.ensure_indexes(app.state.services.db))
+    return app
+
+
+@pytest.fixture
+def services(app):
+    return app.state.services
+
+
+@pytest.fixture
+def run(app):
+    """Runs ``scenario(client)`` with an HTTP client of the app and returns its result"""
+    def run_scenario(scenario):
+        async def with_client():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://tests") as client:
+                return await scenario(client)
+        return asyncio.run(with_client())
+    return run_scenario
+
+
+@pytest.fixture
+def assert_summary_matches_recount(server, services):
+    """Awaitable check that a student's maintained progress summary equals a recount of the records"""
+    async def check(student_id):
+        stored = await services.db.progress_summary.find_one({"student_id": student_id}, {"_id": 0})
+        counted = await server.count_progress_summaries(services.db, [student_id])
+        assert server.summary_counts(stored) == server.summary_counts(counted[student_id])
+    return check
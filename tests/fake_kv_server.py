@@ -0,0 +1,123 @@
+"""Local stand-in for the shared cache store.
+
+Implements the subset of the Redis protocol that ``cache.RedisBackend`` uses
+through redis-py, so multi-worker caching can be exercised without a Redis
+server:
+
+    python tests/fake_kv_server.py --port 6390
+    cd backend && CACHE_URL=redis://localhost:6390 uvicorn server:app --workers 4
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+async def read_request(reader: asyncio.StreamReader) -> List[bytes]:
+    """One command sent by a client: an array of bulk strings"""
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Connection closed by client")
+    args = []
+    for _ in range(int(line[1:-2])):
+        length = int((await reader.readline())[1:-2])
+        args.append((await reader.readexactly(length + 2))[:-2])
+    return args
+
+
+class FakeKVServer:
+    def __init__(self, password: Optional[str] = None):
+        self.password = password
+        self._data: Dict[bytes, Tuple[Optional[float], bytes]] = {}
+        self.commands = 0
+        self.connections = 0
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    @staticmethod
+    def _bulk(value: Optional[bytes]) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def execute(self, args: List[bytes]) -> bytes:
+        self.commands += 1
+        command, args = args[0].upper(), args[1:]
+        if command == b"AUTH" and (self.password is None or args[-1].decode() != self.password):
+            return b"-WRONGPASS invalid username-password pair\r\n"
+        if command in (b"PING", b"AUTH", b"SELECT"):
+            return b"+PONG\r\n" if command == b"PING" else b"+OK\r\n"
+        if command == b"GET":
+            return self._bulk(self._get(args[0]))
+        if command == b"MGET":
+            return b"*%d\r\n" % len(args) + b"".join(self._bulk(self._get(key)) for key in args)
+        if command == b"SET":
+            expires_at = None
+            if len(args) >= 4 and args[2].upper() in (b"PX", b"EX"):
+                scale = 1000 if args[2].upper() == b"PX" else 1
+                expires_at = time.monotonic() + int(args[3]) / scale
+            self._data[args[0]] = (expires_at, args[1])
+            return b"+OK\r\n"
+        if command == b"INCR":
+            current = self._get(args[0])
+            value = int(current or 0) + 1
+            expires_at = self._data[args[0]][0] if current is not None else None
+            self._data[args[0]] = (expires_at, str(value).encode())
+            return b":%d\r\n" % value
+        if command == b"PEXPIRE":
+            value = self._get(args[0])
+            if value is None:
+                return b":0\r\n"
+            self._data[args[0]] = (time.monotonic() + int(args[1]) / 1000, value)
+            return b":1\r\n"
+        if command == b"DEL":
+            removed = sum(1 for key in args if self._data.pop(key, None) is not None)
+            return b":%d\r\n" % removed
+        if command == b"FLUSHDB":
+            self._data.clear()
+            return b"+OK\r\n"
+        return b"-ERR unknown command '%s'\r\n" % command
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                request = await read_request(reader)
+                writer.write(self.execute(request))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+
+async def start_fake_kv_server(host: str = "127.0.0.1", port: int = 0,
+                               password: Optional[str] = None) -> Tuple[asyncio.AbstractServer, FakeKVServer]:
+    """Start the fake server; port 0 picks a free port (see ``server.sockets``)"""
+    fake = FakeKVServer(password)
+    server = await asyncio.start_server(fake.handle, host, port)
+    return server, fake
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    options = parser.parse_args()
+    server, _ = await start_fake_kv_server(options.host, options.port)
+    print(f"Fake KV server listening on {options.host}:{options.port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
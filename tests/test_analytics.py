@@ -0,0 +1,34 @@
+def form_student(name, theory_exam_date="", theory_exam_passed=False):
+    """A student as StudentForm.js saves it: unticked boxes as false, empty dates as ''"""
+    return {
+        "name": name, "surname": "Berg", "instructor": "Kim",
+        "theory_exam_passed": theory_exam_passed, "theory_exam_date": theory_exam_date,
+        "practical_exam_passed": False, "practical_exam_date": "",
+    }
+
+
+def test_exam_pass_rates_count_taken_exams_by_date_or_pass(run):
+    students = [
+        form_student("Anna", "2024-03-01", True),
+        form_student("Ben", "2024-03-01", True),
+        # Passed without a recorded date
+        form_student("Carla", theory_exam_passed=True),
+        # Failed: a date, but not passed
+        form_student("Dana", "2024-03-08"),
+        # Not taken yet
+        form_student("Emil"),
+    ]
+
+    async def scenario(client):
+        for student in students:
+            (await client.post("/api/students", json=student)).raise_for_status()
+        response = await client.get("/api/analytics/exam-pass-rates")
+        response.raise_for_status()
+        return response.json()["instructors"]
+
+    assert run(scenario) == [{
+        "instructor": "Kim",
+        "students": 5,
+        "theory": {"taken": 4, "passed": 3, "pass_rate": 75},
+        "practical": {"taken": 0, "passed": 0, "pass_rate": None},
+    }]
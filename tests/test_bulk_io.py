@@ -0,0 +1,97 @@
+import asyncio
+import json
+
+import bulk_io
+
+
+async def stream(*items):
+    for item in items:
+        yield item
+
+
+def collect(rows):
+    async def gather():
+        return [row async for row in rows]
+    return asyncio.run(gather())
+
+
+def csv_rows(*lines):
+    return collect(bulk_io.iter_csv_rows(stream(*lines)))
+
+
+def test_iter_lines_decodes_characters_split_across_chunks():
+    encoded = "Jürgen;Öztürk\r\nZoë\n\nÅsa".encode()
+    # Every split point, including inside the two-byte characters
+    for split in range(len(encoded) + 1):
+        lines = collect(bulk_io.iter_lines(stream(encoded[:split], b"", encoded[split:])))
+        assert lines == ["Jürgen;Öztürk", "Zoë", "", "Åsa"]
+
+
+def test_iter_lines_handles_a_trailing_newline_and_other_encodings():
+    assert collect(bulk_io.iter_lines(stream(b"a\n", b"b\n"))) == ["a", "b"]
+    assert collect(bulk_io.iter_lines(stream("Größe\n".encode("latin-1")), encoding="latin-1")) == ["Größe"]
+    assert collect(bulk_io.iter_lines(stream())) == []
+
+
+def test_iter_csv_rows_reads_cells_and_list_fields():
+    rows = csv_rows("name, surname ,nachtfahrten,phone", 'Anna,Berg,"[true,false,true]",', "", "Ben,Krause,,0171")
+    assert rows == [
+        (2, {"name": "Anna", "surname": "Berg", "nachtfahrten": [True, False, True]}),
+        (4, {"name": "Ben", "surname": "Krause", "phone": "0171"}),
+    ]
+
+
+def test_iter_csv_rows_joins_quoted_cells_spanning_lines():
+    rows = csv_rows(
+        "name,surname,instructor_notes",
+        'Anna,Berg,"Erste Zeile',
+        "",
+        'mit ""Zitat"", Komma"',
+        "Ben,Krause,kurz",
+    )
+    assert rows == [
+        (2, {"name": "Anna", "surname": "Berg", "instructor_notes": 'Erste Zeile\n\nmit "Zitat", Komma'}),
+        (5, {"name": "Ben", "surname": "Krause", "instructor_notes": "kurz"}),
+    ]
+
+
+def test_iter_csv_rows_reports_bad_rows_and_continues():
+    rows = csv_rows(
+        "name,surname,nachtfahrten",
+        "Anna,Berg",
+        "Ben,Krause,[true",
+        "Carla,Lang,[false]",
+        'Dana,Meier,"offen',
+        "und nie geschlossen",
+    )
+    assert [(line, type(row).__name__) for line, row in rows] == [
+        (2, "ValueError"), (3, "ValueError"), (4, "dict"), (5, "ValueError"),
+    ]
+    assert str(rows[0][1]) == "Expected 3 cells, got 2"
+    assert str(rows[1][1]).startswith("Invalid list cell")
+    assert rows[2][1] == {"name": "Carla", "surname": "Lang", "nachtfahrten": [False]}
+    assert str(rows[3][1]) == "Unterminated quoted cell"
+
+
+def test_import_of_an_export_reports_the_skipped_lines(run):
+    async def scenario(client):
+        student = (await client.post("/api/students", json={"name": "Anna", "surname": "Berg"})).json()
+        item = {"category": "grundstufe", "subcategory": "pedale", "item": "Pedale"}
+        await client.post(f"/api/students/{student['id']}/progress", params=item, json={"status": "once"})
+        await client.post("/api/notes", json={"student_id": student["id"], **item, "note_text": "Gut"})
+        export = (await client.get("/api/students:export")).text
+        assert [json.loads(line)["type"] for line in export.splitlines()] == ["student", "progress", "note"]
+
+        response = await client.post("/api/students:import", content=export,
+                                     headers={"Content-Type": "application/x-ndjson"})
+        response.raise_for_status()
+        assert response.json() == {
+            "imported": 1, "failed": 0, "errors": [],
+            "skipped": {"count": 2, "lines": [{"line": 2, "type": "progress"}, {"line": 3, "type": "note"}]},
+        }
+        students = (await client.get("/api/students")).json()
+        assert len(students) == 2
+        # A new id: the export's records do not attach to the imported copy
+        assert len({student["id"] for student in students}) == 2
+
+    run(scenario)
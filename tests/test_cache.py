@@ -0,0 +1,158 @@
+import asyncio
+import importlib.util
+
+import pytest
+
+from cache import CacheBackendError, InMemoryBackend, RedisBackend, StudentCache
+from .fake_kv_server import start_fake_kv_server
+
+requires_redis = pytest.mark.skipif(importlib.util.find_spec("redis") is None, reason="needs redis-py")
+
+
+async def with_fake_kv_server(scenario, **options):
+    server, fake = await start_fake_kv_server(**options)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        return await scenario(f"redis://127.0.0.1:{port}", fake)
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+class Loader:
+    """Database stand-in counting loads; returns the current value"""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+@requires_redis
+def test_redis_backend_round_trip():
+    async def scenario(url, fake):
+        backend = RedisBackend(url)
+        try:
+            await backend.set("a", b"1", ttl=30)
+            await backend.set("short", b"2", ttl=0.05)
+            assert await backend.get_many(["a", "short", "missing"]) == [b"1", b"2", None]
+            assert await backend.incr("counter", ttl=30) == 1
+            assert await backend.incr("counter", ttl=30) == 2
+            await asyncio.sleep(0.1)
+            await backend.delete(["a"])
+            assert await backend.get_many(["a", "short", "counter"]) == [None, None, b"2"]
+        finally:
+            await backend.close()
+
+    asyncio.run(with_fake_kv_server(scenario))
+
+
+@requires_redis
+def test_failed_handshakes_close_their_connection():
+    async def scenario(url, fake):
+        backend = RedisBackend(url.replace("redis://", "redis://:wrong@"))
+        try:
+            for _ in range(3):
+                with pytest.raises(CacheBackendError):
+                    await backend.get_many(["a"])
+            await asyncio.sleep(0.05)
+            assert fake.connections == 0
+        finally:
+            await backend.close()
+
+        backend = RedisBackend(url.replace("redis://", "redis://:secret@"))
+        try:
+            await backend.set("a", b"1", ttl=30)
+            assert await backend.get_many(["a"]) == [b"1"]
+        finally:
+            await backend.close()
+
+    asyncio.run(with_fake_kv_server(scenario, password="secret"))
+
+
+@requires_redis
+def test_invalidation_in_one_worker_reaches_the_other():
+    async def scenario(url, fake):
+        worker_a = StudentCache(RedisBackend(url), ttl=30)
+        worker_b = StudentCache(RedisBackend(url), ttl=30)
+        loader = Loader({"name": "Anna"})
+        try:
+            assert await worker_a.get_or_load("s1", "student", loader) == {"name": "Anna"}
+            assert await worker_b.get_or_load("s1", "student", loader) == {"name": "Anna"}
+            assert loader.calls == 1
+            assert (worker_a.misses, worker_b.hits) == (1, 1)
+
+            loader.value = {"name": "Berta"}
+            await worker_b.invalidate("s1")
+            assert await worker_a.get_or_load("s1", "student", loader) == {"name": "Berta"}
+            assert loader.calls == 2
+        finally:
+            await worker_a.close()
+            await worker_b.close()
+
+    asyncio.run(with_fake_kv_server(scenario))
+
+
+def test_load_racing_with_an_invalidation_is_not_served():
+    async def scenario():
+        # Two workers sharing one store
+        backend = InMemoryBackend()
+        worker_a = StudentCache(backend, ttl=30)
+        worker_b = StudentCache(backend, ttl=30)
+        values = iter([{"status": "stale"}, {"status": "fresh"}])
+
+        async def loader():
+            value = next(values)
+            if value["status"] == "stale":
+                # Another worker writes while this load is in flight
+                await worker_b.invalidate("s1")
+            return value
+
+        assert await worker_a.get_or_load("s1", "summary", loader) == {"status": "stale"}
+        # Stored under the generation it was loaded with, which is outdated
+        assert await worker_a.get_or_load("s1", "summary", loader) == {"status": "fresh"}
+        assert worker_a.hits == 0
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_misses_share_one_load():
+    async def scenario():
+        cache = StudentCache(InMemoryBackend(), ttl=30)
+        calls = 0
+
+        async def slow_loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return [1, 2, 3]
+
+        results = await asyncio.gather(*[cache.get_or_load("s1", "progress", slow_loader) for _ in range(5)])
+        assert results == [[1, 2, 3]] * 5
+        assert calls == 1
+
+    asyncio.run(scenario())
+
+
+@requires_redis
+def test_falls_back_to_the_database_when_the_backend_fails():
+    async def scenario():
+        # A port nothing listens on any more
+        server, _ = await start_fake_kv_server()
+        port = server.sockets[0].getsockname()[1]
+        server.close()
+        await server.wait_closed()
+
+        cache = StudentCache(RedisBackend(f"redis://127.0.0.1:{port}", timeout=0.2), ttl=30)
+        loader = Loader({"name": "Anna"})
+        assert await cache.get_or_load("s1", "student", loader) == {"name": "Anna"}
+        assert await cache.get_or_load("s1", "student", loader) == {"name": "Anna"}
+        await cache.invalidate("s1")
+        assert loader.calls == 2
+        assert cache.errors == 3
+        await cache.close()
+
+    asyncio.run(scenario())
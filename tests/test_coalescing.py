@@ -0,0 +1,261 @@
+import asyncio
+from functools import partial
+
+import pytest
+
+from coalescing import WriteCoalescer
+
+
+class Store:
+    """Flush target recording batches; fails while ``failing`` is set"""
+
+    def __init__(self):
+        self.batches = []
+        self.failing = False
+        self.in_flush = None
+
+    async def flush(self, pending):
+        if self.in_flush:
+            await self.in_flush()
+        if self.failing:
+            raise ConnectionError("database unreachable")
+        self.batches.append(dict(pending))
+
+
+def test_writes_within_a_window_collapse_into_one_batch():
+    async def scenario():
+        store = Store()
+        coalescer = WriteCoalescer(0.02, store.flush)
+        for value in ("once", "twice", "thrice"):
+            coalescer.submit("a", value)
+        coalescer.submit("b", "once")
+        assert coalescer.get("a") == "thrice"
+        await asyncio.sleep(0.05)
+
+        assert store.batches == [{"a": "thrice", "b": "once"}]
+        assert coalescer.get("a") is None
+        assert coalescer.describe() == {
+            "window_seconds": 0.02, "pending": 0, "submitted": 4, "flushed": 2, "batches": 1, "failures": 0,
+            "requeued": 0, "dropped": 0,
+        }
+
+    asyncio.run(scenario())
+
+
+def test_failed_flush_is_requeued_without_overwriting_newer_writes():
+    async def scenario():
+        store = Store()
+        coalescer = WriteCoalescer(60, store.flush)
+        coalescer.submit("a", "once")
+        coalescer.submit("b", "once")
+
+        async def tap_during_flush():
+            # Still the latest state while the flush is in progress
+            assert coalescer.get("a") == "once"
+            coalescer.submit("a", "twice")
+        store.in_flush = tap_during_flush
+        store.failing = True
+        with pytest.raises(ConnectionError):
+            await coalescer.flush()
+        assert coalescer.failures == 1
+        assert coalescer.get("a") == "twice" and coalescer.get("b") == "once"
+
+        store.in_flush = None
+        store.failing = False
+        await coalescer.close()
+        assert store.batches == [{"a": "twice", "b": "once"}]
+
+    asyncio.run(scenario())
+
+
+def test_failed_window_is_retried_with_the_next_one():
+    async def scenario():
+        store = Store()
+        coalescer = WriteCoalescer(0.1, store.flush)
+        coalescer.submit("a", "once")
+        store.failing = True
+        await asyncio.sleep(0.15)
+        assert coalescer.failures == 1 and not store.batches
+
+        store.failing = False
+        await asyncio.sleep(0.1)
+        assert store.batches == [{"a": "once"}]
+
+    asyncio.run(scenario())
+
+
+def test_requeued_entries_are_retried_with_the_next_window():
+    async def scenario():
+        store = Store()
+        coalescer = WriteCoalescer(0.05, store.flush)
+
+        async def conflict_once():
+            # "a" is handed back once; "b" is written, then superseded meanwhile
+            store.in_flush = None
+            coalescer.requeue("a", "once")
+            coalescer.submit("b", "twice")
+            coalescer.requeue("b", "once")
+        store.in_flush = conflict_once
+        coalescer.submit("a", "once")
+        coalescer.submit("b", "once")
+        await asyncio.sleep(0.08)
+        assert coalescer.get("a") == "once" and coalescer.get("b") == "twice"
+
+        await asyncio.sleep(0.05)
+        assert store.batches[-1] == {"a": "once", "b": "twice"}
+        assert coalescer.describe()["requeued"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_close_flushes_without_waiting_for_the_window():
+    async def scenario():
+        store = Store()
+        coalescer = WriteCoalescer(60, store.flush)
+        coalescer.submit("a", "once")
+        await coalescer.close()
+        assert store.batches == [{"a": "once"}]
+
+        # A failing final flush is logged, not raised
+        coalescer = WriteCoalescer(60, store.flush)
+        coalescer.submit("b", "once")
+        store.failing = True
+        await coalescer.close()
+        assert coalescer.describe()["pending"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_discard_drops_matching_writes():
+    async def scenario():
+        store = Store()
+        coalescer = WriteCoalescer(60, store.flush)
+        coalescer.submit(("s1", "item"), "once")
+        coalescer.submit(("s2", "item"), "once")
+        coalescer.discard(lambda key: key[0] == "s1")
+        await coalescer.close()
+        assert store.batches == [{("s2", "item"): "once"}]
+
+    asyncio.run(scenario())
+
+
+PEDALE = {"category": "grundstufe", "subcategory": "pedale", "item": "Pedale"}
+
+
+def with_coalescing(server, services, window):
+    services.progress_coalescer = WriteCoalescer(window, partial(server.flush_progress_writes, services))
+    return services.progress_coalescer
+
+
+@pytest.fixture
+def student_id(run):
+    async def create(client):
+        response = await client.post("/api/students", json={"name": "Anna", "surname": "Berg"})
+        response.raise_for_status()
+        return response.json()["id"]
+    return run(create)
+
+
+def test_concurrent_taps_share_one_record_and_land_on_close(server, services, run, student_id, assert_summary_matches_recount):
+    coalescer = with_coalescing(server, services, window=60)
+
+    async def scenario(client):
+        responses = await asyncio.gather(*[
+            client.post(f"/api/students/{student_id}/progress", params=PEDALE, json={"status": status})
+            for status in ("once", "twice", "thrice")
+        ])
+        records = [response.json() for response in responses]
+        assert len({record["id"] for record in records}) == 1
+        assert [record["status"] for record in records] == ["once", "twice", "thrice"]
+        assert await services.db.progress.count_documents({}) == 0
+        # Whichever tap the app handled last
+        latest = coalescer.get((student_id, *PEDALE.values()))["update"]["status"]
+
+        await coalescer.close()
+        stored = await services.db.progress.find_one({"student_id": student_id})
+        assert (stored["id"], stored["status"]) == (records[0]["id"], latest)
+        assert coalescer.describe()["batches"] == 1
+        await assert_summary_matches_recount(student_id)
+
+    run(scenario)
+
+
+def test_taps_on_a_stored_record_keep_its_id(server, services, run, student_id, assert_summary_matches_recount):
+    async def scenario(client):
+        response = await client.post(f"/api/students/{student_id}/progress", params=PEDALE, json={"status": "once"})
+        record_id = response.json()["id"]
+
+        coalescer = with_coalescing(server, services, window=0.02)
+        response = await client.post(f"/api/students/{student_id}/progress", params=PEDALE, json={"status": "twice"})
+        assert response.json()["id"] == record_id
+        await asyncio.sleep(0.05)
+        stored = await services.db.progress.find_one({"student_id": student_id})
+        assert (stored["id"], stored["status"]) == (record_id, "twice")
+        assert coalescer.describe()["flushed"] == 1
+        await assert_summary_matches_recount(student_id)
+
+    run(scenario)
+
+
+def test_queued_taps_land_before_a_batch(server, services, run, student_id, assert_summary_matches_recount):
+    with_coalescing(server, services, window=60)
+
+    async def scenario(client):
+        await client.post(f"/api/students/{student_id}/progress", params=PEDALE, json={"status": "thrice"})
+        response = await client.post(f"/api/students/{student_id}/progress:batch", json=[{**PEDALE, "status": "once"}])
+        response.raise_for_status()
+        stored = await services.db.progress.find_one({"student_id": student_id})
+        assert stored["status"] == "once"
+        await assert_summary_matches_recount(student_id)
+
+    run(scenario)
+
+
+def test_queued_taps_of_deleted_students_are_dropped(server, services, run, student_id):
+    coalescer = with_coalescing(server, services, window=60)
+
+    async def scenario(client):
+        await client.post(f"/api/students/{student_id}/progress", params=PEDALE, json={"status": "once"})
+        await client.delete(f"/api/students/{student_id}")
+        await coalescer.close()
+        assert await services.db.progress.count_documents({}) == 0
+
+    run(scenario)
+
+
+def test_taps_that_keep_losing_races_are_retried(server, services, run, student_id, monkeypatch,
+                                                 assert_summary_matches_recount):
+    coalescer = with_coalescing(server, services, window=60)
+
+    async def scenario(client):
+        await client.post(f"/api/students/{student_id}/progress", params=PEDALE, json={"status": "once"})
+        # As if every attempt lost a race against another writer
+        monkeypatch.setattr(server, "PROGRESS_WRITE_ATTEMPTS", 0)
+        await coalescer.flush()
+        assert await services.db.progress.count_documents({}) == 0
+        assert coalescer.get((student_id, *PEDALE.values()))["update"]["status"] == "once"
+
+        monkeypatch.setattr(server, "PROGRESS_WRITE_ATTEMPTS", 5)
+        await coalescer.close()
+        stored = await services.db.progress.find_one({"student_id": student_id})
+        assert stored["status"] == "once"
+        assert (coalescer.describe()["requeued"], coalescer.describe()["dropped"]) == (1, 0)
+        await assert_summary_matches_recount(student_id)
+
+    run(scenario)
+
+
+def test_rejected_taps_are_dropped_and_counted(server, services, run, student_id, monkeypatch):
+    coalescer = with_coalescing(server, services, window=60)
+
+    async def reject(db, writes):
+        return [{"error": "Document failed validation"} for _ in writes]
+
+    async def scenario(client):
+        await client.post(f"/api/students/{student_id}/progress", params=PEDALE, json={"status": "once"})
+        monkeypatch.setattr(server, "write_progress_records", reject)
+        await coalescer.close()
+        assert coalescer.describe()["pending"] == 0
+        assert (coalescer.describe()["requeued"], coalescer.describe()["dropped"]) == (0, 1)
+
+    run(scenario)
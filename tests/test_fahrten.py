@@ -0,0 +1,125 @@
+import asyncio
+from datetime import datetime
+
+from fahrten import MAX_MASK_LENGTH, decode_mask, encode_mask, expand_fahrten, fahrten_update, migrate_students
+
+
+def test_practice_hour_timestamps_reach_the_student_response(server):
+    added_at = datetime(2024, 5, 1, 12, 0, 0)
+    student = server.student_from_doc({
+        "id": "s1", "name": "Anna", "surname": "Berg",
+        "uebungsfahrten_ganz_count": 2, "uebungsfahrten_ganz_last_added_at": added_at,
+    })
+    assert student["uebungsfahrten_ganz"] == [True, True]
+    assert student["uebungsfahrten_ganz_last_added_at"] == added_at
+    assert student["uebungsfahrten_halb_last_added_at"] is None
+
+
+def test_masks_round_trip_with_their_length():
+    assert encode_mask([True, False, True]) == 0b1101
+    assert encode_mask([]) == 1
+    for values in ([], [False], [True], [False] * 5, [True, False, True, True], [True] * MAX_MASK_LENGTH):
+        assert decode_mask(encode_mask(values)) == values
+
+
+def test_expand_fahrten_presents_compact_fields_as_lists():
+    doc = expand_fahrten({
+        "id": "s1",
+        "ueberlandfahrten_mask": encode_mask([True, False, False, False, True]),
+        "uebungsfahrten_ganz_count": 3,
+        "uebungsfahrten_halb": [True, False],
+        "nachtfahrten": [False, False, True],
+    })
+    assert doc == {
+        "id": "s1",
+        "ueberlandfahrten": [True, False, False, False, True],
+        "uebungsfahrten_ganz": [True, True, True],
+        "uebungsfahrten_halb": [True, False],
+        "nachtfahrten": [False, False, True],
+    }
+
+
+def test_fahrten_update_stores_the_configured_form_and_drops_the_other():
+    update = fahrten_update({
+        "nachtfahrten": [True, False, False],
+        "uebungsfahrten_ganz": [True, True],
+        "uebungsfahrten_halb": [True, False],
+        "instructor": "Kim",
+    }, compact=True)
+    assert update == {
+        "$set": {
+            "nachtfahrten_mask": 0b1001,
+            "uebungsfahrten_ganz_count": 2,
+            # Open hours stay a list
+            "uebungsfahrten_halb": [True, False],
+            "instructor": "Kim",
+        },
+        "$unset": {"nachtfahrten": "", "uebungsfahrten_ganz": "", "uebungsfahrten_halb_count": ""},
+    }
+
+    update = fahrten_update({"nachtfahrten": [True, False, False], "instructor": "Kim"}, compact=False)
+    assert update == {
+        "$set": {"nachtfahrten": [True, False, False], "instructor": "Kim"},
+        "$unset": {"nachtfahrten_mask": ""},
+    }
+    assert fahrten_update({"instructor": "Kim"}, compact=True) == {"$set": {"instructor": "Kim"}}
+
+
+STUDENTS = [
+    {"id": "s1", "nachtfahrten": [True, False, False], "uebungsfahrten_ganz": [True, True]},
+    {"id": "s2", "uebungsfahrten_halb": [True, False]},
+    {"id": "s3", "autobahnfahrten": [False] * 4},
+]
+
+
+def test_migrate_students_converts_both_ways(services):
+    async def scenario():
+        students = services.db.students
+        await students.insert_many([dict(student) for student in STUDENTS])
+
+        assert await migrate_students(students, compact=True, batch_size=2) == {"scanned": 3, "migrated": 2, "skipped": 0}
+        s1 = await students.find_one({"id": "s1"}, {"_id": 0})
+        assert s1 == {"id": "s1", "nachtfahrten_mask": 0b1001, "uebungsfahrten_ganz_count": 2}
+        # Open hours have no compact form
+        assert await students.find_one({"id": "s2"}, {"_id": 0}) == STUDENTS[1]
+        assert await migrate_students(students, compact=True) == {"scanned": 3, "migrated": 0, "skipped": 0}
+
+        assert await migrate_students(students, compact=False) == {"scanned": 3, "migrated": 2, "skipped": 0}
+        for student in STUDENTS:
+            assert await students.find_one({"id": student["id"]}, {"_id": 0}) == student
+
+    asyncio.run(scenario())
+
+
+class RacingStudents:
+    """Students collection where another writer changes a student just before each bulk write"""
+
+    def __init__(self, collection, student_id):
+        self.collection = collection
+        self.student_id = student_id
+
+    def find(self, *args, **kwargs):
+        return self.collection.find(*args, **kwargs)
+
+    async def bulk_write(self, operations, **kwargs):
+        await self.collection.update_one({"id": self.student_id}, {"$set": {"nachtfahrten": [True, True, True]}})
+        return await self.collection.bulk_write(operations, **kwargs)
+
+
+def test_migrate_students_skips_students_changed_since_they_were_read(services):
+    async def scenario():
+        students = services.db.students
+        await students.insert_many([dict(student) for student in STUDENTS])
+
+        result = await migrate_students(RacingStudents(students, "s1"), compact=True)
+        assert result == {"scanned": 3, "migrated": 1, "skipped": 1}
+        # The concurrent write is kept, not overwritten with what the migration read
+        s1 = await students.find_one({"id": "s1"}, {"_id": 0})
+        assert s1 == {"id": "s1", "nachtfahrten": [True, True, True], "uebungsfahrten_ganz": [True, True]}
+
+        # The next run converts it
+        assert await migrate_students(students, compact=True) == {"scanned": 3, "migrated": 1, "skipped": 0}
+        s1 = await students.find_one({"id": "s1"}, {"_id": 0})
+        assert s1 == {"id": "s1", "nachtfahrten_mask": 0b1111, "uebungsfahrten_ganz_count": 2}
+
+    asyncio.run(scenario())
@@ -0,0 +1,40 @@
+import asyncio
+
+from metrics import MetricsMiddleware, MetricsRegistry
+
+
+def respond_with(content_type, lifetime=0.0):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]})
+        await asyncio.sleep(lifetime)
+        await send({"type": "http.response.body", "body": b"data: {}\n\n"})
+    return app
+
+
+def request(middleware):
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    asyncio.run(middleware({"type": "http", "method": "GET", "path": "/", "headers": []}, receive, send))
+
+
+def series(rendered, name):
+    return [line for line in rendered.splitlines() if line.startswith(f"{name}_count")]
+
+
+def test_event_streams_are_kept_out_of_the_request_latencies():
+    registry = MetricsRegistry()
+    request(MetricsMiddleware(respond_with(b"application/json"), registry))
+    request(MetricsMiddleware(respond_with(b"text/event-stream; charset=utf-8", lifetime=0.05), registry))
+
+    rendered = registry.render()
+    assert series(rendered, "http_request_duration_seconds") == [
+        'http_request_duration_seconds_count{method="GET",route="unmatched",status="200"} 1'
+    ]
+    assert len(series(rendered, "http_request_db_seconds")) == 1
+    assert series(rendered, "http_stream_duration_seconds") == [
+        'http_stream_duration_seconds_count{method="GET",route="unmatched"} 1'
+    ]
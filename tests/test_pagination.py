@@ -0,0 +1,34 @@
+import json
+
+
+def test_pages_carry_x_next_after_in_both_formats(run):
+    async def scenario(client):
+        for name in ("Anna", "Ben", "Carla"):
+            (await client.post("/api/students", json={"name": name, "surname": "Berg"})).raise_for_status()
+
+        pages = {}
+        for format in ("json", "ndjson"):
+            ids, after = [], None
+            while True:
+                params = {"limit": 2, "format": format, **({"after": after} if after else {})}
+                response = await client.get("/api/students", params=params)
+                response.raise_for_status()
+                if format == "json":
+                    page = response.json()
+                else:
+                    page = [json.loads(line) for line in response.text.splitlines()]
+                ids += [student["id"] for student in page]
+                after = response.headers.get("X-Next-After")
+                if after is None:
+                    break
+                assert after == page[-1]["id"]
+            pages[format] = ids
+        assert pages["json"] == pages["ndjson"] == sorted(pages["json"])
+        assert len(pages["json"]) == 3
+
+        # Unpaginated NDJSON streams everything without a header
+        response = await client.get("/api/students", params={"format": "ndjson"})
+        assert len(response.text.splitlines()) == 3
+        assert "X-Next-After" not in response.headers
+
+    run(scenario)
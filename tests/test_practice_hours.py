@@ -0,0 +1,204 @@
+"""The practice hour update pipelines, evaluated in Python and on a real mongod.
+
+mongomock runs neither update pipelines nor several of the operators they
+use, so the unit tests below evaluate the built pipelines with a small
+interpreter of exactly those operators; the route tests run them on a
+throwaway mongod from pymongo_inmemory and skip when none is available.
+"""
+import asyncio
+import uuid
+from datetime import datetime
+
+import pytest
+
+NOW = datetime(2024, 5, 1, 12, 0, 0)
+# A field that is not in the document, which $ifNull treats like null
+MISSING = object()
+
+
+def slice_array(values, position, count=None):
+    if count is None:
+        return values[:position] if position >= 0 else values[position:]
+    return values[position:position + count]
+
+
+OPERATORS = {
+    "$ifNull": lambda value, fallback: fallback if value is None or value is MISSING else value,
+    "$size": len,
+    "$range": lambda start, end: list(range(start, end)),
+    "$concatArrays": lambda *arrays: [value for array in arrays for value in array],
+    "$slice": slice_array,
+    "$max": lambda *values: max(values),
+    "$allElementsTrue": all,
+    "$lt": lambda left, right: left < right,
+}
+
+
+def evaluate(expr, doc, variables):
+    if isinstance(expr, str):
+        if expr == "$$REMOVE":
+            return MISSING
+        if expr == "$$NOW":
+            return NOW
+        if expr.startswith("$$"):
+            return variables[expr[2:]]
+        if expr.startswith("$"):
+            return doc.get(expr[1:], MISSING)
+        return expr
+    if isinstance(expr, list):
+        return [evaluate(item, doc, variables) for item in expr]
+    if not isinstance(expr, dict):
+        return expr
+
+    (operator, args), = expr.items()
+    if operator == "$let":
+        bound = {name: evaluate(value, doc, variables) for name, value in args["vars"].items()}
+        return evaluate(args["in"], doc, {**variables, **bound})
+    if operator == "$map":
+        name = args.get("as", "this")
+        return [evaluate(args["in"], doc, {**variables, name: item}) for item in evaluate(args["input"], doc, variables)]
+    if operator == "$cond":
+        condition, then, otherwise = args
+        return evaluate(then if evaluate(condition, doc, variables) else otherwise, doc, variables)
+    values = evaluate(args, doc, variables) if isinstance(args, list) else [evaluate(args, doc, variables)]
+    return OPERATORS[operator](*values)
+
+
+def apply_pipeline(pipeline, doc):
+    doc = dict(doc)
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$set":
+            # Every expression of a stage sees the document as it entered the stage
+            values = {field: evaluate(expr, doc, {}) for field, expr in spec.items()}
+            for field, value in values.items():
+                if value is MISSING:
+                    doc.pop(field, None)
+                else:
+                    doc[field] = value
+        elif name == "$unset":
+            for field in [spec] if isinstance(spec, str) else spec:
+                doc.pop(field, None)
+        else:
+            raise AssertionError(f"Unexpected stage {name}")
+    return doc
+
+
+FIELD = "uebungsfahrten_ganz"
+COUNT = f"{FIELD}_count"
+
+
+@pytest.fixture(params=["array", "compact"])
+def storage(server, monkeypatch, request):
+    monkeypatch.setattr(server, "COMPACT_FAHRTEN", request.param == "compact")
+    return request.param
+
+
+def add(server, doc):
+    return apply_pipeline(server.practice_hours_update(FIELD), {"id": "s1", **doc})
+
+
+def remove(server, doc, index):
+    return apply_pipeline(server.practice_hours_update(FIELD, index), {"id": "s1", **doc})
+
+
+def hours(storage, values):
+    """How ``values`` are stored: all-completed lists become counters in compact storage"""
+    if storage == "compact" and all(values):
+        return {COUNT: len(values)}
+    return {FIELD: values}
+
+
+@pytest.mark.parametrize("stored", [{FIELD: [True, True]}, {COUNT: 2}])
+def test_adding_appends_a_completed_hour(server, storage, stored):
+    assert add(server, stored) == {"id": "s1", **hours(storage, [True, True, True])}
+
+
+def test_adding_keeps_open_hours_as_a_list(server, storage):
+    assert add(server, {FIELD: [True, False]}) == {"id": "s1", FIELD: [True, False, True]}
+
+
+@pytest.mark.parametrize("stored", [{FIELD: None}, {}])
+def test_adding_to_legacy_null_or_missing_hours(server, storage, stored):
+    assert add(server, stored) == {"id": "s1", **hours(storage, [True])}
+
+
+def test_adding_records_the_time_when_enabled(server, storage, monkeypatch):
+    assert f"{FIELD}_last_added_at" not in add(server, {})
+    monkeypatch.setattr(server, "PRACTICE_HOURS_TIMESTAMPS", True)
+    assert add(server, {})[f"{FIELD}_last_added_at"] == NOW
+    assert f"{FIELD}_last_added_at" not in remove(server, {COUNT: 1}, 0)
+
+
+@pytest.mark.parametrize("index, expected", [
+    (0, [False, True]),
+    (1, [True, True]),
+    (2, [True, False]),
+])
+def test_removing_drops_exactly_the_indexed_hour(server, storage, index, expected):
+    assert remove(server, {FIELD: [True, False, True]}, index) == {"id": "s1", **hours(storage, expected)}
+
+
+@pytest.mark.parametrize("stored", [{FIELD: [True, True, True]}, {COUNT: 3}])
+def test_removing_from_a_counter_or_list(server, storage, stored):
+    assert remove(server, stored, 2) == {"id": "s1", **hours(storage, [True, True])}
+    assert remove(server, {COUNT: 1}, 0) == {"id": "s1", **hours(storage, [])}
+
+
+@pytest.mark.parametrize("stored, count", [
+    ({FIELD: [True, False]}, 2), ({COUNT: 3}, 3), ({FIELD: None}, 0), ({}, 0),
+])
+def test_bounds_check_counts_hours_however_they_are_stored(server, stored, count):
+    count_expr = server.practice_hours_count_expr(FIELD)
+    assert evaluate(count_expr, stored, {}) == count
+    assert evaluate({"$lt": [count - 1, count_expr]}, stored, {}) is True
+    assert evaluate({"$lt": [count, count_expr]}, stored, {}) is False
+
+
+@pytest.fixture(scope="module")
+def mongod():
+    """Connection string of a throwaway mongod; skips when none can be obtained"""
+    pymongo_inmemory = pytest.importorskip("pymongo_inmemory")
+    try:
+        daemon = pymongo_inmemory.Mongod(None)
+        daemon.start()
+    except Exception as e:
+        pytest.skip(f"mongod unavailable: {e}")
+    yield daemon.connection_string
+    daemon.stop()
+
+
+@pytest.fixture
+def app(server, mongod):
+    """Overrides the mongomock app of conftest: update pipelines need a real server"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    return server.create_app(AsyncIOMotorClient(mongod)[f"tests_{uuid.uuid4().hex}"])
+
+
+def test_practice_hour_routes_on_mongod(services, storage, run):
+    async def scenario(client):
+        response = await client.post("/api/students", json={"name": "Anna", "surname": "Berg"})
+        student_id = response.json()["id"]
+        # Legacy document holding null instead of a list
+        await services.db.students.update_one({"id": student_id}, {"$set": {FIELD: None}})
+
+        for _ in range(3):
+            response = await client.post(f"/api/students/{student_id}/practice-hours",
+                                         params={"hour_type": "ganz", "duration": 1.0})
+            response.raise_for_status()
+        assert response.json()[FIELD] == [True, True, True]
+        stored = await services.db.students.find_one({"id": student_id}, {"_id": 0, FIELD: 1, COUNT: 1})
+        assert stored == hours(storage, [True, True, True])
+
+        response = await client.delete(f"/api/students/{student_id}/practice-hours",
+                                       params={"hour_type": "ganz", "index": 3})
+        assert response.status_code == 400
+        response = await client.delete(f"/api/students/{student_id}/practice-hours",
+                                       params={"hour_type": "ganz", "index": 0})
+        assert response.json()[FIELD] == [True, True]
+
+        response = await client.delete("/api/students/nobody/practice-hours", params={"hour_type": "ganz", "index": 0})
+        assert response.status_code == 404
+
+    run(scenario)
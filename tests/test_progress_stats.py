@@ -0,0 +1,57 @@
+import random
+
+from catalog import CATALOG
+from progress_stats import build_progress_stats, encode_records, summarize_batch
+
+STATUSES = ["not_started", "once", "twice", "thrice"]
+# Students with records, one without, and one that does not exist
+STUDENT_IDS = ["s1", "s2", "s3", "no-records", "nobody"]
+
+
+def random_records(seed=7):
+    rng = random.Random(seed)
+    items = list(CATALOG.item_ordinals) + [("unknown", "x", "y"), ("unknown", "x", "z")]
+    records = []
+    for student_id in STUDENT_IDS[:3]:
+        for category, subcategory, item in rng.sample(items, 60):
+            records.append({"student_id": student_id, "category": category, "subcategory": subcategory,
+                            "item": item, "status": rng.choice(STATUSES)})
+    return records
+
+
+def test_batch_recount_matches_the_group_recount_and_the_stats_routes(server, services, run):
+    records = random_records()
+
+    async def scenario(client):
+        for student_id in STUDENT_IDS[:4]:
+            await services.db.students.insert_one({"id": student_id, "name": "Anna", "surname": "Berg"})
+        await services.db.progress.insert_many([{"id": str(index), **record} for index, record in enumerate(records)])
+
+        grouped = await server.count_progress_summaries(services.db, STUDENT_IDS)
+        batched = summarize_batch(STUDENT_IDS, *encode_records(STUDENT_IDS, records))
+        for student_id in STUDENT_IDS:
+            assert server.summary_counts(batched[student_id]) == server.summary_counts(grouped[student_id])
+            assert build_progress_stats(batched[student_id]) == build_progress_stats(grouped[student_id])
+
+        response = await client.post("/api/progress-stats:batch", json={"student_ids": STUDENT_IDS})
+        response.raise_for_status()
+        batch_stats = response.json()
+        for student_id in STUDENT_IDS:
+            single = (await client.get(f"/api/students/{student_id}/progress-stats")).json()
+            assert batch_stats[student_id] == single == build_progress_stats(grouped[student_id])
+
+        expected = sum(
+            1 for record in records
+            if record["student_id"] == "s1" and record["status"] != "not_started"
+        )
+        assert batched["s1"]["total_completed"] == expected
+        assert batched["no-records"]["total_completed"] == 0
+
+    run(scenario)
+
+
+def test_batch_recount_drops_records_of_other_students():
+    records = random_records()
+    summaries = summarize_batch(["s2"], *encode_records(["s2"], records))
+    everyone = summarize_batch(STUDENT_IDS, *encode_records(STUDENT_IDS, records))
+    assert summaries == {"s2": everyone["s2"]}
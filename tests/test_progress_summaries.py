@@ -0,0 +1,166 @@
+"""The maintained progress summary must always equal a recount of the records"""
+import pytest
+
+PEDALE = {"category": "grundstufe", "subcategory": "pedale", "item": "Pedale"}
+ANHALTEN = {"category": "aufbaustufe", "subcategory": "steigung", "item": "Anhalten"}
+ABSTAND = {"category": "autobahn", "subcategory": "abstand", "item": "vorne"}
+# Not in the catalog: counted in the total only
+UNKNOWN = {"category": "unknown", "subcategory": "x", "item": "y"}
+
+
+async def create_student(client) -> str:
+    response = await client.post("/api/students", json={"name": "Anna", "surname": "Berg"})
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+async def tap(client, student_id, item, status) -> dict:
+    response = await client.post(f"/api/students/{student_id}/progress", params=item, json={"status": status})
+    response.raise_for_status()
+    return response.json()
+
+
+def test_single_taps(services, run, assert_summary_matches_recount):
+    async def scenario(client):
+        student_id = await create_student(client)
+        for status in ("once", "twice", "thrice", "not_started", "once"):
+            await tap(client, student_id, PEDALE, status)
+            await assert_summary_matches_recount(student_id)
+        await tap(client, student_id, ANHALTEN, "twice")
+        await tap(client, student_id, UNKNOWN, "once")
+        await assert_summary_matches_recount(student_id)
+
+        stored = await services.db.progress_summary.find_one({"student_id": student_id})
+        assert stored["total_completed"] == 3
+        assert stored["categories"]["grundstufe"]["once"] == 1
+
+    run(scenario)
+
+
+def test_update_progress(run, assert_summary_matches_recount):
+    async def scenario(client):
+        student_id = await create_student(client)
+        record = await tap(client, student_id, ABSTAND, "twice")
+        for status in ("thrice", "not_started", "once"):
+            response = await client.put(f"/api/progress/{record['id']}", json={"status": status})
+            response.raise_for_status()
+            await assert_summary_matches_recount(student_id)
+
+        response = await client.put("/api/progress/missing", json={"status": "once"})
+        assert response.status_code == 404
+
+    run(scenario)
+
+
+def test_batch_writes(run, assert_summary_matches_recount):
+    async def scenario(client):
+        student_id = await create_student(client)
+        await tap(client, student_id, PEDALE, "once")
+        entries = [
+            {**PEDALE, "status": "twice"},
+            {**ANHALTEN, "status": "once"},
+            {**UNKNOWN, "status": "thrice"},
+            # Supersedes the first entry
+            {**PEDALE, "status": "not_started"},
+        ]
+        response = await client.post(f"/api/students/{student_id}/progress:batch", json=entries)
+        response.raise_for_status()
+        results = response.json()["results"]
+        assert all(result["ok"] for result in results)
+        assert results[0]["superseded_by"] == 3
+        await assert_summary_matches_recount(student_id)
+
+        # Replaying the same batch moves nothing
+        response = await client.post(f"/api/students/{student_id}/progress:batch", json=entries)
+        response.raise_for_status()
+        await assert_summary_matches_recount(student_id)
+        stats = response.json()["stats"]
+        assert stats["grundstufe"]["total_completed"] == 0
+        assert stats["aufbaustufe"]["total_completed"] == 1
+
+    run(scenario)
+
+
+def test_deletes(services, run, assert_summary_matches_recount):
+    async def scenario(client):
+        kept, deleted = await create_student(client), await create_student(client)
+        for student_id in (kept, deleted):
+            await tap(client, student_id, PEDALE, "twice")
+            await tap(client, student_id, ANHALTEN, "once")
+
+        response = await client.delete(f"/api/students/{deleted}")
+        response.raise_for_status()
+        assert await services.db.progress_summary.count_documents({"student_id": deleted}) == 0
+        await assert_summary_matches_recount(kept)
+
+        response = await client.post("/api/students:delete", json={"student_ids": [kept]})
+        assert response.json() == {"deleted_count": 1}
+        assert await services.db.progress_summary.count_documents({}) == 0
+
+    run(scenario)
+
+
+def test_missing_summary_is_rebuilt_from_the_records(services, run, assert_summary_matches_recount):
+    async def scenario(client):
+        student_id = await create_student(client)
+        await tap(client, student_id, PEDALE, "thrice")
+        stats = (await client.get(f"/api/students/{student_id}/progress-stats")).json()
+
+        await services.db.progress_summary.delete_many({})
+        await services.student_cache.invalidate(student_id)
+        assert (await client.get(f"/api/students/{student_id}/progress-stats")).json() == stats
+        await assert_summary_matches_recount(student_id)
+
+    run(scenario)
+
+
+def test_reads_for_unknown_students_store_nothing(services, run):
+    async def scenario(client):
+        response = await client.get("/api/students/nobody/progress-stats")
+        response.raise_for_status()
+        response = await client.post("/api/progress-stats:batch", json={"student_ids": ["nobody", "nobody-else"]})
+        response.raise_for_status()
+        assert await services.db.progress_summary.count_documents({}) == 0
+
+    run(scenario)
+
+
+@pytest.fixture
+def settled(server, monkeypatch):
+    monkeypatch.setattr(server, "SUMMARY_SETTLE_SECONDS", 0)
+    return server
+
+
+def test_reconcile_repairs_drift(settled, services, run, assert_summary_matches_recount):
+    server = settled
+
+    async def scenario(client):
+        student_id = await create_student(client)
+        await tap(client, student_id, PEDALE, "twice")
+        # As if a process died between a record write and its $inc
+        await services.db.progress.update_one({"student_id": student_id}, {"$set": {"status": "not_started"}})
+
+        assert await server.reconcile_progress_summaries(services) == {"checked": 1, "repaired": 1}
+        await assert_summary_matches_recount(student_id)
+        response = await client.post("/api/maintenance/reconcile-summaries", params={"student_id": student_id})
+        assert response.json() == {"checked": 1, "repaired": 0}
+
+    run(scenario)
+
+
+def test_reconcile_leaves_summaries_moved_during_the_settle_period(settled, services, monkeypatch, run):
+    server = settled
+
+    async def scenario(client):
+        student_id = await create_student(client)
+        await tap(client, student_id, PEDALE, "twice")
+        await services.db.progress.update_one({"student_id": student_id}, {"$set": {"status": "not_started"}})
+
+        async def tap_during_settle(seconds):
+            # The $inc of a concurrent tap lands while the reconcile waits
+            await server.apply_summary_inc(services.db, student_id, {"total_completed": 0})
+
+        monkeypatch.setattr(server.asyncio, "sleep", tap_during_settle)
+        assert await server.reconcile_progress_summaries(services, [student_id]) == {"checked": 1, "repaired": 0}
+
+    run(scenario)
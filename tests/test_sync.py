@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+
+import sync
+
+NOW = datetime(2024, 5, 1, 12, 0, 0)
+
+
+def doc(change_seq, age_seconds=60):
+    return {"id": f"doc-{change_seq}", "change_seq": change_seq, "changed_at": NOW - timedelta(seconds=age_seconds)}
+
+
+def seqs(changes):
+    return [(kind, document["change_seq"]) for kind, document in changes]
+
+
+def test_merge_changes_interleaves_kinds_by_change_seq():
+    batches = [("student", [doc(1), doc(5)]), ("progress", [doc(2), doc(3), doc(6)]), ("note", []), ("tombstone", [doc(4)])]
+    changes, more = sync.merge_changes(batches, limit=10)
+    assert seqs(changes) == [("student", 1), ("progress", 2), ("progress", 3), ("tombstone", 4), ("student", 5), ("progress", 6)]
+    assert not more
+
+
+def test_merge_changes_cuts_at_the_limit():
+    # Each batch holds up to limit + 1 documents, as the route queries them
+    batches = [("student", [doc(1), doc(4), doc(5)]), ("progress", [doc(2), doc(3), doc(6)])]
+    changes, more = sync.merge_changes(batches, limit=2)
+    assert seqs(changes) == [("student", 1), ("progress", 2)]
+    assert more
+
+    changes, more = sync.merge_changes([("student", [doc(1), doc(2)])], limit=2)
+    assert len(changes) == 2 and not more
+
+
+def test_next_token_advances_past_settled_changes_only():
+    changes = [("progress", doc(3)), ("progress", doc(4)), ("note", doc(7, age_seconds=1)), ("progress", doc(9))]
+    assert sync.next_token(changes, since=2, settle_seconds=5, now=NOW) == 4
+    assert sync.next_token(changes, since=2, settle_seconds=0, now=NOW) == 9
+    assert sync.next_token(changes[2:], since=4, settle_seconds=5, now=NOW) == 4
+    assert sync.next_token([], since=4, settle_seconds=5, now=NOW) == 4
+
+
+async def write_changes(client):
+    """Three students, each with a progress record and a note; returns the student ids"""
+    student_ids = []
+    for name in ("Anna", "Ben", "Carla"):
+        student = (await client.post("/api/students", json={"name": name, "surname": "Berg"})).json()
+        item = {"category": "grundstufe", "subcategory": "pedale", "item": "Pedale"}
+        response = await client.post(f"/api/students/{student['id']}/progress", params=item, json={"status": "once"})
+        response.raise_for_status()
+        response = await client.post("/api/notes", json={"student_id": student["id"], **item, "note_text": name})
+        response.raise_for_status()
+        student_ids.append(student["id"])
+    return student_ids
+
+
+async def sync_all(client, since=0, limit=4, **params):
+    """Follow has_more; returns the pages and the final token"""
+    pages = []
+    while True:
+        page = (await client.get("/api/sync", params={"since": since, "limit": limit, **params})).json()
+        pages.append(page)
+        since = page["next_since"]
+        if not page["has_more"]:
+            return pages, since
+
+
+def test_sync_pages_through_every_change(server, monkeypatch, run):
+    monkeypatch.setattr(server, "SYNC_SETTLE_SECONDS", 0)
+
+    async def scenario(client):
+        student_ids = await write_changes(client)
+        pages, token = await sync_all(client)
+        assert len(pages) == 3
+        assert sum(len(page["students"]) for page in pages) == 3
+        assert sum(len(page["progress"]) for page in pages) == 3
+        assert sum(len(page["notes"]) for page in pages) == 3
+        assert all(page["since"] < page["next_since"] for page in pages)
+
+        # Nothing new: the token stays
+        pages, unchanged = await sync_all(client, since=token)
+        assert unchanged == token and pages[0]["students"] == []
+
+        await client.delete(f"/api/students/{student_ids[0]}")
+        pages, _ = await sync_all(client, since=token)
+        assert pages[0]["deleted"] == [{"type": "student", "id": student_ids[0]}]
+
+        pages, _ = await sync_all(client, student_id=student_ids[1])
+        assert [student["id"] for student in pages[0]["students"]] == [student_ids[1]]
+        assert len(pages[0]["progress"]) == len(pages[0]["notes"]) == 1
+
+    run(scenario)
+
+
+def test_sync_resends_changes_that_have_not_settled(server, monkeypatch, run):
+    monkeypatch.setattr(server, "SYNC_SETTLE_SECONDS", 60)
+
+    async def scenario(client):
+        await write_changes(client)
+        page = (await client.get("/api/sync", params={"since": 0, "limit": 4})).json()
+        # Delivered, but the token does not move past them and paging stops
+        assert len(page["students"]) + len(page["progress"]) + len(page["notes"]) == 4
+        assert page["next_since"] == 0
+        assert not page["has_more"]
+
+    run(scenario)